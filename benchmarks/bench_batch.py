@@ -0,0 +1,80 @@
+"""Benchmark BasketPricer.calculate_many throughput as worker processes are added.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch
+"""
+
+import os
+import random
+import time
+
+from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
+from src.basket_pricer.offers import (
+    BuyXGetCheapestFreeOffer,
+    BuyXgetYfree,
+    PercentageOffer,
+)
+from src.basket_pricer.pricer import BasketPricer
+
+BASKETS = 20_000
+LINES_PER_BASKET = 20
+CATALOGUE_SIZE = 5_000
+
+
+def build_workload() -> tuple[BasketPricer, list[Basket]]:
+    rng = random.Random(3)
+    products = [
+        Product(sku=sku, name=f"Product {sku}", price=Money(rng.randint(50, 999) / 100))
+        for sku in range(1, CATALOGUE_SIZE + 1)
+    ]
+    offers = []
+    for sku in range(1, CATALOGUE_SIZE + 1, 3):
+        offers.append(
+            PercentageOffer(id=f"p{sku}", name="10% off", sku=sku, percentage=10)
+        )
+        offers.append(
+            BuyXgetYfree(id=f"b{sku}", name="3 for 2", sku=sku, buy=2, free=1)
+        )
+    for first in range(1, CATALOGUE_SIZE, 50):
+        offers.append(
+            BuyXGetCheapestFreeOffer(
+                id=f"c{first}",
+                name="Cheapest free",
+                product_skus=list(range(first, first + 10)),
+                quantity=3,
+            )
+        )
+    baskets = [
+        Basket(
+            [
+                BasketItem(product=product, qty=rng.randint(1, 6))
+                for product in rng.sample(products, LINES_PER_BASKET)
+            ]
+        )
+        for _ in range(BASKETS)
+    ]
+    return BasketPricer(Catalogue(products), offers), baskets
+
+
+def main() -> None:
+    pricer, baskets = build_workload()
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"{'workers':>8} {'seconds':>9} {'baskets/s':>11} {'scaling':>9}")
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        priced = sum(
+            result.ok for result in pricer.calculate_many(baskets, workers=workers)
+        )
+        elapsed = time.perf_counter() - start
+        assert priced == len(baskets)
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>8} {elapsed:>9.2f} {len(baskets) / elapsed:>11.0f} "
+            f"{baseline / elapsed:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
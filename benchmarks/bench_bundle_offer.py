@@ -0,0 +1,62 @@
+"""Benchmark the meal deal bundle solver as lunchtime baskets grow.
+
+Three slots of 40 skus each, one sku in two of them. The best bundles of a
+basket are found by a greedy fill checked over every set of slots, repeated
+for O(log units) bundle counts, so the time per basket should grow about
+linearly with the lines of the basket rather than with the ways of forming
+bundles from them. Run from the repository root:
+
+    python -m benchmarks.bench_bundle_offer
+"""
+
+import logging
+import random
+import time
+
+from src.basket_pricer.models import Basket, BasketItem, Money, Product
+from src.basket_pricer.offers import BundleOffer
+
+SLOTS = [list(range(1, 41)), list(range(41, 81)), list(range(80, 121))]
+BASKETS = 1_000
+
+
+def build_baskets(rng: random.Random, lines: int) -> list:
+    products = [
+        Product(sku=sku, name=f"P{sku}", price=Money(rng.randint(50, 450) / 100))
+        for sku in range(1, 121)
+    ]
+    return [
+        Basket(
+            [
+                BasketItem(product=product, qty=rng.randint(1, 6))
+                for product in rng.sample(products, lines)
+            ]
+        )
+        for _ in range(BASKETS)
+    ]
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    offer = BundleOffer(id="meal", name="Meal deal", slots=SLOTS, price="3.50")
+    rng = random.Random(0)
+    print(f"{BASKETS} baskets, one meal deal of 3 slots x 40 skus")
+    print(f"{'lines':>6} {'units':>7} {'saving':>8} {'µs/basket':>10}")
+    for lines in (3, 10, 30, 60, 120):
+        baskets = build_baskets(rng, lines)
+        units = sum(
+            basket_item.qty
+            for basket in baskets
+            for basket_item in basket.get_items_list().values()
+        )
+        saving = 0
+        start = time.perf_counter()
+        for basket in baskets:
+            saving += offer.evaluate(basket).discount.minor_units
+        elapsed = (time.perf_counter() - start) / BASKETS * 1e6
+        average = Money.from_minor_units(saving // BASKETS)
+        print(f"{lines:>6} {units / BASKETS:>7.0f} {str(average):>8} {elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark memory and build time of Catalogue against ColumnarCatalogue.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_catalogue
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+
+from src.basket_pricer.models import Catalogue, ColumnarCatalogue, Money, Product
+
+SIZES = [10_000, 100_000, 300_000]
+LOOKUPS = 100_000
+
+
+def build_columns(size: int) -> tuple[list[int], list[int], list[str]]:
+    """Rows as they come out of a file, every name a new string"""
+    rng = random.Random(size)
+    skus = list(range(1, size + 1))
+    rng.shuffle(skus)
+    prices = [rng.randint(10, 5_000) for _ in skus]
+    names = [f"Product {sku}" for sku in skus]
+    return skus, prices, names
+
+
+def build_catalogue(size: int) -> Catalogue:
+    skus, prices, names = build_columns(size)
+    return Catalogue(
+        [
+            Product(sku=sku, name=name, price=Money.from_minor_units(price))
+            for sku, price, name in zip(skus, prices, names)
+        ]
+    )
+
+
+def build_columnar(size: int) -> ColumnarCatalogue:
+    return ColumnarCatalogue.from_columns(*build_columns(size))
+
+
+def retained_bytes(build, size: int) -> int:
+    """Memory still held once the catalogue is built and its input dropped"""
+    gc.collect()
+    tracemalloc.start()
+    catalogue = build(size)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalogue
+    return retained
+
+
+def build_seconds(build, size: int):
+    gc.collect()
+    start = time.perf_counter()
+    catalogue = build(size)
+    return catalogue, time.perf_counter() - start
+
+
+def time_lookups(catalogue, skus: list[int]) -> float:
+    start = time.perf_counter()
+    for sku in skus:
+        catalogue.fetch_price(sku)
+    return (time.perf_counter() - start) / len(skus)
+
+
+def main() -> None:
+    print(
+        f"{'skus':>8} {'catalogue B/sku':>16} {'columnar B/sku':>15} "
+        f"{'build (s)':>10} {'columnar (s)':>13} "
+        f"{'lookup (us)':>12} {'columnar (us)':>14}"
+    )
+    for size in SIZES:
+        catalogue_bytes = retained_bytes(build_catalogue, size)
+        columnar_bytes = retained_bytes(build_columnar, size)
+        catalogue, catalogue_time = build_seconds(build_catalogue, size)
+        columnar, columnar_time = build_seconds(build_columnar, size)
+        sample = random.Random(0).choices(range(1, size + 1), k=LOOKUPS)
+        print(
+            f"{size:>8} {catalogue_bytes / size:>16.0f} {columnar_bytes / size:>15.0f} "
+            f"{catalogue_time:>10.2f} {columnar_time:>13.2f} "
+            f"{time_lookups(catalogue, sample) * 1e6:>12.3f} "
+            f"{time_lookups(columnar, sample) * 1e6:>14.3f}"
+        )
+        del catalogue, columnar
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark loading a large CSV catalogue file.
+
+Compares adding Products one at a time with Catalogue.load and
+ColumnarCatalogue.load. Run from the repository root:
+
+    python -m benchmarks.bench_catalogue_load
+"""
+
+import csv
+import os
+import random
+import tempfile
+import time
+
+from src.basket_pricer.models import Catalogue, ColumnarCatalogue, Product
+
+ROWS = 1_000_000
+
+
+def write_catalogue(path: str, rows: int) -> None:
+    rng = random.Random(rows)
+    with open(path, "w", newline="", encoding="utf-8") as stream:
+        writer = csv.writer(stream)
+        writer.writerow(["sku", "name", "price"])
+        for sku in range(1, rows + 1):
+            price = rng.randint(10, 5_000)
+            writer.writerow(
+                [sku, f"Product {sku}", f"{price // 100}.{price % 100:02d}"]
+            )
+
+
+def add_one_by_one(path: str) -> Catalogue:
+    catalogue = Catalogue()
+    with open(path, newline="", encoding="utf-8") as stream:
+        for row in csv.DictReader(stream):
+            catalogue.add_product(
+                Product(sku=int(row["sku"]), name=row["name"], price=row["price"])
+            )
+    return catalogue
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalogue.csv")
+        write_catalogue(path, ROWS)
+        print(f"{ROWS} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+        for label, load in [
+            ("add_product", add_one_by_one),
+            ("Catalogue.load", Catalogue.load),
+            ("ColumnarCatalogue.load", ColumnarCatalogue.load),
+        ]:
+            start = time.perf_counter()
+            catalogue = load(path)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>24}: {elapsed:6.2f} s for {len(catalogue)} products")
+            del catalogue
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark building and repricing baskets from a transaction log.
+
+Compares Basket (a BasketItem and Product per line) with CompactBasket
+(sku and quantity arrays) for memory, build time and pricing time. Run
+from the repository root:
+
+    python -m benchmarks.bench_compact_basket
+"""
+
+import gc
+import logging
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_catalogue import build_catalogue
+from src.basket_pricer.models import Basket, BasketItem, CompactBasket
+from src.basket_pricer.pricer import BasketPricer
+
+SKUS = 10_000
+BASKETS = 100_000
+LINES_PER_BASKET = 8
+
+
+def transaction_log() -> list:
+    """(sku, qty) lines of every basket, as read from a till log"""
+    rng = random.Random(0)
+    return [
+        [(rng.randint(1, SKUS), rng.randint(1, 3)) for _ in range(LINES_PER_BASKET)]
+        for _ in range(BASKETS)
+    ]
+
+
+def build_baskets(log: list, catalogue) -> list:
+    return [
+        Basket(
+            [
+                BasketItem(product=catalogue.fetch_product(sku), qty=qty)
+                for sku, qty in lines
+            ]
+        )
+        for lines in log
+    ]
+
+
+def build_compact(log: list, catalogue) -> list:
+    return [CompactBasket.from_lines(lines) for lines in log]
+
+
+def measure(build, log: list, catalogue):
+    gc.collect()
+    tracemalloc.start()
+    baskets = build(log, catalogue)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del baskets
+    gc.collect()
+    start = time.perf_counter()
+    baskets = build(log, catalogue)
+    return baskets, retained, time.perf_counter() - start
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)  # Basket logs every line it adds
+    catalogue = build_catalogue(SKUS)
+    log = transaction_log()
+    pricer = BasketPricer(catalogue, [])
+    print(f"{BASKETS} baskets of {LINES_PER_BASKET} lines")
+    for label, build in [("Basket", build_baskets), ("CompactBasket", build_compact)]:
+        baskets, retained, build_seconds = measure(build, log, catalogue)
+        start = time.perf_counter()
+        for basket in baskets:
+            pricer.calculate(basket)
+        price_seconds = time.perf_counter() - start
+        print(
+            f"{label:>14}: {retained / BASKETS:7.0f} B/basket, "
+            f"build {build_seconds:6.2f} s, price {price_seconds:6.2f} s"
+        )
+        del baskets
+
+
+if __name__ == "__main__":
+    main()
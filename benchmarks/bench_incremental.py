@@ -0,0 +1,79 @@
+"""Benchmark per-scan latency of IncrementalPricer against full repricing.
+
+Each scan adds one unit of a random line to a basket of growing size.
+Run from the repository root:
+
+    python -m benchmarks.bench_incremental
+"""
+
+import random
+import time
+
+from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
+from src.basket_pricer.offers import (
+    BuyXGetCheapestFreeOffer,
+    BuyXgetYfree,
+    PercentageOffer,
+)
+from src.basket_pricer.pricer import BasketPricer, IncrementalPricer
+
+BASKET_LINES = [10, 50, 100, 250, 500]
+SCANS = 200
+
+
+def build_pricer(lines: int) -> tuple[BasketPricer, list[Product]]:
+    products = [
+        Product(sku=sku, name=f"Product {sku}", price=Money("1.25"))
+        for sku in range(1, lines + 1)
+    ]
+    offers = []
+    for sku in range(1, lines + 1):
+        offers.append(
+            PercentageOffer(id=f"p{sku}", name="10% off", sku=sku, percentage=10)
+        )
+        offers.append(
+            BuyXgetYfree(id=f"b{sku}", name="3 for 2", sku=sku, buy=2, free=1)
+        )
+    for first in range(1, lines, 5):
+        offers.append(
+            BuyXGetCheapestFreeOffer(
+                id=f"c{first}",
+                name="Cheapest free",
+                product_skus=list(range(first, first + 5)),
+                quantity=3,
+            )
+        )
+    return BasketPricer(Catalogue(products), offers), products
+
+
+def time_scans(pricer: BasketPricer, products: list[Product], incremental: bool):
+    rng = random.Random(1)
+    basket = Basket([BasketItem(product=product, qty=1) for product in products])
+    reprice = IncrementalPricer(pricer, basket).price if incremental else None
+    if reprice is None:
+
+        def reprice():
+            return pricer.calculate(basket)
+
+    reprice()
+    start = time.perf_counter()
+    for _ in range(SCANS):
+        basket.add_item(BasketItem(product=rng.choice(products), qty=1))
+        reprice()
+    return (time.perf_counter() - start) / SCANS
+
+
+def main() -> None:
+    print(f"{'lines':>6} {'full (ms)':>10} {'incremental (ms)':>17} {'speedup':>9}")
+    for lines in BASKET_LINES:
+        pricer, products = build_pricer(lines)
+        full = time_scans(pricer, products, incremental=False)
+        incremental = time_scans(pricer, products, incremental=True)
+        print(
+            f"{lines:>6} {full * 1e3:>10.3f} {incremental * 1e3:>17.3f} "
+            f"{full / incremental:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark integer minor-unit Money against the previous Decimal-backed Money.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_money
+"""
+
+import random
+import timeit
+from decimal import ROUND_HALF_UP, Decimal
+
+from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
+from src.basket_pricer.pricer import BasketPricer
+
+BASKET_SIZES = [10, 100, 1_000, 10_000]
+REPEATS = 5
+
+
+class DecimalMoney:
+    """The previous Decimal based Money arithmetic, kept only as a baseline"""
+
+    def __init__(self, amount):
+        amount = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+        if amount < 0:
+            raise ValueError(f"Money {amount} cannot be negative.")
+        self._amount = amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    def __add__(self, other):
+        return DecimalMoney(self._amount + other._amount)
+
+    def __mul__(self, multiplier):
+        return DecimalMoney(self._amount * Decimal(str(multiplier)))
+
+
+def build_lines(size: int) -> list[tuple[str, int]]:
+    rng = random.Random(size)
+    return [
+        (f"{rng.randint(1, 9999) / 100:.2f}", rng.randint(1, 12)) for _ in range(size)
+    ]
+
+
+def subtotal_decimal(lines: list[tuple[DecimalMoney, int]]) -> DecimalMoney:
+    total = DecimalMoney("0")
+    for price, qty in lines:
+        total = total + price * qty
+    return total
+
+
+def subtotal_minor(lines: list[tuple[Money, int]]) -> Money:
+    total = Money.zero()
+    for price, qty in lines:
+        total = total + price * qty
+    return total
+
+
+def build_pricer(lines: list[tuple[str, int]]) -> tuple[BasketPricer, Basket]:
+    products = [
+        Product(sku=sku, name=f"Product {sku}", price=Money(price))
+        for sku, (price, _) in enumerate(lines, start=1)
+    ]
+    basket = Basket(
+        [
+            BasketItem(product=product, qty=qty)
+            for product, (_, qty) in zip(products, lines)
+        ]
+    )
+    return BasketPricer(Catalogue(products), []), basket
+
+
+def best_of(stmt) -> float:
+    return min(timeit.repeat(stmt, number=1, repeat=REPEATS))
+
+
+def main() -> None:
+    print(
+        f"{'lines':>8} {'decimal (ms)':>14} {'minor (ms)':>12} "
+        f"{'speedup':>9} {'pricer (ms)':>13}"
+    )
+    for size in BASKET_SIZES:
+        raw_lines = build_lines(size)
+        decimal_lines = [(DecimalMoney(price), qty) for price, qty in raw_lines]
+        minor_lines = [(Money(price), qty) for price, qty in raw_lines]
+        expected = subtotal_decimal(decimal_lines)._amount
+        assert subtotal_minor(minor_lines).amount == expected
+
+        decimal_time = best_of(lambda: subtotal_decimal(decimal_lines))
+        minor_time = best_of(lambda: subtotal_minor(minor_lines))
+        pricer, basket = build_pricer(raw_lines)
+        pricer_time = best_of(lambda: pricer.calculate(basket))
+        print(
+            f"{size:>8} {decimal_time * 1e3:>14.3f} {minor_time * 1e3:>12.3f} "
+            f"{decimal_time / minor_time:>8.1f}x {pricer_time * 1e3:>13.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark pricing with a messy promotion feed, with and without pruning.
+
+The feed repeats percentage and buy X get Y free offers on the same skus
+with different strengths, as merged promotion feeds do. Compares the
+pricer, which drops dominated offers, with one evaluating the whole feed.
+Run from the repository root:
+
+    python -m benchmarks.bench_offer_compiler
+"""
+
+import dataclasses
+import logging
+import random
+import time
+
+from benchmarks.bench_catalogue import build_catalogue
+from src.basket_pricer.models import Basket, BasketItem
+from src.basket_pricer.offers import BuyXgetYfree, PercentageOffer
+from src.basket_pricer.offers.offer_index import OfferIndex
+from src.basket_pricer.offers.offer_resolver import OfferResolver
+from src.basket_pricer.pricer import BasketPricer
+
+SKUS = 2_000
+OFFERS_PER_SKU = 6
+BASKETS = 2_000
+LINES_PER_BASKET = 10
+
+
+def messy_feed(rng: random.Random) -> list:
+    offers = []
+    for sku in range(1, SKUS + 1):
+        for copy in range(OFFERS_PER_SKU):
+            if copy % 2:
+                offers.append(
+                    PercentageOffer(
+                        id=f"p{sku}_{copy}",
+                        name=f"{copy} percent",
+                        sku=sku,
+                        percentage=rng.choice([5, 10, 15, 20, 25]),
+                    )
+                )
+            else:
+                offers.append(
+                    BuyXgetYfree(
+                        id=f"b{sku}_{copy}",
+                        name=f"Buy get free {copy}",
+                        sku=sku,
+                        buy=rng.randint(2, 4),
+                        free=1,
+                    )
+                )
+    return offers
+
+
+def unpruned(pricer: BasketPricer, offers: list) -> BasketPricer:
+    """The pricer's context with every offer of the feed put back"""
+    index = OfferIndex(offers)
+    context = dataclasses.replace(
+        pricer.context,
+        offers=tuple(offers),
+        offer_index=index,
+        offer_resolver=OfferResolver(offers, index=index),
+        dropped_offers=(),
+    )
+    return BasketPricer.from_context(context)
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(0)
+    catalogue = build_catalogue(SKUS)
+    offers = messy_feed(rng)
+    start = time.perf_counter()
+    pricer = BasketPricer(catalogue, offers)
+    compile_seconds = time.perf_counter() - start
+    baskets = [
+        Basket(
+            [
+                BasketItem(product=catalogue.fetch_product(sku), qty=rng.randint(1, 6))
+                for sku in rng.sample(range(1, SKUS + 1), LINES_PER_BASKET)
+            ]
+        )
+        for _ in range(BASKETS)
+    ]
+    print(
+        f"{len(offers)} offers, {len(pricer.dropped_offers)} dropped "
+        f"in {compile_seconds:.2f} s"
+    )
+    for label, candidate in [("all", unpruned(pricer, offers)), ("pruned", pricer)]:
+        start = time.perf_counter()
+        for basket in baskets:
+            candidate.calculate(basket)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>7}: {elapsed / BASKETS * 1e3:7.3f} ms/basket")
+
+
+if __name__ == "__main__":
+    main()
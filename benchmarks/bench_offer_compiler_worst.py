@@ -0,0 +1,81 @@
+"""Benchmark compiling many offers on one sku, the worst case for pruning.
+
+Every offer of a feed is compared with the offers sharing one of its skus,
+so offers piling up on a single sku are the expensive case. Three feeds of
+that kind are timed as they grow:
+
+- percentage offers of random strengths, which all beat or lose to each
+  other;
+- percentage offers, each live for a week of its own, none of which
+  replaces another;
+- spend threshold offers, which never replace each other.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_offer_compiler_worst
+"""
+
+import logging
+import random
+import time
+
+from src.basket_pricer.offers import PercentageOffer, SpendThresholdOffer
+from src.basket_pricer.offers.offer_compiler import compile_offers
+
+WEEK = 7 * 24 * 3600
+
+
+def ranked(rng: random.Random, count: int) -> list:
+    return [
+        PercentageOffer(id=f"p{number}", name="P", sku=1, percentage=rng.randint(1, 90))
+        for number in range(count)
+    ]
+
+
+def weekly(rng: random.Random, count: int) -> list:
+    return [
+        PercentageOffer(
+            id=f"w{number}",
+            name="W",
+            sku=1,
+            percentage=rng.randint(1, 90),
+            starts_at=number * WEEK,
+            ends_at=(number + 1) * WEEK,
+        )
+        for number in range(count)
+    ]
+
+
+def thresholds(rng: random.Random, count: int) -> list:
+    return [
+        SpendThresholdOffer(
+            id=f"s{number}",
+            name="S",
+            product_skus=[1, 2],
+            thresholds=[rng.randint(5, 50)],
+            savings=[1],
+        )
+        for number in range(count)
+    ]
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(0)
+    print(f"{'feed':>10} {'offers':>8} {'kept':>8} {'seconds':>8}")
+    for feed in (ranked, weekly, thresholds):
+        for count in (1_000, 10_000, 100_000):
+            offers = feed(rng, count)
+            start = time.perf_counter()
+            compiled = compile_offers(offers)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{feed.__name__:>10} {count:>8} {len(compiled.offers):>8} "
+                f"{elapsed:>8.3f}"
+            )
+            if elapsed > 30:
+                break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark evaluating a Buy X Get Cheapest Free offer on large baskets.
+
+Compares the single pass evaluate with the previous three calls, each of
+which walked the basket again and checked skus against a list. Run from
+the repository root:
+
+    python -m benchmarks.bench_offer_evaluation
+"""
+
+import logging
+import random
+import timeit
+
+from src.basket_pricer.models import Basket, BasketItem, Money, Product
+from src.basket_pricer.offers import BuyXGetCheapestFreeOffer
+
+SCOPE_SIZES = [10, 100, 1_000]
+BASKET_LINES = 1_000
+REPEATS = 20
+
+
+def three_pass_apply(offer: BuyXGetCheapestFreeOffer, basket: Basket):
+    """The previous apply_to_basket: applicability, discount and names each
+    walk the basket, with list membership for every line"""
+
+    def eligible():
+        return [
+            basket_item
+            for sku, basket_item in basket.get_items_list().items()
+            if sku in offer.product_skus
+        ]
+
+    if sum(item.qty for item in eligible()) < offer.quantity:
+        return None
+    runs = [(item.product.sku, item.product.price, item.qty) for item in eligible()]
+    discount, _ = offer._group_runs(runs)
+    if discount.is_zero():
+        return None
+    return discount, [item.product.name for item in eligible()]
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(0)
+    basket = Basket(
+        [
+            BasketItem(
+                product=Product(
+                    sku=sku, name=f"P{sku}", price=Money(rng.randint(1, 999) / 100)
+                ),
+                qty=rng.randint(1, 5),
+            )
+            for sku in range(1, BASKET_LINES + 1)
+        ]
+    )
+    print(f"{BASKET_LINES} basket lines, {REPEATS} evaluations")
+    print(f"{'scope':>6} {'three pass ms':>14} {'single pass ms':>15}")
+    for scope in SCOPE_SIZES:
+        offer = BuyXGetCheapestFreeOffer(
+            id="cheapest",
+            name="Cheapest free",
+            product_skus=rng.sample(range(1, BASKET_LINES * 2), scope),
+            quantity=3,
+        )
+        assert three_pass_apply(offer, basket) == offer.apply_to_basket(basket)
+        before = timeit.timeit(lambda: three_pass_apply(offer, basket), number=REPEATS)
+        after = timeit.timeit(lambda: offer.apply_to_basket(basket), number=REPEATS)
+        print(
+            f"{scope:>6} {before / REPEATS * 1e3:>14.3f} "
+            f"{after / REPEATS * 1e3:>15.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark pricing a 100 line basket while the number of active offers grows.
+
+Compares the sku indexed pricer with the previous approach of scanning
+every offer for every basket line. Run from the repository root:
+
+    python -m benchmarks.bench_offer_index
+"""
+
+import random
+import timeit
+
+from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
+from src.basket_pricer.offers import BuyXGetCheapestFreeOffer, PercentageOffer
+from src.basket_pricer.pricer import BasketPricer
+
+OFFER_COUNTS = [10, 100, 1_000, 10_000, 100_000]
+BASKET_LINES = 100
+CATALOGUE_SIZE = 200_000
+REPEATS = 3
+
+
+def build_offers(count: int, rng: random.Random) -> list:
+    offers = []
+    for offer_id in range(count):
+        if offer_id % 10:
+            offers.append(
+                PercentageOffer(
+                    id=f"pct_{offer_id}",
+                    name=f"{offer_id} percent",
+                    sku=rng.randint(1, CATALOGUE_SIZE),
+                    percentage=rng.choice([5, 10, 20, 25]),
+                )
+            )
+        else:
+            offers.append(
+                BuyXGetCheapestFreeOffer(
+                    id=f"cheapest_{offer_id}",
+                    name=f"Cheapest free {offer_id}",
+                    product_skus=rng.sample(range(1, CATALOGUE_SIZE), 3),
+                    quantity=3,
+                )
+            )
+    return offers
+
+
+def scan_all_offers(pricer: BasketPricer, basket: Basket) -> int:
+    """The previous per-basket work: split every offer with hasattr, then scan
+    every offer again for every basket line"""
+    applied = 0
+    single_sku_offers, multi_sku_offers = [], []
+    for offer in pricer.offers:
+        if hasattr(offer, "sku"):
+            single_sku_offers.append(offer)
+        else:
+            multi_sku_offers.append(offer)
+    for offer in multi_sku_offers:
+        applied += offer.apply_to_basket(basket) is not None
+    for sku in basket.get_items_list():
+        for offer in single_sku_offers:
+            if hasattr(offer, "sku") and getattr(offer, "sku") == sku:
+                applied += offer.apply_to_basket(basket) is not None
+    return applied
+
+
+def best_of(stmt) -> float:
+    return min(timeit.repeat(stmt, number=1, repeat=REPEATS))
+
+
+def main() -> None:
+    rng = random.Random(42)
+    skus = rng.sample(range(1, CATALOGUE_SIZE), BASKET_LINES)
+    products = [
+        Product(sku=sku, name=f"Product {sku}", price=Money("1.99")) for sku in skus
+    ]
+    catalogue = Catalogue(products)
+    basket = Basket([BasketItem(product=product, qty=3) for product in products])
+
+    print(f"{'offers':>8} {'scan (ms)':>11} {'indexed (ms)':>13} {'speedup':>9}")
+    for count in OFFER_COUNTS:
+        pricer = BasketPricer(catalogue, build_offers(count, rng))
+        scan_time = best_of(lambda: scan_all_offers(pricer, basket))
+        indexed_time = best_of(lambda: pricer.calculate(basket))
+        print(
+            f"{count:>8} {scan_time * 1e3:>11.3f} {indexed_time * 1e3:>13.3f} "
+            f"{scan_time / indexed_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
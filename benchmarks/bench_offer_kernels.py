@@ -0,0 +1,77 @@
+"""Benchmark one discount per basket for each built-in offer over many baskets.
+
+Compares calculate_discount basket by basket with the batch kernels over
+BasketColumns, in pure Python and with NumPy when it is installed. Run
+from the repository root:
+
+    python -m benchmarks.bench_offer_kernels
+"""
+
+import logging
+import random
+import time
+
+from src.basket_pricer.models import Basket, BasketItem, Money, Product
+from src.basket_pricer.offers import (
+    BuyXGetCheapestFreeOffer,
+    BuyXgetYfree,
+    PercentageOffer,
+)
+from src.basket_pricer.offers.offer_kernels import HAVE_NUMPY, BasketColumns
+
+SKUS = 1_000
+BASKETS = 100_000
+LINES_PER_BASKET = 8
+OFFERS = [
+    PercentageOffer(id="pct", name="20% off", sku=1, percentage=20),
+    BuyXgetYfree(id="b2g1", name="Buy 2 get 1 free", sku=2, buy=2, free=1),
+    BuyXGetCheapestFreeOffer(
+        id="cheapest",
+        name="Buy 3 get the cheapest free",
+        product_skus=list(range(1, 201)),
+        quantity=3,
+    ),
+]
+
+
+def build_baskets(rng: random.Random) -> list:
+    products = [
+        Product(sku=sku, name=f"P{sku}", price=Money(rng.randint(10, 5_000) / 100))
+        for sku in range(1, SKUS + 1)
+    ]
+    return [
+        Basket(
+            [
+                BasketItem(product=product, qty=rng.randint(1, 4))
+                for product in rng.sample(products[:300], LINES_PER_BASKET)
+            ]
+        )
+        for _ in range(BASKETS)
+    ]
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    baskets = build_baskets(random.Random(0))
+    backends = [False, True] if HAVE_NUMPY else [False]
+    columns = {
+        use_numpy: BasketColumns.from_baskets(baskets, use_numpy=use_numpy)
+        for use_numpy in backends
+    }
+    print(f"{BASKETS} baskets of {LINES_PER_BASKET} lines")
+    print(f"{'offer':>9} {'scalar s':>9} {'python s':>9} {'numpy s':>9}")
+    for offer in OFFERS:
+        start = time.perf_counter()
+        expected = [offer.calculate_discount(basket).minor_units for basket in baskets]
+        timings = [time.perf_counter() - start]
+        for use_numpy in backends:
+            start = time.perf_counter()
+            discounts = offer.batch_discounts(columns[use_numpy])
+            timings.append(time.perf_counter() - start)
+            assert [int(discount) for discount in discounts] == expected
+        cells = " ".join(f"{seconds:>9.3f}" for seconds in timings)
+        print(f"{offer.id:>9} {cells}")
+
+
+if __name__ == "__main__":
+    main()
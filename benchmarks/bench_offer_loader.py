@@ -0,0 +1,88 @@
+"""Benchmark loading and compiling a large offer file.
+
+Writes 100k offers of the three built-in types to a JSONL file and a JSON
+file, then times load_offers on each: parsing, validating every record,
+dropping dominated offers and indexing the rest. Run from the repository
+root:
+
+    python -m benchmarks.bench_offer_loader
+"""
+
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+from src.basket_pricer.offers.offer_loader import load_offers
+
+OFFERS = 100_000
+SKUS = 200_000
+ROUNDS = 3
+
+
+def offer_records(rng: random.Random) -> list:
+    records = []
+    for number in range(OFFERS):
+        kind = number % 3
+        if kind == 0:
+            records.append(
+                {
+                    "type": "percentage",
+                    "id": f"p{number}",
+                    "name": "Percent off",
+                    "sku": rng.randint(1, SKUS),
+                    "percentage": rng.choice([5, 10, 20, 25]),
+                }
+            )
+        elif kind == 1:
+            records.append(
+                {
+                    "type": "buy_x_get_y_free",
+                    "id": f"b{number}",
+                    "name": "Buy X get Y free",
+                    "sku": rng.randint(1, SKUS),
+                    "buy": rng.randint(1, 3),
+                    "free": 1,
+                }
+            )
+        else:
+            records.append(
+                {
+                    "type": "buy_x_get_cheapest_free",
+                    "id": f"c{number}",
+                    "name": "Cheapest free",
+                    "product_skus": rng.sample(range(1, SKUS + 1), 4),
+                    "quantity": 3,
+                }
+            )
+    return records
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    records = offer_records(random.Random(0))
+    with tempfile.TemporaryDirectory() as directory:
+        jsonl = os.path.join(directory, "offers.jsonl")
+        with open(jsonl, "w") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+        document = os.path.join(directory, "offers.json")
+        with open(document, "w") as file:
+            json.dump({"offers": records}, file)
+
+        print(f"{OFFERS} offers, best of {ROUNDS}")
+        for path in (jsonl, document):
+            timings = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                offer_set = load_offers(path)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{os.path.basename(path):>13}: {min(timings):.3f} s, "
+                f"{len(offer_set.active)} active, {len(offer_set.dropped)} dropped"
+            )
+
+
+if __name__ == "__main__":
+    main()
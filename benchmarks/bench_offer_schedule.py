@@ -0,0 +1,111 @@
+"""Benchmark finding the offers live at a moment in a promotion calendar.
+
+Builds a year of promotions, each live for one to four weeks, and compares
+scanning every offer's window with the OfferSchedule interval index. Then
+reprices historical baskets at their transaction times, each priced with
+the offers live when it was made. Run from the repository root:
+
+    python -m benchmarks.bench_offer_schedule
+"""
+
+import logging
+import random
+import time
+
+from benchmarks.bench_catalogue import build_catalogue
+from src.basket_pricer.models import Basket, BasketItem
+from src.basket_pricer.offers import BuyXgetYfree, PercentageOffer
+from src.basket_pricer.offers.offer_schedule import OfferSchedule
+from src.basket_pricer.pricer import BasketPricer
+
+SKUS = 5_000
+OFFERS = 50_000
+LOOKUPS = 200
+BASKETS = 2_000
+LINES_PER_BASKET = 10
+YEAR_START = 1_704_067_200  # 2024-01-01 UTC
+DAY = 86_400
+
+
+def promotion_calendar(rng: random.Random) -> list:
+    offers = []
+    for number in range(OFFERS):
+        starts_at = YEAR_START + rng.randrange(365) * DAY
+        window = {
+            "starts_at": starts_at,
+            "ends_at": starts_at + rng.randint(7, 28) * DAY,
+        }
+        if number % 2:
+            offers.append(
+                PercentageOffer(
+                    id=f"p{number}",
+                    name="Percent off",
+                    sku=rng.randint(1, SKUS),
+                    percentage=rng.choice([5, 10, 20, 25]),
+                    **window,
+                )
+            )
+        else:
+            offers.append(
+                BuyXgetYfree(
+                    id=f"b{number}",
+                    name="Buy get free",
+                    sku=rng.randint(1, SKUS),
+                    buy=rng.randint(2, 4),
+                    free=1,
+                    **window,
+                )
+            )
+    return offers
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(0)
+    offers = promotion_calendar(rng)
+    moments = [YEAR_START + rng.randrange(365 * DAY) for _ in range(LOOKUPS)]
+
+    start = time.perf_counter()
+    schedule = OfferSchedule(offers)
+    print(f"{OFFERS} offers scheduled in {time.perf_counter() - start:.2f} s")
+    start = time.perf_counter()
+    scanned = [[offer for offer in offers if offer.is_live(at)] for at in moments]
+    scan_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    found = [schedule.live_offers(at) for at in moments]
+    schedule_seconds = time.perf_counter() - start
+    assert found == scanned
+    print(
+        f"live offers, {sum(map(len, found)) // LOOKUPS} on average: "
+        f"scan {scan_seconds / LOOKUPS * 1e3:.3f} ms, "
+        f"schedule {schedule_seconds / LOOKUPS * 1e3:.3f} ms per lookup"
+    )
+
+    catalogue = build_catalogue(SKUS)
+    start = time.perf_counter()
+    pricer = BasketPricer(catalogue, offers)
+    print(f"pricer built in {time.perf_counter() - start:.2f} s")
+    # a till log is in time order, each day's offers are compiled once
+    baskets = sorted(
+        (
+            YEAR_START + rng.randrange(365 * DAY),
+            Basket(
+                [
+                    BasketItem(
+                        product=catalogue.fetch_product(sku), qty=rng.randint(1, 6)
+                    )
+                    for sku in rng.sample(range(1, SKUS + 1), LINES_PER_BASKET)
+                ]
+            ),
+        )
+        for _ in range(BASKETS)
+    )
+    start = time.perf_counter()
+    for at, basket in baskets:
+        pricer.calculate(basket, as_of=at)
+    elapsed = time.perf_counter() - start
+    print(f"historical baskets: {elapsed / BASKETS * 1e3:.3f} ms/basket")
+
+
+if __name__ == "__main__":
+    main()
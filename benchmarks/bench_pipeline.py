@@ -0,0 +1,63 @@
+"""Benchmark the till log pipeline on growing logs.
+
+Prices logs of increasing size into a JSONL file and reports throughput
+and the peak memory traced while the pipeline runs, which should stay
+flat as the log grows. Run from the repository root:
+
+    python -m benchmarks.bench_pipeline
+"""
+
+import csv
+import gc
+import os
+import random
+import tempfile
+import tracemalloc
+
+from benchmarks.bench_catalogue import build_catalogue
+from src.basket_pricer.offers import PercentageOffer
+from src.basket_pricer.pricer import BasketPricer
+from src.basket_pricer.pricer.pipeline import open_summary_sink, run_pipeline
+
+SKUS = 10_000
+SIZES = [10_000, 100_000, 300_000]  # baskets
+LINES_PER_BASKET = 5
+
+
+def write_log(path: str, baskets: int) -> None:
+    rng = random.Random(baskets)
+    with open(path, "w", newline="", encoding="utf-8") as stream:
+        writer = csv.writer(stream)
+        writer.writerow(["basket_id", "sku", "qty"])
+        for basket in range(baskets):
+            for _ in range(LINES_PER_BASKET):
+                writer.writerow([basket, rng.randint(1, SKUS), rng.randint(1, 3)])
+
+
+def main() -> None:
+    catalogue = build_catalogue(SKUS)
+    offers = [
+        PercentageOffer(id=f"p{sku}", name=f"10% off {sku}", sku=sku, percentage=10)
+        for sku in range(1, SKUS + 1, 10)
+    ]
+    pricer = BasketPricer(catalogue, offers)
+    print(f"{'baskets':>8} {'log MB':>7} {'peak MB':>8} {'baskets/s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "till.csv")
+        output_path = os.path.join(directory, "results.jsonl")
+        for baskets in SIZES:
+            write_log(log_path, baskets)
+            gc.collect()
+            tracemalloc.start()
+            with open_summary_sink(output_path) as sink:
+                stats = run_pipeline(pricer, log_path, sink)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{baskets:>8} {os.path.getsize(log_path) / 1e6:>7.1f} "
+                f"{peak / 1e6:>8.2f} {stats.baskets_per_second:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark repricing a day of receipts at historical prices.
+
+Compares calculate(as_of=...) over a PriceHistory with rebuilding a
+catalogue of the prices in force for every receipt. Run from the
+repository root:
+
+    python -m benchmarks.bench_price_history
+"""
+
+import random
+import time
+
+from benchmarks.bench_catalogue import build_catalogue
+from src.basket_pricer.models import Basket, BasketItem, Catalogue, PriceHistory
+from src.basket_pricer.pricer import BasketPricer
+
+SKUS = 50_000
+CHANGES_PER_SKU = 20
+RECEIPTS = 5_000
+REBUILT_RECEIPTS = 20  # rebuilding is slow, timed on a few and scaled up
+LINES_PER_RECEIPT = 8
+DAY_START = 1_700_000_000.0
+YEAR = 365 * 24 * 3600.0
+
+
+def build_history(rng: random.Random) -> PriceHistory:
+    history = PriceHistory()
+    for sku in range(1, SKUS + 1):
+        times = range(int(DAY_START - YEAR), int(DAY_START))
+        for at in rng.sample(times, CHANGES_PER_SKU):
+            history.add_change(sku, at, rng.randint(10, 5_000) / 100)
+    return history
+
+
+def build_receipts(catalogue: Catalogue, rng: random.Random) -> list:
+    receipts = []
+    for _ in range(RECEIPTS):
+        basket = Basket()
+        for sku in rng.sample(range(1, SKUS + 1), LINES_PER_RECEIPT):
+            basket.add_item(
+                BasketItem(product=catalogue.fetch_product(sku), qty=rng.randint(1, 3))
+            )
+        receipts.append((DAY_START + rng.uniform(0, 24 * 3600), basket))
+    return receipts
+
+
+def rebuilt_catalogue(catalogue: Catalogue, history: PriceHistory, at: float):
+    return catalogue.with_changes(
+        prices={sku: history.price_at(sku, at) for sku in range(1, SKUS + 1)}
+    )
+
+
+def main() -> None:
+    rng = random.Random(0)
+    catalogue = build_catalogue(SKUS)
+    history = build_history(rng)
+    catalogue.set_price_history(history)
+    receipts = build_receipts(catalogue, rng)
+    pricer = BasketPricer(catalogue, [])
+    print(f"{SKUS} skus, {CHANGES_PER_SKU} changes each, {RECEIPTS} receipts")
+
+    start = time.perf_counter()
+    for at, basket in receipts:
+        pricer.calculate(basket, as_of=at)
+    as_of_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for at, basket in receipts[:REBUILT_RECEIPTS]:
+        BasketPricer(rebuilt_catalogue(catalogue, history, at), []).calculate(basket)
+    rebuild_seconds = (time.perf_counter() - start) * RECEIPTS / REBUILT_RECEIPTS
+
+    print(f"{'as_of':>8}: {as_of_seconds:8.2f} s")
+    print(f"{'rebuild':>8}: {rebuild_seconds:8.2f} s (estimated)")
+
+
+if __name__ == "__main__":
+    main()
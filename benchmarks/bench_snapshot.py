@@ -0,0 +1,96 @@
+"""Benchmark worker start up from a CSV catalogue and from a mapped snapshot.
+
+Starts WORKERS processes side by side. Each one loads the catalogue (a
+dict of Products from CSV, or a memory mapped snapshot), prices every sku
+once and reports its start up time, RSS and PSS (resident memory with
+shared pages split between the processes mapping them, Linux only).
+Run from the repository root:
+
+    python -m benchmarks.bench_snapshot
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_catalogue_load import write_catalogue
+from src.basket_pricer.models import (
+    Catalogue,
+    open_catalogue_snapshot,
+    write_catalogue_snapshot,
+)
+
+ROWS = 1_000_000
+WORKERS = 4
+LOADERS = {"csv": Catalogue.load, "snapshot": open_catalogue_snapshot}
+
+
+def memory_kb() -> dict:
+    """Rss and Pss of this process in kB, empty where /proc is not available"""
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as stream:
+            fields = dict(line.split(":", 1) for line in stream if ":" in line)
+    except OSError:
+        return {}
+    return {key: int(fields[key].split()[0]) for key in ("Rss", "Pss")}
+
+
+def worker(kind: str, path: str) -> None:
+    start = time.perf_counter()
+    catalogue = LOADERS[kind](path)
+    loaded = time.perf_counter() - start
+    for sku in range(1, ROWS + 1):
+        catalogue.fetch_price(sku)
+    print(f"{loaded:.3f}", flush=True)
+    sys.stdin.readline()  # measured once every worker holds its catalogue
+    memory = memory_kb()
+    print(memory.get("Rss", 0), memory.get("Pss", 0), flush=True)
+
+
+def run_workers(kind: str, path: str) -> None:
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_snapshot", kind, path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(WORKERS)
+    ]
+    start_times = [float(process.stdout.readline()) for process in workers]
+    for process in workers:
+        process.stdin.write("\n")
+        process.stdin.flush()
+    memory = [process.stdout.readline().split() for process in workers]
+    for process in workers:
+        process.wait()
+    rss = sum(int(rss) for rss, _ in memory) / WORKERS / 1024
+    pss = sum(int(pss) for _, pss in memory) / WORKERS / 1024
+    print(
+        f"{kind:>9}: load {max(start_times) * 1000:8.1f} ms, "
+        f"per worker RSS {rss:7.1f} MB, PSS {pss:7.1f} MB"
+    )
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "catalogue.csv")
+        snapshot_path = os.path.join(directory, "catalogue.snap")
+        write_catalogue(csv_path, ROWS)
+        write_catalogue_snapshot(Catalogue.load(csv_path), snapshot_path)
+        print(
+            f"{ROWS} products, {WORKERS} workers, CSV "
+            f"{os.path.getsize(csv_path) / 1e6:.1f} MB, snapshot "
+            f"{os.path.getsize(snapshot_path) / 1e6:.1f} MB"
+        )
+        run_workers("csv", csv_path)
+        run_workers("snapshot", snapshot_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        worker(sys.argv[1], sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,78 @@
+"""Benchmark memory of per-store catalogues over a shared base.
+
+Compares a full Catalogue per store with StoreCatalogues layers holding
+only each store's overrides, and the lookup cost of both. Run from the
+repository root:
+
+    python -m benchmarks.bench_store_catalogues
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_catalogue import build_catalogue
+from src.basket_pricer.models import Catalogue, Money, StoreCatalogues
+
+BASE_SKUS = 20_000
+STORES = 900
+OVERRIDES = 300
+LOOKUPS = 100_000
+
+
+def store_overrides(store: int) -> dict:
+    rng = random.Random(store)
+    return {
+        sku: Money.from_minor_units(rng.randint(10, 5_000))
+        for sku in rng.sample(range(1, BASE_SKUS + 1), OVERRIDES)
+    }
+
+
+def full_copies(base: Catalogue) -> list:
+    """A whole catalogue per store, the overrides applied to each copy"""
+    return [base.with_changes(prices=store_overrides(store)) for store in range(STORES)]
+
+
+def layered(base: Catalogue) -> StoreCatalogues:
+    return StoreCatalogues(
+        base, {store: store_overrides(store) for store in range(STORES)}
+    )
+
+
+def retained_bytes(build, base: Catalogue) -> int:
+    gc.collect()
+    tracemalloc.start()
+    stores = build(base)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del stores
+    return retained
+
+
+def time_lookups(catalogue: Catalogue, skus: list) -> float:
+    start = time.perf_counter()
+    for sku in skus:
+        catalogue.fetch_price(sku)
+    return (time.perf_counter() - start) / len(skus)
+
+
+def main() -> None:
+    base = build_catalogue(BASE_SKUS)
+    print(f"{BASE_SKUS} base skus, {STORES} stores, {OVERRIDES} overrides each")
+    copies_bytes = retained_bytes(full_copies, base)
+    layered_bytes = retained_bytes(layered, base)
+    print(f"{'full copies':>12}: {copies_bytes / STORES / 1024:8.1f} KB per store")
+    print(f"{'layered':>12}: {layered_bytes / STORES / 1024:8.1f} KB per store")
+
+    sample = random.Random(0).choices(range(1, BASE_SKUS + 1), k=LOOKUPS)
+    copy = base.with_changes(prices=store_overrides(0))
+    layer = layered(base).catalogue(0)
+    print(
+        f"lookup: copy {time_lookups(copy, sample) * 1e6:.3f} us, "
+        f"layered {time_lookups(layer, sample) * 1e6:.3f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
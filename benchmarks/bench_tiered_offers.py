@@ -0,0 +1,72 @@
+"""Benchmark spend threshold and tiered quantity offers as tiers are added.
+
+Each offer covers a group of skus and finds its tier by binary search over
+thresholds computed when it is created, after one pass over the basket,
+so the time per basket should barely move from one tier to a thousand.
+Run from the repository root:
+
+    python -m benchmarks.bench_tiered_offers
+"""
+
+import logging
+import random
+import time
+
+from src.basket_pricer.models import Basket, BasketItem, Money, Product
+from src.basket_pricer.offers import SpendThresholdOffer, TieredQuantityOffer
+
+SKUS = 200
+GROUP = list(range(1, 51))
+BASKETS = 5_000
+LINES_PER_BASKET = 20
+
+
+def build_baskets(rng: random.Random) -> list:
+    products = [
+        Product(sku=sku, name=f"P{sku}", price=Money(rng.randint(50, 2_000) / 100))
+        for sku in range(1, SKUS + 1)
+    ]
+    return [
+        Basket(
+            [
+                BasketItem(product=product, qty=rng.randint(1, 5))
+                for product in rng.sample(products, LINES_PER_BASKET)
+            ]
+        )
+        for _ in range(BASKETS)
+    ]
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    baskets = build_baskets(random.Random(0))
+    print(f"{BASKETS} baskets of {LINES_PER_BASKET} lines, µs per basket")
+    print(f"{'tiers':>6} {'spend':>8} {'tiered':>8}")
+    for tiers in (1, 10, 100, 1_000):
+        offers = [
+            SpendThresholdOffer(
+                id="spend",
+                name="Spend and save",
+                product_skus=GROUP,
+                thresholds=[f"{5 * (tier + 1)}.00" for tier in range(tiers)],
+                savings=[f"{tier + 1}.00" for tier in range(tiers)],
+            ),
+            TieredQuantityOffer(
+                id="tiered",
+                name="Buy more save more",
+                product_skus=GROUP,
+                quantities=[tier + 2 for tier in range(tiers)],
+                percentages=[5 + 90 * tier / tiers for tier in range(tiers)],
+            ),
+        ]
+        timings = []
+        for offer in offers:
+            start = time.perf_counter()
+            for basket in baskets:
+                offer.evaluate(basket)
+            timings.append((time.perf_counter() - start) / BASKETS * 1e6)
+        print(f"{tiers:>6} {timings[0]:>8.2f} {timings[1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,27 @@
-from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
+import argparse
+import logging
+import sys
+
+from src.basket_pricer.models import (
+    Basket,
+    BasketItem,
+    Catalogue,
+    Money,
+    Product,
+    load_snapshot_offers,
+    open_catalogue_snapshot,
+)
 from src.basket_pricer.offers import (
     BuyXGetCheapestFreeOffer,
     BuyXgetYfree,
     PercentageOffer,
 )
+from src.basket_pricer.offers.offer_loader import load_offers
 from src.basket_pricer.pricer.basket_pricer import BasketPricer
+from src.basket_pricer.pricer.pipeline import open_summary_sink, run_pipeline
 
 
-def main():
+def demo():
     pro1 = Product(sku=1, name="Baked Beans", price=Money("0.99"))
     pro2 = Product(sku=2, name="Biscuits", price=Money("1.20"))
     pro3 = Product(sku=3, name="Sardines", price=Money("1.89"))
@@ -42,5 +56,66 @@ def main():
     print(summary)
 
 
+def price_log(args: argparse.Namespace) -> None:
+    """Price every basket of a till log into a JSONL or CSV file"""
+    offers = []
+    if args.catalogue.endswith(".snap"):
+        catalogue = open_catalogue_snapshot(args.catalogue)
+        offers = load_snapshot_offers(catalogue) or []
+    else:
+        catalogue_format = "jsonl" if args.catalogue.endswith(".jsonl") else "csv"
+        catalogue = Catalogue.load(args.catalogue, format=catalogue_format)
+    if args.offers:
+        offers = load_offers(args.offers)
+    pricer = BasketPricer(catalogue=catalogue, offers=offers)
+
+    with open_summary_sink(args.output, format=args.output_format) as sink:
+        stats = run_pipeline(
+            pricer,
+            args.log,
+            sink,
+            format=args.log_format,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            progress_every=args.progress_every,
+            on_progress=lambda stats: print(stats, file=sys.stderr),
+        )
+    print(stats, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Basket pricer")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("demo", help="price the example basket (default)")
+    price = commands.add_parser("price-log", help="price a till log")
+    price.add_argument(
+        "--catalogue",
+        required=True,
+        help="catalogue CSV/JSONL, or a .snap snapshot (its offers are used)",
+    )
+    price.add_argument(
+        "--offers", help="offer file, JSON or JSONL, used instead of snapshot offers"
+    )
+    price.add_argument(
+        "--log",
+        required=True,
+        help="till log of basket_id,sku,qty lines, the lines of a basket together; "
+        "lines of a basket id after other baskets are priced as another basket",
+    )
+    price.add_argument("--log-format", choices=["csv", "jsonl"], default="csv")
+    price.add_argument("--output", required=True, help="file the results go to")
+    price.add_argument("--output-format", choices=["jsonl", "csv"], default="jsonl")
+    price.add_argument("--workers", type=int, default=None)
+    price.add_argument("--chunksize", type=int, default=256)
+    price.add_argument("--progress-every", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "price-log":
+        logging.basicConfig(level=logging.WARNING)
+        price_log(args)
+    else:
+        demo()
+
+
 if __name__ == "__main__":
     main()
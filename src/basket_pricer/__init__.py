@@ -1,17 +1,39 @@
-from .models import Basket, BasketItem, Catalogue, Money, Product
+from .models import (
+    Basket,
+    BasketItem,
+    Catalogue,
+    ColumnarCatalogue,
+    CompactBasket,
+    LayeredCatalogue,
+    Money,
+    MoneyAccumulator,
+    Product,
+    StoreCatalogues,
+)
+from .offers.bundle_offer import BundleOffer
 from .offers.buy_x_get_cheapest_free_offer import BuyXGetCheapestFreeOffer
 from .offers.buy_x_get_y_free import BuyXgetYfree
 from .offers.percentage_discount import PercentageOffer
+from .offers.spend_threshold_offer import SpendThresholdOffer
+from .offers.tiered_quantity_offer import TieredQuantityOffer
 from .pricer.basket_pricer import BasketPricer
 
 __all__ = [
     "Basket",
     "BasketItem",
     "Catalogue",
+    "ColumnarCatalogue",
+    "CompactBasket",
+    "LayeredCatalogue",
+    "StoreCatalogues",
     "Money",
+    "MoneyAccumulator",
     "Product",
     "BasketPricer",
     "PercentageOffer",
     "BuyXgetYfree",
     "BuyXGetCheapestFreeOffer",
+    "SpendThresholdOffer",
+    "TieredQuantityOffer",
+    "BundleOffer",
 ]
@@ -1,7 +1,31 @@
 from .basket import Basket
 from .basket_item import BasketItem
 from .catalogue import Catalogue
-from .money import Money
+from .catalogue_snapshot import (
+    load_snapshot_offers,
+    open_catalogue_snapshot,
+    write_catalogue_snapshot,
+)
+from .columnar_catalogue import ColumnarCatalogue
+from .compact_basket import CompactBasket
+from .layered_catalogue import LayeredCatalogue, StoreCatalogues
+from .money import Money, MoneyAccumulator
+from .price_history import PriceHistory
 from .product import Product
 
-__all__ = ["Money", "Product", "BasketItem", "Basket", "Catalogue"]
+__all__ = [
+    "Money",
+    "MoneyAccumulator",
+    "Product",
+    "BasketItem",
+    "Basket",
+    "CompactBasket",
+    "Catalogue",
+    "ColumnarCatalogue",
+    "LayeredCatalogue",
+    "StoreCatalogues",
+    "PriceHistory",
+    "write_catalogue_snapshot",
+    "open_catalogue_snapshot",
+    "load_snapshot_offers",
+]
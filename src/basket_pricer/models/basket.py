@@ -1,5 +1,7 @@
 import logging
-from typing import Dict, Optional
+from typing import Dict, FrozenSet, Optional, Set
+
+from src.basket_pricer.utils.exceptions import InvalidBasketError
 
 from .basket_item import BasketItem
 
@@ -10,6 +12,8 @@ class Basket:
 
     def __init__(self, items: Optional[list[BasketItem]] = None):
         self._items: Dict[int, BasketItem] = {}  # [{sku, BasketItem}]
+        # skus added, removed or re-quantified since the last pop_changed_skus()
+        self._changed_skus: Set[int] = set()
         if items:
             for item in items:
                 self.add_item(item)
@@ -24,6 +28,7 @@ class Basket:
         if basket_item.qty <= 0:
             logger.error("Product quantity must be greater than 0")
             raise ValueError("Quantity must be positive and greater than 0")
+        self._changed_skus.add(basket_item.product.sku)
         if basket_item.product.sku in self._items:
             new_qty = self._items[basket_item.product.sku].qty + basket_item.qty
             self._items[basket_item.product.sku] = BasketItem(
@@ -41,6 +46,51 @@ class Basket:
             f"Added '{basket_item.product.name}'; total {len(self._items)} distinct products"
         )
 
+    def remove_item(self, sku: int, qty: Optional[int] = None) -> None:
+        """Remove qty units of the sku, or the whole line when qty is None"""
+        basket_item = self._items.get(sku)
+        if basket_item is None:
+            logger.error(f"Sku {sku} is not present in the basket")
+            raise InvalidBasketError(f"Sku {sku} is not present in the basket")
+        if qty is None:
+            qty = basket_item.qty
+        if qty <= 0:
+            raise ValueError("Quantity must be positive and greater than 0")
+        if qty > basket_item.qty:
+            raise ValueError(
+                f"Cannot remove {qty} items of sku {sku}, "
+                f"only {basket_item.qty} present"
+            )
+        self.set_quantity(sku, basket_item.qty - qty)
+
+    def set_quantity(self, sku: int, qty: int) -> None:
+        """Set the quantity of a sku already in the basket, 0 removes the line"""
+        basket_item = self._items.get(sku)
+        if basket_item is None:
+            logger.error(f"Sku {sku} is not present in the basket")
+            raise InvalidBasketError(f"Sku {sku} is not present in the basket")
+        if qty < 0:
+            raise ValueError(f"Quantity cannot be negative, got {qty}")
+        if qty == basket_item.qty:
+            return
+        self._changed_skus.add(sku)
+        if qty == 0:
+            del self._items[sku]
+            logger.info(f"item with sku {sku} removed from the basket")
+        else:
+            self._items[sku] = BasketItem(product=basket_item.product, qty=qty)
+            logger.info(f"quantity of sku {sku} set to {qty}")
+
+    def changed_skus(self) -> FrozenSet[int]:
+        """Skus changed through the basket API since the last pop_changed_skus()"""
+        return frozenset(self._changed_skus)
+
+    def pop_changed_skus(self) -> FrozenSet[int]:
+        """Return the changed skus and start tracking afresh"""
+        changed = frozenset(self._changed_skus)
+        self._changed_skus.clear()
+        return changed
+
     def get_items_list(self):
         return self._items
 
@@ -60,6 +110,12 @@ class Basket:
         basket_item = self._items.get(sku, None)
         return basket_item.qty
 
+    def fingerprint(self) -> frozenset:
+        """Order independent identity of the basket contents (sku -> qty)"""
+        return frozenset(
+            (sku, basket_item.qty) for sku, basket_item in self._items.items()
+        )
+
     def is_empty(self):
         return len(self._items) == 0
 
@@ -1,24 +1,246 @@
+import itertools
 import logging
-from typing import Dict, Optional
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 from src.basket_pricer.utils.exceptions import CatalogueError
 
+from .catalogue_loader import (
+    DEFAULT_CHUNK_SIZE,
+    CatalogueSource,
+    read_catalogue_columns,
+)
 from .money import Money
+from .price_history import PriceHistory, Timestamp
 from .product import Product
 
 logger = logging.getLogger(__name__)
 
+# Process wide counter, so a version number identifies one catalogue state
+_catalogue_versions = itertools.count(1)
+
+
+PriceValue = Union[int, str, float, Decimal, Money]
+
+# a version's changes are kept in layers over the product dict it shares,
+# newest first and never changed once shared. A batch adds a layer and merges
+# it into the layers below no bigger than LAYER_RATIO times it, so a change
+# is copied O(log changes) times and a lookup probes O(log changes) dicts.
+# Once the changes outgrow a FOLD_SHARE of the shared dict (or
+# MIN_FOLD_CHANGES) they are folded into a new dict, O(catalogue) once per
+# that many changes
+LAYER_RATIO = 4
+FOLD_SHARE = 4
+MIN_FOLD_CHANGES = 1024
+_UNCHANGED = object()
+
+Layers = Tuple[Dict[int, Optional[Product]], ...]
+
+
+class _SharedProducts:
+    """sku -> Product dict shared by catalogue versions, never changed once
+    shared, with its price table built the first time one is needed"""
+
+    __slots__ = ("products", "_prices")
+
+    def __init__(self, products: Dict[int, Product]) -> None:
+        self.products = products
+        self._prices: Optional[Dict[int, Money]] = None
+
+    def prices(self) -> Dict[int, Money]:
+        if self._prices is None:
+            self._prices = {
+                sku: product.price for sku, product in self.products.items()
+            }
+        return self._prices
+
+
+def _layered_get(layers: Layers, sku: int):
+    """Product of the newest layer that changed the sku, None when it was
+    removed, _UNCHANGED when no layer touched it"""
+    for layer in layers:
+        product = layer.get(sku, _UNCHANGED)
+        if product is not _UNCHANGED:
+            return product
+    return _UNCHANGED
+
+
+def _layered_skus(layers: Layers, base: Mapping) -> Iterator[int]:
+    """Skus of the base not removed by the layers, then the ones they add"""
+    if len(layers) == 1:
+        changes = layers[0]
+        for sku in base:
+            if changes.get(sku, _UNCHANGED) is not None:
+                yield sku
+        for sku, product in changes.items():
+            if product is not None and sku not in base:
+                yield sku
+        return
+    for sku in base:
+        if _layered_get(layers, sku) is not None:
+            yield sku
+    seen = set()
+    for layer in layers:
+        for sku, product in layer.items():
+            if sku not in seen and sku not in base:
+                seen.add(sku)
+                if product is not None:
+                    yield sku
+
+
+class _ProductTable(Mapping):
+    """sku -> Product of one catalogue version: layers of its changes, None
+    for a removed sku, over the products it shares with other versions"""
+
+    __slots__ = ("_shared", "_layers", "_owned", "_size")
+
+    def __init__(self, shared: _SharedProducts, layers: Layers, size: int) -> None:
+        self._shared = shared
+        self._layers = layers
+        # whether the newest layer is this table's alone, to add products to
+        self._owned = False
+        self._size = size
+
+    def get(self, sku: int, default=None) -> Optional[Product]:
+        for layer in self._layers:  # inlined _layered_get, a hot path
+            product = layer.get(sku, _UNCHANGED)
+            if product is not _UNCHANGED:
+                return default if product is None else product
+        return self._shared.products.get(sku, default)
+
+    def __getitem__(self, sku: int) -> Product:
+        product = self.get(sku)
+        if product is None:
+            raise KeyError(sku)
+        return product
+
+    def __setitem__(self, sku: int, product: Product) -> None:
+        if sku not in self:
+            self._size += 1
+        if not self._owned:
+            self._layers = _merged(({},) + self._layers)
+            self._owned = True
+        self._layers[0][sku] = product
+
+    def __contains__(self, sku: object) -> bool:
+        return self.get(sku) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return _layered_skus(self._layers, self._shared.products)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def changed(
+        self, changes: Dict[int, Optional[Product]], size: int
+    ) -> Union["_ProductTable", Dict[int, Product]]:
+        """Table of the next version, its changes layered over this one's, or
+        folded into a plain dict once they have outgrown the shared products"""
+        self._owned = False
+        table = _ProductTable(self._shared, _merged((changes,) + self._layers), size)
+        limit = max(len(self._shared.products) // FOLD_SHARE, MIN_FOLD_CHANGES)
+        if sum(len(layer) for layer in table._layers) > limit:
+            return dict(table.items())
+        return table
+
+    def prices(self) -> Mapping:
+        """sku -> price view over the layers and the shared price table"""
+        self._owned = False  # later additions go to a layer of their own
+        return _TablePrices(self._shared.prices(), self._layers, self._size)
+
+
+def _merged(layers: Layers) -> Layers:
+    """Layers with the newest merged into the ones below no bigger than
+    LAYER_RATIO times it, copying them as they may be shared"""
+    while len(layers) > 1 and len(layers[1]) <= LAYER_RATIO * len(layers[0]):
+        merged = dict(layers[1])
+        merged.update(layers[0])
+        layers = (merged,) + layers[2:]
+    return layers
+
+
+class _TablePrices(Mapping):
+    """sku -> price of a _ProductTable, sharing the price table it builds on"""
+
+    __slots__ = ("_base", "_layers", "_size")
+
+    def __init__(self, base: Dict[int, Money], layers: Layers, size: int) -> None:
+        self._base = base
+        self._layers = layers
+        self._size = size
+
+    def get(self, sku: int, default=None) -> Optional[Money]:
+        for layer in self._layers:  # inlined _layered_get, a hot path
+            product = layer.get(sku, _UNCHANGED)
+            if product is not _UNCHANGED:
+                return default if product is None else product.price
+        return self._base.get(sku, default)
+
+    def __getitem__(self, sku: int) -> Money:
+        price = self.get(sku)
+        if price is None:
+            raise KeyError(sku)
+        return price
+
+    def __contains__(self, sku: object) -> bool:
+        return self.get(sku) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return _layered_skus(self._layers, self._base)
+
+    def __len__(self) -> int:
+        return self._size
+
 
 class Catalogue:
 
     def __init__(self, products: Optional[list[Product]] = None):
-        self._products: Dict[int, Product] = {}  # [{sku, Product}]
+        # sku -> Product, a dict or a _ProductTable once versions share it
+        self._products: Mapping = {}
+        self.version: int = next(_catalogue_versions)
+        # earlier prices, for fetch_price(sku, at=...) and calculate(as_of=...)
+        self.price_history: Optional[PriceHistory] = None
 
         if products:
             for product in products:
                 self.add_product(product=product)
         logger.debug(f"Catalogue with {len(self._products)} products created.")
 
+    @classmethod
+    def load(
+        cls,
+        source: CatalogueSource,
+        format: str = "csv",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> "Catalogue":
+        """
+        Build a catalogue from a CSV (sku,name,price header) or JSONL file,
+        given as a path or a text stream. Rows are validated in bulk and
+        every bad row is reported in one CatalogueLoadError.
+        """
+        columns = read_catalogue_columns(source, format=format, chunk_size=chunk_size)
+        catalogue = cls._from_valid_columns(columns.skus, columns.prices, columns.names)
+        logger.info(f"Loaded {len(columns)} products into the catalogue")
+        return catalogue
+
+    @classmethod
+    def _from_valid_columns(
+        cls, skus: Sequence[int], prices: Sequence[int], names: Sequence[str]
+    ) -> "Catalogue":
+        """Catalogue from already validated columns, prices in minor units"""
+        catalogue = cls()
+        # one shared Money per price, products built without per-object checks
+        money = {
+            price: Money.intern(Money.from_minor_units(price)) for price in set(prices)
+        }
+        catalogue._products = {
+            sku: Product.trusted(sku, name, money[price])
+            for sku, price, name in zip(skus, prices, names)
+        }
+        catalogue.version = next(_catalogue_versions)
+        return catalogue
+
     def add_product(self, product: Product):
         if not isinstance(product, Product):
             raise TypeError(f"Expected product type, but got {type(product).__name__}")
@@ -30,18 +252,132 @@ class Catalogue:
             )
 
         self._products[product.sku] = product
+        self.version = next(_catalogue_versions)  # anything compiled from it is stale
         logger.info(f"Product '{product.name}' is added to the catalogue")
 
-    def fetch_price(self, sku: int) -> Money:
+    def with_changes(
+        self,
+        prices: Optional[Mapping[int, PriceValue]] = None,
+        added: Iterable[Product] = (),
+        removed: Iterable[int] = (),
+    ) -> "Catalogue":
+        """
+        New catalogue version with a batch of price changes, new products and
+        removed skus applied. This catalogue is left untouched, so pricing
+        already running on it is unaffected; unchanged products are shared,
+        not copied, so a batch costs O(changes log changes) amortised and not
+        O(catalogue).
+        """
+        prices, added, removed = _checked_changes(self, prices, added, removed)
+        table = self._products
+        if not isinstance(table, _ProductTable):
+            # the dict is shared from now on, this version keeps its own
+            # later additions in a layer of its own too
+            table = _ProductTable(_SharedProducts(table), (), len(table))
+            self._products = table
+        changes: Dict[int, Optional[Product]] = {}
+        size = len(table)
+        for sku in removed:
+            changes[sku] = None
+            size -= 1
+        for sku, price in prices.items():
+            changes[sku] = Product.trusted(sku, table[sku].name, price)
+        for product in added:
+            changes[product.sku] = product
+            size += 1
+        products = table.changed(changes, size)
+
+        catalogue = type(self)()
+        catalogue._products = products
+        catalogue.price_history = self.price_history
+        logger.info(
+            f"Catalogue version {catalogue.version} from {self.version}: "
+            f"{len(prices)} prices changed, {len(added)} added, {len(removed)} removed"
+        )
+        return catalogue
+
+    def set_price_history(self, history: Optional[PriceHistory]) -> None:
+        """Attach the price changes used for lookups at an earlier time"""
+        if history is not None and not isinstance(history, PriceHistory):
+            raise TypeError(
+                f"history must be PriceHistory, got {type(history).__name__}"
+            )
+        self.price_history = history
+        self.version = next(_catalogue_versions)  # anything compiled from it is stale
+        logger.info("Price history attached to the catalogue")
+
+    def fetch_price(self, sku: int, at: Optional[Timestamp] = None) -> Money:
+        if at is not None:
+            return self._price_at(sku, at)
         if sku not in self._products:
             logger.error(f"Product with sku {sku} not found in the catalogue")
             raise ValueError(f"Sku {sku} not found in catalogue")
         return self._products[sku].price
 
+    def _price_at(self, sku: int, at: Timestamp) -> Money:
+        """Price in force at the moment, from the history when it has the sku"""
+        history = self.price_history
+        if history is None or not history.has_history(sku):
+            return self.fetch_price(sku)
+        price = history.price_at(sku, at)
+        if price is None:
+            logger.error(f"No price known for sku {sku} at {at}")
+            raise CatalogueError(f"No price known for sku {sku} at {at}")
+        return price
+
+    def fetch_product(self, sku: int) -> Product:
+        if sku not in self._products:
+            logger.error(f"Product with sku {sku} not found in the catalogue")
+            raise ValueError(f"Sku {sku} not found in catalogue")
+        return self._products[sku]
+
     def has_product(self, sku: int) -> bool:
         return sku in self._products
 
+    def price_table(self) -> Mapping[int, Money]:
+        """Snapshot of sku -> price, for pricing without per-sku catalogue calls"""
+        if isinstance(self._products, _ProductTable):
+            return self._products.prices()  # the shared prices are not copied
+        return {sku: product.price for sku, product in self._products.items()}
+
+    def __len__(self) -> int:
+        return len(self._products)
+
     def __str__(self):
         if not self._products:
             return "Catalogue(empty)"
         return f"Catalogue : {len(self._products)} Products"
+
+
+def _checked_changes(
+    catalogue: Catalogue,
+    prices: Optional[Mapping[int, PriceValue]],
+    added: Iterable[Product],
+    removed: Iterable[int],
+) -> Tuple[Dict[int, Money], List[Product], List[int]]:
+    """Validate a batch of changes as a whole before any of it is applied"""
+    removed = list(dict.fromkeys(removed))
+    added = list(added)
+    changed: Dict[int, Money] = {}
+    for sku in removed:
+        if not catalogue.has_product(sku):
+            raise CatalogueError(f"Cannot remove sku {sku}, not in the catalogue")
+    for sku, price in (prices or {}).items():
+        if not catalogue.has_product(sku) or sku in removed:
+            raise CatalogueError(
+                f"Cannot change the price of sku {sku}, not in the catalogue"
+            )
+        price = price if isinstance(price, Money) else Money(amount=price)
+        if not price.is_positive():
+            raise ValueError(f"Price must be positive: sku {sku}")
+        changed[sku] = Money.intern(price)
+    skus = set()
+    for product in added:
+        if not isinstance(product, Product):
+            raise TypeError(f"Expected product type, but got {type(product).__name__}")
+        if product.sku in skus or (
+            catalogue.has_product(product.sku) and product.sku not in removed
+        ):
+            raise CatalogueError(f"SKU {product.sku} is already present in Catalogue")
+        skus.add(product.sku)
+    return changed, added, removed
@@ -0,0 +1,122 @@
+import logging
+from array import array
+from itertools import islice
+from typing import Dict, List, Set, Tuple
+
+from src.basket_pricer.utils.exceptions import CatalogueLoadError
+from src.basket_pricer.utils.records import (
+    RECORD_FORMATS,
+    Record,
+    RecordSource,
+    open_source,
+    read_records,
+)
+
+from .money import Money
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50_000  # rows parsed and validated together
+# catalogues repeat a few thousand price strings, each is parsed once per load
+MAX_CACHED_PRICES = 65_536
+CATALOGUE_FIELDS = ("sku", "name", "price")
+
+CatalogueSource = RecordSource
+
+
+class CatalogueColumns:
+    """Validated catalogue rows as columns, in file order"""
+
+    def __init__(self) -> None:
+        self.skus = array("q")
+        self.prices = array("q")  # minor units
+        self.names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+
+def _validate_chunk(
+    chunk: List[Record],
+    columns: CatalogueColumns,
+    seen: Set[int],
+    errors: List[Tuple[int, str]],
+    parsed_prices: Dict[object, int],
+) -> None:
+    """Append the good rows of a chunk to the columns, record the bad ones"""
+    # bound once, this loop runs for every row of the file
+    add_sku, add_price = columns.skus.append, columns.prices.append
+    add_name, add_seen = columns.names.append, seen.add
+    for line_number, problem, raw_sku, name, raw_price in chunk:
+        if problem is not None:
+            errors.append((line_number, problem))
+            continue
+        try:
+            if isinstance(raw_sku, bool) or not isinstance(raw_sku, (int, str)):
+                raise TypeError(raw_sku)
+            sku = int(raw_sku)
+        except (TypeError, ValueError):
+            errors.append((line_number, f"sku {raw_sku!r} is not a whole number"))
+            continue
+        if sku <= 0:
+            errors.append((line_number, f"sku {sku} must be positive"))
+            continue
+        if sku in seen:
+            errors.append((line_number, f"duplicate sku {sku}"))
+            continue
+        if not isinstance(name, str) or not name.strip():
+            errors.append((line_number, f"sku {sku} has no name"))
+            continue
+        price = parsed_prices.get(raw_price) if isinstance(raw_price, str) else None
+        if price is None:
+            try:
+                price = Money.to_minor_units(raw_price)
+            except (TypeError, ValueError):
+                errors.append(
+                    (line_number, f"sku {sku} has invalid price {raw_price!r}")
+                )
+                continue
+            if isinstance(raw_price, str) and len(parsed_prices) < MAX_CACHED_PRICES:
+                parsed_prices[raw_price] = price
+        if price <= 0:
+            errors.append((line_number, f"sku {sku} price must be positive"))
+            continue
+        add_seen(sku)
+        add_sku(sku)
+        add_price(price)
+        add_name(name)
+
+
+def read_catalogue_columns(
+    source: CatalogueSource,
+    format: str = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> CatalogueColumns:
+    """
+    Read sku, name and price rows from a CSV (with a header) or JSONL file,
+    given as a path or an open text stream. The file is read chunk by chunk
+    and every bad row is collected, so all of them are reported together in
+    one CatalogueLoadError.
+    """
+    if format not in RECORD_FORMATS:
+        raise ValueError(f"Unknown catalogue format {format!r}, use 'csv' or 'jsonl'")
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    columns = CatalogueColumns()
+    seen: Set[int] = set()
+    errors: List[Tuple[int, str]] = []
+    parsed_prices: Dict[object, int] = {}
+    with open_source(source) as stream:
+        records = read_records(stream, format, CATALOGUE_FIELDS)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            _validate_chunk(chunk, columns, seen, errors, parsed_prices)
+
+    if errors:
+        logger.error(f"{len(errors)} invalid rows while loading the catalogue")
+        raise CatalogueLoadError(errors)
+    logger.debug(f"Read {len(columns)} catalogue rows")
+    return columns
@@ -0,0 +1,219 @@
+import logging
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.basket_pricer.utils.exceptions import CatalogueError
+
+from .catalogue import Catalogue, _catalogue_versions
+from .columnar_catalogue import (
+    OFFSET_TYPECODE,
+    PRICE_TYPECODE,
+    SKU_TYPECODE,
+    ColumnarCatalogue,
+    _Columns,
+)
+from .layered_catalogue import LayeredCatalogue
+
+logger = logging.getLogger(__name__)
+
+# Snapshot layout, every section starting on an 8 byte boundary:
+#   header   magic, format version, byte order, rows, names size,
+#            offers offset and size (0 when no offers were saved)
+#   skus     int64[rows], sorted
+#   prices   uint32[rows], minor units
+#   offsets  uint32[rows + 1], byte offsets into names
+#   names    UTF-8
+#   offers   pickled tuple of offers, optional
+SNAPSHOT_MAGIC = b"BPCATSNP"
+SNAPSHOT_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQQ")
+_BYTE_ORDERS = {"little": 1, "big": 2}
+
+
+def _aligned(position: int) -> int:
+    return (position + 7) & ~7
+
+
+def _section_starts(rows: int, names_size: int) -> Tuple[int, int, int, int, int]:
+    """Start of the skus, prices, offsets and names sections, and their end"""
+    skus = _aligned(_HEADER.size)
+    prices = _aligned(skus + rows * array(SKU_TYPECODE).itemsize)
+    offsets = _aligned(prices + rows * array(PRICE_TYPECODE).itemsize)
+    names = _aligned(offsets + (rows + 1) * array(OFFSET_TYPECODE).itemsize)
+    return skus, prices, offsets, names, _aligned(names + names_size)
+
+
+class _MappedColumns(_Columns):
+    """Columns read straight from the pages of a mapped snapshot file.
+
+    Every process mapping the same file shares one physical copy. Pickling
+    sends the path, so a worker maps the file again instead of copying it.
+    """
+
+    __slots__ = ("path", "mapping", "offers_at")
+
+    @classmethod
+    def open(cls, path: str) -> "_MappedColumns":
+        with open(path, "rb") as stream:
+            if os.fstat(stream.fileno()).st_size < _HEADER.size:
+                raise CatalogueError(f"{path} is not a catalogue snapshot")
+            mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byte_order, rows, names_size, offers_at, offers_size = (
+            _HEADER.unpack_from(mapping)
+        )
+        if magic != SNAPSHOT_MAGIC:
+            raise CatalogueError(f"{path} is not a catalogue snapshot")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise CatalogueError(
+                f"{path} has snapshot format {version}, "
+                f"expected {SNAPSHOT_FORMAT_VERSION}"
+            )
+        if byte_order != _BYTE_ORDERS[sys.byteorder]:
+            raise CatalogueError(f"{path} was written on a different byte order")
+        skus_at, prices_at, offsets_at, names_at, end = _section_starts(
+            rows, names_size
+        )
+        if len(mapping) < max(end, offers_at + offers_size):
+            raise CatalogueError(f"{path} is truncated")
+
+        view = memoryview(mapping)
+        columns = cls(
+            view[skus_at:prices_at].cast(SKU_TYPECODE)[:rows],
+            view[prices_at:offsets_at].cast(PRICE_TYPECODE)[:rows],
+            view[offsets_at:names_at].cast(OFFSET_TYPECODE)[: rows + 1],
+            view[names_at : names_at + names_size],
+        )
+        columns.path = os.fspath(path)
+        columns.mapping = mapping
+        columns.offers_at = (offers_at, offers_size)
+        return columns
+
+    def name(self, row: int) -> str:
+        return str(self.names[self.offsets[row] : self.offsets[row + 1]], "utf-8")
+
+    def copy(self) -> _Columns:
+        """The same columns in memory, the mapping is read only"""
+        names = [self.name(position) for position in range(len(self))]
+        return ColumnarCatalogue._build(list(self.skus), list(self.prices), names)
+
+    def insert(self, row: int, sku: int, price: int, name: str) -> _Columns:
+        return self.copy().insert(row, sku, price, name)
+
+    def with_prices(self, prices: Dict[int, int]) -> _Columns:
+        return self.copy().with_prices(prices)
+
+    def offers(self) -> Optional[Tuple[Any, ...]]:
+        offers_at, offers_size = self.offers_at
+        if not offers_size:
+            return None
+        return pickle.loads(self.mapping[offers_at : offers_at + offers_size])
+
+    def __reduce__(self):
+        return (_MappedColumns.open, (self.path,))
+
+
+def _catalogue_rows(catalogue: Catalogue) -> Tuple[List[int], List[int], List[str]]:
+    """Skus, prices in minor units and names of any catalogue, in sku order"""
+    if isinstance(catalogue, LayeredCatalogue):
+        skus, prices, names = _catalogue_rows(catalogue.base)
+        overrides = catalogue.overrides
+        for row, sku in enumerate(skus):
+            if sku in overrides:
+                prices[row] = overrides[sku].minor_units
+        return skus, prices, names
+    if isinstance(catalogue, ColumnarCatalogue):
+        columns = catalogue._columns
+        names = [columns.name(row) for row in range(len(columns))]
+        return list(columns.skus), list(columns.prices), names
+    products = sorted(catalogue._products.values(), key=lambda product: product.sku)
+    return (
+        [product.sku for product in products],
+        [product.price.minor_units for product in products],
+        [product.name for product in products],
+    )
+
+
+def write_catalogue_snapshot(
+    catalogue: Catalogue, path: str, offers: Optional[Iterable[Any]] = None
+) -> None:
+    """
+    Save the catalogue, and optionally the offers, as a binary snapshot.
+    The file is written next to the target and renamed over it, so a
+    process still mapping the previous snapshot keeps a consistent copy.
+    """
+    if not isinstance(catalogue, Catalogue):
+        raise TypeError(f"catalogue must be Catalogue, got {type(catalogue).__name__}")
+    skus, prices, names = _catalogue_rows(catalogue)
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = array(OFFSET_TYPECODE, [0])
+    offsets.extend(accumulate(map(len, encoded)))
+    names_blob = b"".join(encoded)
+    offers_blob = b""
+    if offers is not None:
+        offers_blob = pickle.dumps(tuple(offers), protocol=pickle.HIGHEST_PROTOCOL)
+
+    rows = len(skus)
+    skus_at, prices_at, offsets_at, names_at, end = _section_starts(
+        rows, len(names_blob)
+    )
+    offers_at = end if offers_blob else 0
+    sections = [
+        (skus_at, array(SKU_TYPECODE, skus).tobytes()),
+        (prices_at, array(PRICE_TYPECODE, prices).tobytes()),
+        (offsets_at, offsets.tobytes()),
+        (names_at, names_blob),
+        (end, b""),
+        (offers_at, offers_blob),
+    ]
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_FORMAT_VERSION,
+        _BYTE_ORDERS[sys.byteorder],
+        rows,
+        len(names_blob),
+        offers_at,
+        len(offers_blob),
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as stream:
+            stream.write(header)
+            for start, blob in sections:
+                if start:
+                    stream.write(b"\0" * (start - stream.tell()))
+                    stream.write(blob)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    logger.info(f"Catalogue snapshot with {rows} products written to {path}")
+
+
+def open_catalogue_snapshot(path: str) -> ColumnarCatalogue:
+    """Catalogue whose lookups read from the mapped snapshot file"""
+    catalogue = ColumnarCatalogue()
+    catalogue._columns = _MappedColumns.open(path)
+    catalogue.version = next(_catalogue_versions)
+    logger.info(f"Catalogue snapshot {path} opened with {len(catalogue)} products")
+    return catalogue
+
+
+def load_snapshot_offers(catalogue: ColumnarCatalogue) -> Optional[List[Any]]:
+    """
+    Offers saved with the snapshot the catalogue was opened from, None if it
+    was saved without offers. Offers are pickled, only open trusted files.
+    """
+    columns = getattr(catalogue, "_columns", None)
+    if not isinstance(columns, _MappedColumns):
+        raise CatalogueError("Catalogue was not opened from a snapshot")
+    offers = columns.offers()
+    return None if offers is None else list(offers)
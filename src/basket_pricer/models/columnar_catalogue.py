@@ -0,0 +1,378 @@
+import logging
+import operator
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from src.basket_pricer.utils.exceptions import CatalogueError
+
+from .catalogue import (
+    Catalogue,
+    PriceValue,
+    _catalogue_versions,
+    _checked_changes,
+)
+from .money import Money
+from .price_history import Timestamp
+from .product import Product
+
+try:
+    import numpy
+except ImportError:  # optional, installed with basket-pricer[fast]
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+HAVE_NUMPY = numpy is not None
+# below this many skus a bisect per sku beats setting up the NumPy arrays
+NUMPY_MIN_LOOKUPS = 32
+
+
+# skus are 8 byte signed, prices and name offsets 4 byte unsigned (prices up
+# to 42,949,672.95, names up to 4G characters in total)
+SKU_TYPECODE = "q"
+PRICE_TYPECODE = "I"
+OFFSET_TYPECODE = "I"
+
+
+class _Columns:
+    """
+    One immutable state of a columnar catalogue: parallel arrays sorted by sku.
+
+    Row i is sku skus[i], price prices[i] minor units and the name
+    names[offsets[i]:offsets[i + 1]]. The sorted sku array is the index,
+    rows are found by binary search instead of a dict of boxed ints.
+    """
+
+    __slots__ = ("skus", "prices", "offsets", "names")
+
+    def __init__(self, skus: array, prices: array, offsets: array, names: str):
+        self.skus = skus
+        self.prices = prices
+        self.offsets = offsets
+        self.names = names
+
+    @classmethod
+    def empty(cls) -> "_Columns":
+        return cls(
+            array(SKU_TYPECODE), array(PRICE_TYPECODE), array(OFFSET_TYPECODE, [0]), ""
+        )
+
+    def row(self, sku: int) -> int:
+        """Row of the sku, -1 when it is not in the catalogue"""
+        skus = self.skus
+        row = bisect_left(skus, sku)
+        if row < len(skus) and skus[row] == sku:
+            return row
+        return -1
+
+    def name(self, row: int) -> str:
+        return self.names[self.offsets[row] : self.offsets[row + 1]]
+
+    def insert(self, row: int, sku: int, price: int, name: str) -> "_Columns":
+        """New columns with one more row, these ones are left untouched"""
+        skus = array(SKU_TYPECODE, self.skus)
+        prices = array(PRICE_TYPECODE, self.prices)
+        skus.insert(row, sku)
+        prices.insert(row, price)
+        start = self.offsets[row]
+        offsets = self.offsets[: row + 1]
+        offsets.extend(offset + len(name) for offset in self.offsets[row:])
+        names = self.names[:start] + name + self.names[start:]
+        return _Columns(skus, prices, offsets, names)
+
+    def with_prices(self, prices: Dict[int, int]) -> "_Columns":
+        """New columns with the prices of some rows changed, sharing the rest"""
+        changed = array(PRICE_TYPECODE, self.prices)
+        for row, price in prices.items():
+            changed[row] = price
+        return _Columns(self.skus, changed, self.offsets, self.names)
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+
+class _PriceView(Mapping):
+    """Read only sku -> Money view over one state of the columns"""
+
+    __slots__ = ("_columns",)
+
+    def __init__(self, columns: _Columns) -> None:
+        self._columns = columns
+
+    def get(self, sku: int, default=None) -> Optional[Money]:
+        columns = self._columns
+        row = columns.row(sku)
+        if row < 0:
+            return default
+        return Money.from_minor_units(columns.prices[row])
+
+    def __getitem__(self, sku: int) -> Money:
+        price = self.get(sku)
+        if price is None:
+            raise KeyError(sku)
+        return price
+
+    def __contains__(self, sku: object) -> bool:
+        return isinstance(sku, int) and self._columns.row(sku) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._columns.skus)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+class ColumnarCatalogue(Catalogue):
+    """
+    Catalogue for very large assortments, stored as columns instead of
+    one Product per sku: an array of skus, an array of integer prices in
+    minor units and name offsets into a single string.
+
+    Build it in bulk with from_columns, which skips Product and Money
+    creation altogether. add_product still works but copies the columns,
+    so every state handed out by price_table stays unchanged.
+    """
+
+    def __init__(self, products: Optional[List[Product]] = None):
+        super().__init__()
+        self._columns = _Columns.empty()
+        if products:
+            for product in products:
+                if not isinstance(product, Product):
+                    raise TypeError(
+                        f"Expected product type, but got {type(product).__name__}"
+                    )
+            self._columns = self._build(
+                [product.sku for product in products],
+                [product.price.minor_units for product in products],
+                [product.name for product in products],
+            )
+            self.version = next(_catalogue_versions)
+        logger.debug(f"Columnar catalogue with {len(self._columns)} products created.")
+
+    @classmethod
+    def from_columns(
+        cls,
+        skus: Sequence[int],
+        prices: Sequence[int],
+        names: Sequence[str],
+    ) -> "ColumnarCatalogue":
+        """Build from parallel sequences, prices being integer minor units"""
+        catalogue = cls()
+        catalogue._columns = cls._build(skus, prices, names)
+        catalogue.version = next(_catalogue_versions)
+        logger.info(
+            f"Columnar catalogue loaded with {len(catalogue._columns)} products"
+        )
+        return catalogue
+
+    @classmethod
+    def _from_valid_columns(
+        cls, skus: Sequence[int], prices: Sequence[int], names: Sequence[str]
+    ) -> "ColumnarCatalogue":
+        return cls.from_columns(skus, prices, names)
+
+    @staticmethod
+    def _build(
+        skus: Sequence[int], prices: Sequence[int], names: Sequence[str]
+    ) -> _Columns:
+        if not len(skus) == len(prices) == len(names):
+            raise CatalogueError(
+                f"Columns must have the same length, got {len(skus)} skus, "
+                f"{len(prices)} prices and {len(names)} names"
+            )
+        # checks run over whole columns with builtins, not row by row
+        if all(map(operator.lt, skus, islice(skus, 1, None))):
+            # files are usually written in sku order, nothing to sort
+            sorted_skus = array(SKU_TYPECODE, skus)
+            sorted_prices = list(prices)
+            sorted_names = list(names)
+        else:
+            order = sorted(range(len(skus)), key=skus.__getitem__)
+            sorted_skus = array(SKU_TYPECODE, map(skus.__getitem__, order))
+            sorted_prices = list(map(prices.__getitem__, order))
+            sorted_names = list(map(names.__getitem__, order))
+            duplicate = next(
+                (
+                    sku
+                    for sku, following in zip(sorted_skus, islice(sorted_skus, 1, None))
+                    if sku == following
+                ),
+                None,
+            )
+            if duplicate is not None:
+                raise CatalogueError(f"SKU {duplicate} is already present in Catalogue")
+        if sorted_prices and min(sorted_prices) <= 0:
+            row = next(row for row, price in enumerate(sorted_prices) if price <= 0)
+            raise ValueError(f"Price must be positive: sku {sorted_skus[row]}")
+        if not all(isinstance(name, str) and name.strip() for name in sorted_names):
+            row = next(
+                row
+                for row, name in enumerate(sorted_names)
+                if not isinstance(name, str) or not name.strip()
+            )
+            raise CatalogueError(
+                f"Product name is required and cannot be empty for sku: {sorted_skus[row]}"
+            )
+
+        offsets = array(OFFSET_TYPECODE, [0])
+        offsets.extend(accumulate(map(len, sorted_names)))
+        return _Columns(
+            sorted_skus,
+            array(PRICE_TYPECODE, sorted_prices),
+            offsets,
+            "".join(sorted_names),
+        )
+
+    def add_product(self, product: Product):
+        if not isinstance(product, Product):
+            raise TypeError(f"Expected product type, but got {type(product).__name__}")
+        columns = self._columns
+        row = bisect_left(columns.skus, product.sku)
+        if row < len(columns) and columns.skus[row] == product.sku:
+            logger.error(f"'{product.name}' is already present in Catalogue")
+            raise CatalogueError(
+                f"SKU {product.sku} for {product.name} is already present in Catalogue"
+            )
+
+        # copies, so price tables handed out before keep their state
+        self._columns = columns.insert(
+            row, product.sku, product.price.minor_units, product.name
+        )
+        self.version = next(_catalogue_versions)  # anything compiled from it is stale
+        logger.info(f"Product '{product.name}' is added to the catalogue")
+
+    def with_changes(
+        self,
+        prices: Optional[Mapping[int, PriceValue]] = None,
+        added: Iterable[Product] = (),
+        removed: Iterable[int] = (),
+    ) -> "ColumnarCatalogue":
+        """
+        New catalogue version with the changes applied. Price only batches
+        copy the price column and share the sku and name columns.
+        """
+        prices, added, removed = _checked_changes(self, prices, added, removed)
+        columns = self._columns
+        if not added and not removed:
+            changed = columns.with_prices(
+                {columns.row(sku): price.minor_units for sku, price in prices.items()}
+            )
+        else:
+            dropped = set(removed)
+            rows = [row for row, sku in enumerate(columns.skus) if sku not in dropped]
+            skus = [columns.skus[row] for row in rows]
+            changed = self._build(
+                skus + [product.sku for product in added],
+                [
+                    prices[sku].minor_units if sku in prices else columns.prices[row]
+                    for sku, row in zip(skus, rows)
+                ]
+                + [product.price.minor_units for product in added],
+                [columns.name(row) for row in rows]
+                + [product.name for product in added],
+            )
+
+        catalogue = type(self)()
+        catalogue._columns = changed
+        catalogue.price_history = self.price_history
+        catalogue.version = next(_catalogue_versions)
+        logger.info(
+            f"Catalogue version {catalogue.version} from {self.version}: "
+            f"{len(prices)} prices changed, {len(added)} added, {len(removed)} removed"
+        )
+        return catalogue
+
+    def fetch_price(self, sku: int, at: Optional[Timestamp] = None) -> Money:
+        if at is not None:
+            return self._price_at(sku, at)
+        columns = self._columns
+        row = columns.row(sku)
+        if row < 0:
+            logger.error(f"Product with sku {sku} not found in the catalogue")
+            raise ValueError(f"Sku {sku} not found in catalogue")
+        return Money.from_minor_units(columns.prices[row])
+
+    def fetch_prices(
+        self, skus: Iterable[int], use_numpy: Optional[bool] = None
+    ) -> List[Money]:
+        """
+        Prices of many skus at once, in the order given. With NumPy the
+        rows are found by one searchsorted over the sku column, zero-copy
+        views of the arrays, instead of a bisect per sku; by default it is
+        used when installed and there are NUMPY_MIN_LOOKUPS skus or more.
+        """
+        skus = list(skus)
+        if use_numpy is None:
+            use_numpy = HAVE_NUMPY and len(skus) >= NUMPY_MIN_LOOKUPS
+        elif use_numpy and not HAVE_NUMPY:
+            raise RuntimeError("NumPy is not installed, install basket-pricer[fast]")
+        if use_numpy:
+            minor_prices, missing = self._numpy_rows(skus)
+        else:
+            minor_prices, missing = self._python_rows(skus)
+        if missing:
+            logger.error(f"Products with skus {missing} not found in the catalogue")
+            raise ValueError(f"Skus {missing} not found in catalogue")
+        return [Money.from_minor_units(price) for price in minor_prices]
+
+    def _python_rows(self, skus: List[int]) -> tuple[List[int], List[int]]:
+        """(minor unit prices of the skus found, skus missing)"""
+        columns = self._columns
+        prices = columns.prices
+        found: List[int] = []
+        missing: List[int] = []
+        for sku in skus:
+            row = columns.row(sku)
+            if row < 0:
+                missing.append(sku)
+            else:
+                found.append(prices[row])
+        return found, missing
+
+    def _numpy_rows(self, skus: List[int]) -> tuple[List[int], List[int]]:
+        """_python_rows, with a single searchsorted over the sku column"""
+        columns = self._columns
+        wanted = numpy.array(skus, dtype=numpy.int64)
+        if not len(columns):
+            return [], skus
+        sku_column = numpy.frombuffer(columns.skus, dtype=numpy.int64)
+        rows = numpy.searchsorted(sku_column, wanted)
+        numpy.minimum(rows, len(sku_column) - 1, out=rows)
+        found = sku_column[rows] == wanted
+        if not found.all():
+            return [], wanted[~found].tolist()
+        price_column = numpy.frombuffer(
+            columns.prices, dtype=f"u{columns.prices.itemsize}"
+        )
+        return price_column[rows].tolist(), []
+
+    def fetch_product(self, sku: int) -> Product:
+        columns = self._columns
+        row = columns.row(sku)
+        if row < 0:
+            logger.error(f"Product with sku {sku} not found in the catalogue")
+            raise ValueError(f"Sku {sku} not found in catalogue")
+        return Product(
+            sku=sku,
+            name=columns.name(row),
+            price=Money.from_minor_units(columns.prices[row]),
+        )
+
+    def has_product(self, sku: int) -> bool:
+        return self._columns.row(sku) >= 0
+
+    def price_table(self) -> Mapping[int, Money]:
+        """sku -> price view over the current columns, nothing is copied"""
+        return _PriceView(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def __str__(self):
+        if not len(self._columns):
+            return "Catalogue(empty)"
+        return f"Catalogue : {len(self._columns)} Products"
@@ -0,0 +1,105 @@
+import logging
+from array import array
+from typing import Iterable, Iterator, Optional, Tuple
+
+from src.basket_pricer.utils.exceptions import InvalidBasketError
+
+from .basket import Basket
+from .basket_item import BasketItem
+from .catalogue import Catalogue
+
+logger = logging.getLogger(__name__)
+
+SKU_TYPECODE = "q"
+QTY_TYPECODE = "I"  # 4 byte unsigned, up to 4G units of one sku
+MAX_QTY = 2**32 - 1
+
+
+def _qty_array(qtys: Iterable[int]) -> array:
+    """Quantities as an array, a ValueError for one the array cannot hold"""
+    try:
+        return array(QTY_TYPECODE, qtys)
+    except OverflowError:
+        raise ValueError(
+            f"Quantity must be positive and greater than 0, at most {MAX_QTY}"
+        )
+
+
+class CompactBasket:
+    """
+    A basket as two parallel arrays of skus and quantities, for building
+    and repricing millions of baskets from transaction logs. There is no
+    BasketItem or Product per line; the pricer takes prices and names
+    from the catalogue.
+
+    Repeated skus are merged into one line, like Basket.add_item does.
+    """
+
+    __slots__ = ("skus", "qtys")
+
+    def __init__(self, skus: Iterable[int] = (), qtys: Iterable[int] = ()):
+        skus = array(SKU_TYPECODE, skus)
+        qtys = _qty_array(qtys)
+        if len(skus) != len(qtys):
+            raise InvalidBasketError(f"Got {len(skus)} skus but {len(qtys)} quantities")
+        if qtys and min(qtys) == 0:
+            raise ValueError("Quantity must be positive and greater than 0")
+        if len(set(skus)) != len(skus):
+            merged = {}
+            for sku, qty in zip(skus, qtys):
+                merged[sku] = merged.get(sku, 0) + qty
+            skus = array(SKU_TYPECODE, list(merged))
+            qtys = _qty_array(list(merged.values()))
+        self.skus = skus
+        self.qtys = qtys
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Tuple[int, int]]) -> "CompactBasket":
+        """From (sku, qty) pairs, e.g. the rows of one transaction"""
+        lines = list(lines)
+        # arrays built from lists are sized exactly, from generators they over-allocate
+        return cls([sku for sku, _ in lines], [qty for _, qty in lines])
+
+    @classmethod
+    def from_basket(cls, basket: Basket) -> "CompactBasket":
+        items = basket.get_items_list()
+        return cls(list(items), [basket_item.qty for basket_item in items.values()])
+
+    def to_basket(self, catalogue: Catalogue) -> Basket:
+        """Basket of the catalogue's products, for APIs that need a Basket"""
+        basket = Basket()
+        for sku, qty in zip(self.skus, self.qtys):
+            basket.add_item(BasketItem(product=catalogue.fetch_product(sku), qty=qty))
+        return basket
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        """(sku, qty) of every line"""
+        return zip(self.skus, self.qtys)
+
+    def has_product(self, sku: int) -> bool:
+        return sku in self.skus
+
+    def fetch_quantity(self, sku: int) -> Optional[int]:
+        for line_sku, qty in zip(self.skus, self.qtys):
+            if line_sku == sku:
+                return qty
+        return None
+
+    def fingerprint(self) -> frozenset:
+        """Order independent identity of the contents (sku -> qty), equal to
+        Basket.fingerprint for the same contents"""
+        return frozenset(zip(self.skus, self.qtys))
+
+    def is_empty(self) -> bool:
+        return len(self.skus) == 0
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactBasket):
+            return NotImplemented
+        return self.fingerprint() == other.fingerprint()
+
+    def __repr__(self):
+        return f"CompactBasket(items={len(self.skus)})"
@@ -0,0 +1,215 @@
+import logging
+from collections.abc import Mapping
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional
+
+from src.basket_pricer.utils.exceptions import CatalogueError
+
+from .catalogue import Catalogue, PriceValue, _checked_changes
+from .money import Money
+from .price_history import Timestamp
+from .product import Product
+
+logger = logging.getLogger(__name__)
+
+
+class _OverlayPrices(Mapping):
+    """sku -> price view, the overrides first and then the shared base table"""
+
+    __slots__ = ("_overrides", "_base")
+
+    def __init__(self, overrides: Dict[int, Money], base: Mapping) -> None:
+        self._overrides = overrides
+        self._base = base
+
+    def get(self, sku: int, default=None) -> Optional[Money]:
+        price = self._overrides.get(sku)
+        if price is None:
+            return self._base.get(sku, default)
+        return price
+
+    def __getitem__(self, sku: int) -> Money:
+        price = self.get(sku)
+        if price is None:
+            raise KeyError(sku)
+        return price
+
+    def __contains__(self, sku: object) -> bool:
+        return sku in self._base
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._base)
+
+    def __len__(self) -> int:
+        return len(self._base)
+
+
+class LayeredCatalogue(Catalogue):
+    """
+    A base catalogue with a sparse set of price overrides on top, e.g. the
+    local prices of one store. Lookups check the overrides first, the base
+    is shared and never copied, so a layer costs memory per override only.
+
+    Layers are not changed in place: with_overrides and with_changes return
+    a new layer (and catalogue version) for BasketPricer.set_catalogue.
+    """
+
+    def __init__(
+        self,
+        base: Catalogue,
+        overrides: Optional[Dict[int, PriceValue]] = None,
+        base_prices: Optional[Mapping] = None,
+    ):
+        if not isinstance(base, Catalogue):
+            raise TypeError(f"base must be Catalogue, got {type(base).__name__}")
+        super().__init__()
+        self.base = base
+        # overrides are today's prices, earlier ones come from the base
+        self.price_history = base.price_history
+        self._overrides, _, _ = _checked_changes(base, overrides, (), ())
+        # StoreCatalogues hands every layer the same base table
+        self._base_prices = base.price_table() if base_prices is None else base_prices
+        logger.debug(
+            f"Layered catalogue with {len(self._overrides)} overrides created."
+        )
+
+    @property
+    def overrides(self) -> Dict[int, Money]:
+        """Copy of the overridden prices, sku -> Money"""
+        return dict(self._overrides)
+
+    def with_overrides(
+        self, overrides: Optional[Dict[int, PriceValue]]
+    ) -> "LayeredCatalogue":
+        """New layer over the same base with the whole overlay replaced"""
+        return type(self)(self.base, overrides, self._base_prices)
+
+    def with_changes(
+        self,
+        prices: Optional[Dict[int, PriceValue]] = None,
+        added: Iterable[Product] = (),
+        removed: Iterable[int] = (),
+    ) -> "LayeredCatalogue":
+        """New layer with more prices overridden, products belong to the base"""
+        if list(added) or list(removed):
+            raise CatalogueError(
+                "Products are added and removed on the base catalogue, not a layer"
+            )
+        return self.with_overrides({**self._overrides, **(prices or {})})
+
+    def add_product(self, product: Product):
+        raise CatalogueError(
+            "Products are added and removed on the base catalogue, not a layer"
+        )
+
+    def fetch_price(self, sku: int, at: Optional[Timestamp] = None) -> Money:
+        if at is not None:
+            return self.base.fetch_price(sku, at=at)
+        price = self._overrides.get(sku)
+        if price is None:
+            return self.base.fetch_price(sku)
+        return price
+
+    def fetch_product(self, sku: int) -> Product:
+        product = self.base.fetch_product(sku)
+        price = self._overrides.get(sku)
+        if price is None:
+            return product
+        return Product.trusted(sku, product.name, price)
+
+    def has_product(self, sku: int) -> bool:
+        return self.base.has_product(sku)
+
+    def price_table(self) -> Mapping[int, Money]:
+        """sku -> price view over the overrides and the base, nothing is copied"""
+        return _OverlayPrices(self._overrides, self._base_prices)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def __str__(self):
+        return f"{self.base} with {len(self._overrides)} price overrides"
+
+
+class StoreCatalogues:
+    """
+    One shared base catalogue and a LayeredCatalogue per store. The base
+    price table is built once and shared by every store's layer.
+    """
+
+    def __init__(
+        self,
+        base: Catalogue,
+        overrides: Optional[Dict[Hashable, Dict[int, PriceValue]]] = None,
+    ):
+        if not isinstance(base, Catalogue):
+            raise TypeError(f"base must be Catalogue, got {type(base).__name__}")
+        self._base = base
+        self._base_prices = base.price_table()
+        self._stores: Dict[Hashable, LayeredCatalogue] = {}
+        for store_id, store_overrides in (overrides or {}).items():
+            self.set_overrides(store_id, store_overrides)
+        logger.info(f"Store catalogues created for {len(self._stores)} stores")
+
+    @property
+    def base(self) -> Catalogue:
+        return self._base
+
+    def catalogue(self, store_id: Hashable) -> LayeredCatalogue:
+        """Current catalogue of the store, to price its baskets with"""
+        layer = self._stores.get(store_id)
+        if layer is None:
+            logger.error(f"Store {store_id} has no catalogue")
+            raise CatalogueError(f"Store {store_id} has no catalogue")
+        return layer
+
+    def set_overrides(
+        self, store_id: Hashable, overrides: Optional[Dict[int, PriceValue]]
+    ) -> LayeredCatalogue:
+        """
+        Replace all of a store's overrides in one go, adding the store if it
+        is new. Returns the new layer; the previous one is left unchanged.
+        """
+        layer = LayeredCatalogue(self._base, overrides, self._base_prices)
+        self._stores[store_id] = layer
+        logger.info(
+            f"Store {store_id} has {len(layer._overrides)} price overrides, "
+            f"catalogue version {layer.version}"
+        )
+        return layer
+
+    def remove_store(self, store_id: Hashable) -> None:
+        if self._stores.pop(store_id, None) is None:
+            raise CatalogueError(f"Store {store_id} has no catalogue")
+
+    def set_base(self, base: Catalogue) -> None:
+        """
+        Put every store on a new base catalogue, keeping its overrides.
+        Overrides of skus the new base no longer has are dropped.
+        """
+        if not isinstance(base, Catalogue):
+            raise TypeError(f"base must be Catalogue, got {type(base).__name__}")
+        base_prices = base.price_table()
+        stores: Dict[Hashable, LayeredCatalogue] = {}
+        for store_id, layer in self._stores.items():
+            overrides = {
+                sku: price
+                for sku, price in layer._overrides.items()
+                if base.has_product(sku)
+            }
+            if len(overrides) < len(layer._overrides):
+                logger.warning(
+                    f"Store {store_id}: {len(layer._overrides) - len(overrides)} "
+                    "overrides dropped, their skus left the base catalogue"
+                )
+            stores[store_id] = LayeredCatalogue(base, overrides, base_prices)
+        self._base, self._base_prices, self._stores = base, base_prices, stores
+        logger.info(f"Base catalogue version {base.version} for {len(stores)} stores")
+
+    def stores(self) -> List[Hashable]:
+        return list(self._stores)
+
+    def __contains__(self, store_id: object) -> bool:
+        return store_id in self._stores
+
+    def __len__(self) -> int:
+        return len(self._stores)
@@ -1,16 +1,30 @@
 import logging
 from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
-from typing import Union
+from typing import Dict, Iterable, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+# Money is held as an integer number of minor units (pence), so addition,
+# subtraction and integer multiplication are exact and never need rounding.
+MINOR_UNITS_EXPONENT = 2
+_WHOLE_UNIT = Decimal("1")
+
+# Amounts below this many pence are interned automatically, larger amounts
+# (catalogue prices) only when Money.intern is called, up to MAX_INTERNED.
+AUTO_INTERN_BELOW = 10_000
+MAX_INTERNED = 65_536
+
 
 class Money:
-    _amount: Decimal = Decimal("0")
+    """Immutable amount of money, held as integer minor units"""
+
+    __slots__ = ("_minor",)
 
-    def __init__(self, amount: Union[int, str, float, Decimal]):
+    _interned: Dict[int, "Money"] = {}
+
+    def __new__(cls, amount: Union[int, str, float, Decimal]):
         try:
-            decimal_amount = self.to_decimal(amount)
+            decimal_amount = cls.to_decimal(amount)
         except (ValueError, InvalidOperation):
             logger.error("Invalid amount")
             logger.info(
@@ -22,65 +36,221 @@ class Money:
             logger.error(f"The amount {decimal_amount} cannot be negative.")
             raise ValueError(f"Money {decimal_amount} cannot be negative.")
 
-        self._amount = decimal_amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        logger.debug(f"Money created (decimal conversion done) : {self._amount}")
+        money = cls._from_minor(
+            cls._round_to_minor(decimal_amount.scaleb(MINOR_UNITS_EXPONENT))
+        )
+        logger.debug(f"Money created (decimal conversion done) : {money}")
+        return money
+
+    @classmethod
+    def _from_minor(cls, minor: int) -> "Money":
+        """Trusted constructor used by arithmetic, skips parsing and validation"""
+        money = cls._interned.get(minor)
+        if money is not None:
+            return money
+        money = object.__new__(cls)
+        object.__setattr__(money, "_minor", minor)
+        if minor < AUTO_INTERN_BELOW:
+            return cls._interned.setdefault(minor, money)
+        return money
+
+    @classmethod
+    def from_minor_units(cls, minor: int) -> "Money":
+        """Create Money from an integer amount of minor units (pence)"""
+        if not isinstance(minor, int):
+            raise TypeError(f"Minor units must be int, got {type(minor).__name__}")
+        if minor < 0:
+            raise ValueError(f"Money {cls._to_major(minor)} cannot be negative.")
+        return cls._from_minor(minor)
+
+    @classmethod
+    def intern(cls, money: "Money") -> "Money":
+        """Return the shared instance for this amount, e.g. for catalogue prices"""
+        if not isinstance(money, Money):
+            money = cls(money)
+        if len(cls._interned) >= MAX_INTERNED:
+            return cls._interned.get(money._minor, money)
+        return cls._interned.setdefault(money._minor, money)
+
+    @classmethod
+    def to_minor_units(cls, amount: Union[int, str, float, Decimal]) -> int:
+        """Parse and validate an amount into whole minor units without creating
+        Money or logging, for bulk loaders that report bad values themselves"""
+        try:
+            decimal_amount = cls.to_decimal(amount)
+            if decimal_amount < 0:
+                raise ValueError(f"Money {decimal_amount} cannot be negative.")
+            return cls._round_to_minor(decimal_amount.scaleb(MINOR_UNITS_EXPONENT))
+        except ArithmeticError:  # InvalidOperation, e.g. NaN or infinity
+            raise ValueError(f"Cannot convert {amount} to money (decimal)")
+
+    @staticmethod
+    def _round_to_minor(value: Decimal) -> int:
+        """Round a Decimal amount of minor units to a whole number, half up"""
+        return int(value.quantize(_WHOLE_UNIT, rounding=ROUND_HALF_UP))
+
+    @staticmethod
+    def _to_major(minor: int) -> Decimal:
+        return Decimal(minor).scaleb(-MINOR_UNITS_EXPONENT)
+
+    @property
+    def amount(self) -> Decimal:
+        return self._to_major(self._minor)
+
+    @property
+    def _amount(self) -> Decimal:
+        return self.amount
 
     @property
-    def amount(self):
-        return self._amount
+    def minor_units(self) -> int:
+        return self._minor
 
     @classmethod
     def zero(cls):
-        return cls("0")
+        return cls._from_minor(0)
+
+    @classmethod
+    def sum(cls, amounts: Iterable["Money"]) -> "Money":
+        """Add up many amounts, creating a single Money at the end"""
+        accumulator = MoneyAccumulator()
+        for money in amounts:
+            accumulator.add(money)
+        return accumulator.total()
 
+    @staticmethod
     def to_decimal(
-        self, value: Union[int, str, float, Decimal]
+        value: Union[int, str, float, Decimal],
     ) -> Decimal:  # handling all possible types of values
         if isinstance(value, Decimal):
             return value
         return Decimal(str(value))
 
     def is_positive(self):
-        return self._amount > Decimal("0")
+        return self._minor > 0
 
     def is_zero(self):
-        return self._amount == Decimal("0")
+        return self._minor == 0
+
+    # Money is a value type, it can never change once created
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Money is immutable, cannot set '{name}'")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Money is immutable, cannot delete '{name}'")
+
+    def __reduce__(self):
+        return (Money.from_minor_units, (self._minor,))
+
+    def __copy__(self) -> "Money":
+        return self
+
+    def __deepcopy__(self, memo) -> "Money":
+        return self
 
     # important Arithmetic operations
     def __add__(self, other: "Money") -> "Money":
         if not isinstance(other, Money):
             raise TypeError(f"Cannot add Money and {type(other).__name__}")
-        return Money(self._amount + other._amount)
+        return Money._from_minor(self._minor + other._minor)
 
     def __sub__(self, other: "Money") -> "Money":
         if not isinstance(other, Money):
             raise TypeError(f"Cannot subtract Money and {type(other).__name__}")
-        return Money(self._amount - other._amount)
+        minor = self._minor - other._minor
+        if minor < 0:
+            logger.error(f"The amount {self._to_major(minor)} cannot be negative.")
+            raise ValueError(f"Money {self._to_major(minor)} cannot be negative.")
+        return Money._from_minor(minor)
 
     def __mul__(self, multiplier: Union[int, float, str, Decimal]):
         if not isinstance(multiplier, (int, float, str, Decimal)):
             raise TypeError(f"Cannot multiply Money by {type(multiplier).__name__}")
-        return Money(self._amount * self.to_decimal(multiplier))
+        if type(multiplier) is int:  # exact, nothing to round
+            exact_minor = self._minor * multiplier
+        else:  # fractional multiplier, the only place where rounding happens
+            exact_minor = self._minor * self.to_decimal(multiplier)
+        if exact_minor < 0:
+            amount = Decimal(exact_minor).scaleb(-MINOR_UNITS_EXPONENT)
+            logger.error(f"The amount {amount} cannot be negative.")
+            raise ValueError(f"Money {amount} cannot be negative.")
+        if isinstance(exact_minor, Decimal):
+            return Money._from_minor(self._round_to_minor(exact_minor))
+        return Money._from_minor(exact_minor)
 
-    # Cmparison Operators
-    def __eq__(self, other: "Money") -> bool:
+    # Comparison Operators
+    def __eq__(self, other: object) -> bool:
         if not isinstance(other, Money):
-            raise TypeError(f"Cannot compare Money and {type(other).__name__}")
-        return self._amount == other._amount
+            return NotImplemented
+        return self._minor == other._minor
+
+    def __hash__(self) -> int:
+        return hash(self._minor)
 
     def __gt__(self, other: "Money") -> bool:
         if not isinstance(other, Money):
             raise TypeError(f"Cannot compare Money and {type(other).__name__}")
-        return self._amount > other._amount
+        return self._minor > other._minor
+
+    def __ge__(self, other: "Money") -> bool:
+        if not isinstance(other, Money):
+            raise TypeError(f"Cannot compare Money and {type(other).__name__}")
+        return self._minor >= other._minor
 
     def __lt__(self, other: "Money") -> bool:
         if not isinstance(other, Money):
             raise TypeError(f"Cannot compare Money and {type(other).__name__}")
-        return self._amount < other._amount
+        return self._minor < other._minor
+
+    def __le__(self, other: "Money") -> bool:
+        if not isinstance(other, Money):
+            raise TypeError(f"Cannot compare Money and {type(other).__name__}")
+        return self._minor <= other._minor
 
     # representation of money
     def __str__(self):
-        return f"£{self._amount:.2f}"
+        return f"£{self.amount:.2f}"
+
+    def __repr__(self):
+        return f"Money('{self.amount:.2f}')"
+
+
+class MoneyAccumulator:
+    """Running total in minor units, for summing Money inside hot loops.
+
+    Adding only updates an int, a Money is built once when total() is called.
+    """
+
+    __slots__ = ("_minor",)
+
+    def __init__(self, start: Optional[Money] = None):
+        self._minor = 0
+        if start is not None:
+            self.add(start)
+
+    def add(self, money: Money) -> "MoneyAccumulator":
+        if not isinstance(money, Money):
+            raise TypeError(f"Cannot add Money and {type(money).__name__}")
+        self._minor += money._minor
+        return self
+
+    def add_times(self, money: Money, quantity: int) -> "MoneyAccumulator":
+        """Add money multiplied by a whole quantity, e.g. unit price x qty"""
+        if not isinstance(money, Money):
+            raise TypeError(f"Cannot add Money and {type(money).__name__}")
+        if quantity < 0:
+            raise ValueError(f"Quantity {quantity} cannot be negative.")
+        self._minor += money._minor * quantity
+        return self
+
+    def __iadd__(self, money: Money) -> "MoneyAccumulator":
+        return self.add(money)
+
+    @property
+    def minor_units(self) -> int:
+        return self._minor
+
+    def total(self) -> Money:
+        return Money._from_minor(self._minor)
 
     def __repr__(self):
-        pass
+        return f"MoneyAccumulator({self.total()!r})"
@@ -0,0 +1,189 @@
+import logging
+from bisect import bisect_right
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from src.basket_pricer.utils.exceptions import CatalogueError, CatalogueLoadError
+from src.basket_pricer.utils.records import RECORD_FORMATS, open_source, read_records
+
+from .catalogue_loader import CatalogueSource
+from .money import Money
+
+logger = logging.getLogger(__name__)
+
+# datetimes, ISO 8601 strings or POSIX seconds; without a UTC offset, UTC
+Timestamp = Union[datetime, str, int, float]
+PRICE_CHANGE_FIELDS = ("sku", "effective_from", "price")
+
+
+def to_timestamp(value: Timestamp) -> float:
+    """
+    POSIX seconds of a datetime, ISO 8601 string or number. Datetimes and
+    strings without a UTC offset are read as UTC, never in the local time
+    zone of the machine, so every process agrees on the moment.
+    """
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f"Expected a datetime, ISO string or number, got {value!r}")
+    return float(value)
+
+
+class PriceHistory:
+    """
+    Price changes per sku: sorted effective-from timestamps and the price
+    from each one on. The price at a moment is found by binary search, so
+    a lookup costs O(log changes) for that sku.
+
+    A sku with no recorded change has kept its catalogue price all along;
+    before the first recorded change of a sku its price is not known.
+    Skus no longer in the catalogue keep their history.
+    """
+
+    def __init__(self) -> None:
+        self._times: Dict[int, List[float]] = {}
+        self._prices: Dict[int, List[Money]] = {}
+
+    @classmethod
+    def load(cls, source: CatalogueSource, format: str = "csv") -> "PriceHistory":
+        """
+        Build from a change log with sku, effective_from and price per row,
+        as CSV with a header or JSONL. Every bad row is reported in one
+        CatalogueLoadError.
+        """
+        if format not in RECORD_FORMATS:
+            raise ValueError(
+                f"Unknown price history format {format!r}, use 'csv' or 'jsonl'"
+            )
+        changes: Dict[int, List[Tuple[float, Money]]] = {}
+        errors: List[Tuple[int, str]] = []
+        with open_source(source) as stream:
+            records = read_records(stream, format, PRICE_CHANGE_FIELDS)
+            for line_number, problem, raw_sku, raw_at, raw_price in records:
+                if problem is not None:
+                    errors.append((line_number, problem))
+                    continue
+                try:
+                    sku = int(raw_sku)
+                    at = to_timestamp(raw_at)
+                    price = Money.intern(Money(raw_price))
+                except (TypeError, ValueError) as error:
+                    errors.append((line_number, f"invalid price change ({error})"))
+                    continue
+                if not price.is_positive():
+                    errors.append((line_number, f"sku {sku} price must be positive"))
+                    continue
+                changes.setdefault(sku, []).append((at, price))
+        if errors:
+            logger.error(f"{len(errors)} invalid rows while loading price history")
+            raise CatalogueLoadError(errors)
+
+        history = cls()
+        for sku, sku_changes in changes.items():
+            sku_changes.sort(key=lambda change: change[0])  # sorted once per sku
+            times = [at for at, _ in sku_changes]
+            if any(a == b for a, b in zip(times, times[1:])):
+                raise CatalogueError(f"Sku {sku} has two price changes at one time")
+            history._times[sku] = times
+            history._prices[sku] = [price for _, price in sku_changes]
+        logger.info(
+            f"Price history loaded: {sum(map(len, history._times.values()))} "
+            f"changes for {len(history._times)} skus"
+        )
+        return history
+
+    def add_change(self, sku: int, effective_from: Timestamp, price) -> None:
+        """Record a price for the sku from effective_from on"""
+        at = to_timestamp(effective_from)
+        if not isinstance(price, Money):
+            price = Money(price)
+        if not price.is_positive():
+            raise ValueError(f"Price must be positive: sku {sku}")
+        times = self._times.setdefault(sku, [])
+        prices = self._prices.setdefault(sku, [])
+        row = bisect_right(times, at)
+        if row and times[row - 1] == at:
+            prices[row - 1] = Money.intern(price)  # a correction replaces it
+            return
+        times.insert(row, at)
+        prices.insert(row, Money.intern(price))
+
+    def has_history(self, sku: int) -> bool:
+        return sku in self._times
+
+    def price_at(self, sku: int, at: Timestamp) -> Optional[Money]:
+        """Price in force at the moment, None before the sku's first change
+        or when the sku has no recorded changes"""
+        times = self._times.get(sku)
+        if times is None:
+            return None
+        row = bisect_right(times, to_timestamp(at)) - 1
+        if row < 0:
+            return None
+        return self._prices[sku][row]
+
+    def prices_at(
+        self, at: Timestamp, current: Mapping[int, Money]
+    ) -> Mapping[int, Money]:
+        """sku -> price view at the moment, current prices for unchanged skus"""
+        return _HistoricalPrices(self, to_timestamp(at), current)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+
+class _HistoricalPrices(Mapping):
+    """
+    Read only sku -> Money view of the prices at one moment. A sku whose
+    first recorded change comes later has no price yet and is not in it.
+    """
+
+    __slots__ = ("_history", "_at", "_current")
+
+    def __init__(
+        self, history: PriceHistory, at: float, current: Mapping[int, Money]
+    ) -> None:
+        self._history = history
+        self._at = at
+        self._current = current
+
+    def get(self, sku: int, default=None) -> Optional[Money]:
+        # skus dropped from the catalogue since are still priced from history
+        times = self._history._times.get(sku)
+        if times is None:
+            return self._current.get(sku, default)
+        row = bisect_right(times, self._at) - 1
+        if row < 0:
+            return default
+        return self._history._prices[sku][row]
+
+    def __getitem__(self, sku: int) -> Money:
+        price = self.get(sku)
+        if price is not None:
+            return price
+        if self._history.has_history(sku):
+            at = datetime.fromtimestamp(self._at, tz=timezone.utc).isoformat()
+            raise CatalogueError(f"No price known for sku {sku} at {at}")
+        raise KeyError(sku)
+
+    def __contains__(self, sku: object) -> bool:
+        return self.get(sku) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        for sku in self._current:
+            if sku in self:
+                yield sku
+        for sku in self._history._times:
+            if sku not in self._current and sku in self:
+                yield sku
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
@@ -24,6 +24,7 @@ class Product:
         if not isinstance(self.price, Money):
             logger.info("Price entered is not of type Money")
             self.price = Money(amount=self.price)
+        self.price = Money.intern(self.price)  # share one instance per price
 
         if not self.price.is_positive():
             logger.error("Product price must be positive.")
@@ -31,6 +32,15 @@ class Product:
 
         logger.debug(f"Product created {self.name} with price {self.price}")
 
+    @classmethod
+    def trusted(cls, sku: int, name: str, price: Money) -> "Product":
+        """Product from values already validated in bulk, skips __post_init__"""
+        product = object.__new__(cls)
+        product.sku = sku
+        product.name = name
+        product.price = price
+        return product
+
     def __str__(self):
         return f"Product {self.name} : {self.price}"
 
@@ -1,11 +1,17 @@
 from .base_offer import AbstractBaseOffer
+from .bundle_offer import BundleOffer
 from .buy_x_get_cheapest_free_offer import BuyXGetCheapestFreeOffer
 from .buy_x_get_y_free import BuyXgetYfree
 from .percentage_discount import PercentageOffer
+from .spend_threshold_offer import SpendThresholdOffer
+from .tiered_quantity_offer import TieredQuantityOffer
 
 __all__ = [
     "AbstractBaseOffer",
+    "BundleOffer",
     "BuyXGetCheapestFreeOffer",
     "BuyXgetYfree",
     "PercentageOffer",
+    "SpendThresholdOffer",
+    "TieredQuantityOffer",
 ]
@@ -1,24 +1,89 @@
 import logging
+import math
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from src.basket_pricer.models import Basket, Money
+from src.basket_pricer.models import Basket, BasketItem, Money, Product
+from src.basket_pricer.models.price_history import to_timestamp
 from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
 
+if TYPE_CHECKING:  # offer_kernels imports this module
+    from src.basket_pricer.offers.offer_kernels import BasketColumns
+
 logger = logging.getLogger(__name__)
 
+# group offers suggest at most this many group counts during allocation,
+# counting down from the most groups the units allow
+MAX_GROUP_OPTIONS = 16
+# offers over several skus suggest at most this many splits of their units,
+# enough to list every split of a small basket
+MAX_SPLIT_OPTIONS = 64
+
+
+class PricedLine(NamedTuple):
+    """Units of one sku offered to an offer during allocation"""
+
+    sku: int
+    qty: int
+    unit_price: Money
+    name: str
+
+
+class OfferEvaluation(NamedTuple):
+    """Outcome of one pass of an offer over a basket"""
+
+    applicable: bool
+    discount: Money
+    affected_items: List[str]  # names of the products the offer used
+
+
+NOT_APPLICABLE = OfferEvaluation(False, Money.zero(), [])
+
 
 @dataclass
 class AbstractBaseOffer(ABC):
     id: str
     name: str
+    # validity window in POSIX seconds, live from starts_at up to but not
+    # including ends_at, None for no limit. Datetimes and ISO strings are
+    # converted when the offer is created.
+    starts_at: Optional[float] = field(default=None, kw_only=True)
+    ends_at: Optional[float] = field(default=None, kw_only=True)
+    # offers are searched in this order during allocation, the ones whose best
+    # use of units depends on the others (groups) go before the ones that
+    # simply take whatever units are left, like the default below
+    allocation_order: ClassVar[int] = 2
 
     def __post_init__(self):
         if not self.id:
             raise InvalidOfferConfigError(f"Offer {self.name} must have an Id.")
         if not self.name or not self.name.split():
             raise InvalidOfferConfigError(f"Offer {self.name} must have a Name.")
+        try:
+            if self.starts_at is not None:
+                self.starts_at = to_timestamp(self.starts_at)
+            if self.ends_at is not None:
+                self.ends_at = to_timestamp(self.ends_at)
+        except (TypeError, ValueError) as error:
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} has an invalid validity window: {error}"
+            )
+        if self.is_scheduled() and self.window()[0] >= self.window()[1]:
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} must start before it ends"
+            )
         logger.debug(f"Created Offer : {self.name} with id : '{self.id}'")
 
     @abstractmethod
@@ -38,24 +103,191 @@ class AbstractBaseOffer(ABC):
         product_name = item.product.name
         return [product_name]
 
+    def evaluate(self, basket: Basket) -> OfferEvaluation:
+        """
+        Applicability, discount and affected items in one go. Built-in offers
+        override it with a single pass over their basket lines; this default
+        runs is_applicable, calculate_discount and _get_affected_items, so
+        offers written against those three keep working unchanged.
+        """
+        if not self.is_applicable(basket):
+            return NOT_APPLICABLE
+        discount = self.calculate_discount(basket)
+        if discount.is_zero():
+            return OfferEvaluation(True, discount, [])
+        return OfferEvaluation(True, discount, self._get_affected_items(basket))
+
     def apply_to_basket(self, basket: Basket) -> Optional[tuple[Money, List[str]]]:
         """Apply offer to basket items"""
         # check basket is empty or not
         if basket.is_empty():
             return None
 
-        # check if APPLICABLE
-        if not self.is_applicable(basket):
+        evaluation = self.evaluate(basket)
+        if not evaluation.applicable:
             logger.debug(f"offer {self.name} not applicable on the current basket")
             return None
-
-        discount = self.calculate_discount(basket)
-        if discount.is_zero():
+        if evaluation.discount.is_zero():
             logger.debug("Offer applicable but zero discount")
             return None
 
-        # names of affected items
-        affected_items = self._get_affected_items(basket)
         logger.info(f"offer {self.name} applied")
+        return evaluation.discount, evaluation.affected_items
+
+    def is_scheduled(self) -> bool:
+        """True when the offer is only live during a validity window"""
+        return self.starts_at is not None or self.ends_at is not None
+
+    def is_live(self, at: float) -> bool:
+        """True when the offer is live at the POSIX timestamp at"""
+        starts_at, ends_at = self.window()
+        return starts_at <= at < ends_at
+
+    def live_throughout(self, other: "AbstractBaseOffer") -> bool:
+        """True when this offer is live whenever `other` is"""
+        starts_at, ends_at = self.window()
+        other_starts_at, other_ends_at = other.window()
+        return starts_at <= other_starts_at and other_ends_at <= ends_at
+
+    def window(self) -> Tuple[float, float]:
+        """Validity window with open ends as infinities"""
+        return (
+            -math.inf if self.starts_at is None else self.starts_at,
+            math.inf if self.ends_at is None else self.ends_at,
+        )
+
+    def scope_skus(self) -> FrozenSet[int]:
+        """Skus this offer can discount, empty for basket-level offers"""
+        if hasattr(self, "sku"):
+            return frozenset([self.sku])
+        if hasattr(self, "product_skus"):
+            return frozenset(self.product_skus)
+        return frozenset()
+
+    def dominates(self, other: "AbstractBaseOffer") -> bool:
+        """
+        True when this offer gives at least the discount of `other` on any
+        units `other` could take, so `other` never needs evaluating next to
+        it. Offers opt in for the kinds they know how to compare, the
+        default never claims dominance.
+        """
+        return False
+
+    @classmethod
+    def dominated_kinds(cls) -> Tuple[type, ...]:
+        """
+        Offer classes whose offers dominates() can be True for. compile_offers
+        only compares an offer with offers of classes listing its own, so an
+        offer that overrides dominates() narrows this to the kinds it
+        compares. By default any offer when dominates() is overridden.
+        """
+        if cls.dominates is AbstractBaseOffer.dominates:
+            return ()
+        return (AbstractBaseOffer,)
+
+    def allocation_options(
+        self, units: Mapping[int, PricedLine]
+    ) -> List[Dict[int, int]]:
+        """Candidate units (sku -> qty) worth giving to this offer, best first.
+        Default is everything it can see, offers override for finer splits."""
+        return [{sku: line.qty for sku, line in units.items() if line.qty > 0}]
+
+    def discount_for_units(
+        self, units: Mapping[int, PricedLine]
+    ) -> tuple[Money, Dict[int, int]]:
+        """
+        Discount if this offer alone got these units, and how many units of
+        each sku it actually uses. The default prices a basket of just those
+        units through apply_to_basket, so offers written before allocation
+        keep working, and treats every unit given as used.
+        """
+        items = [
+            BasketItem(
+                product=Product(sku=line.sku, name=line.name, price=line.unit_price),
+                qty=line.qty,
+            )
+            for line in units.values()
+            if line.qty > 0
+        ]
+        if not items:
+            return Money.zero(), {}
+        result = self.apply_to_basket(Basket(items))
+        if result is None:
+            return Money.zero(), {}
+        return result[0], {item.product.sku: item.qty for item in items}
+
+    def batch_discounts(self, columns: "BasketColumns") -> Sequence[int]:
+        """
+        Discount in minor units for every basket of the columns, as
+        calculate_discount gives it on each basket alone. Built-in offers
+        have a kernel doing one pass over the columns, this default prices
+        the baskets one by one through discount_for_units.
+        """
+        discounts = columns.zeros()
+        for position in range(len(columns)):
+            discount, _ = self.discount_for_units(columns.basket_units(position))
+            discounts[position] = discount.minor_units
+        return discounts
+
+
+def split_options(
+    units: Mapping[int, PricedLine],
+    scope: FrozenSet[int],
+    group_size: int = 1,
+) -> List[Dict[int, int]]:
+    """
+    Candidate units (sku -> qty) for an offer over a group of skus, at most
+    MAX_SPLIT_OPTIONS of them: every unit in scope, every sku but one, then
+    part quantities whose total is a multiple of group_size, the most units
+    first and for the same total as many of the dearest units as possible.
+    Which units an offer keeps decides what is left for the others, so a
+    small basket gets every split and the allocator can find the best one.
+    """
+    lines = sorted(
+        (line for sku, line in units.items() if line.qty > 0 and sku in scope),
+        key=lambda line: (-line.unit_price.minor_units, line.sku),
+    )
+    eligible = {line.sku: line.qty for line in lines}
+    options: List[Dict[int, int]] = []
+    seen = set()
+
+    def add(option: Dict[int, int]) -> bool:
+        """Keep option unless it was seen, False once there are enough"""
+        key = tuple(option.items())
+        if option and key not in seen:
+            seen.add(key)
+            options.append(option)
+        return len(options) < MAX_SPLIT_OPTIONS
+
+    if not add(eligible):
+        return options
+    if len(eligible) > 1:
+        # leaving one sku out frees its units for an offer of its own
+        for left_out in eligible:
+            if not add({sku: qty for sku, qty in eligible.items() if sku != left_out}):
+                return options
+
+    # units that can still be taken from each line on
+    room = [0] * (len(lines) + 1)
+    for position in range(len(lines) - 1, -1, -1):
+        room[position] = room[position + 1] + lines[position].qty
+
+    def splits(position: int, left: int, taken: Dict[int, int]):
+        if left == 0:
+            yield dict(taken)
+            return
+        line = lines[position]
+        for qty in range(
+            min(line.qty, left), max(left - room[position + 1], 0) - 1, -1
+        ):
+            if qty:
+                taken[line.sku] = qty
+            yield from splits(position + 1, left - qty, taken)
+            taken.pop(line.sku, None)
 
-        return discount, affected_items
+    step = max(group_size, 1)
+    for total in range(room[0] // step * step, 0, -step):
+        for option in splits(0, total, {}):
+            if not add(option):
+                return options
+    return options
@@ -0,0 +1,264 @@
+import logging
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from src.basket_pricer.models import Basket, Money
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import (
+    MAX_GROUP_OPTIONS,
+    MAX_SPLIT_OPTIONS,
+    NOT_APPLICABLE,
+    OfferEvaluation,
+    PricedLine,
+    split_options,
+)
+from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
+
+logger = logging.getLogger(__name__)
+
+# every subset of the slots is checked when units are placed, 2 ** slots of them
+MAX_BUNDLE_SLOTS = 8
+
+# (sku, unit price in minor units, qty, bit mask of the slots it can fill)
+BundleRun = Tuple[int, int, int, int]
+# total price in minor units of the units filling the bundles, units per sku
+BundleFill = Tuple[int, Dict[int, int]]
+
+
+@dataclass
+class BundleOffer(AbstractBaseOffer):
+    """
+    Fixed price for one unit from each slot, e.g. any main + snack + drink
+    for £3.50. A sku may be eligible for more than one slot.
+
+    For k bundles the best units are found greedily, dearest first, each
+    sku taking as many units as the slots can still place: by Hall's
+    theorem that is the least room left over any set of slots it could go
+    to. The units that can fill a slot form a polymatroid, so the greedy
+    fill is the dearest possible, and the saving of k bundles is concave
+    in k, so the best k is found by binary search. A basket costs one sort
+    and O(log units) fills of O(skus * 2 ** slots) each, however many
+    units it has.
+    """
+
+    slots: List[List[int]] = field(default_factory=list)  # skus of each slot
+    price: Money = field(default_factory=Money.zero)  # price of one bundle
+    # which units go into bundles decides what is left for every other offer
+    allocation_order: ClassVar[int] = 0
+    # sku -> bit mask of the slots it is eligible for, built once
+    _slot_masks: Dict[int, int] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    # slot mask -> every slot mask containing it, and the slots in each mask
+    _supersets: List[List[int]] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _slot_counts: List[int] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _price_units: int = field(default=0, init=False, repr=False, compare=False)
+    _scope: FrozenSet[int] = field(
+        default=frozenset(), init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        if not self.slots or any(not slot for slot in self.slots):
+            raise InvalidOfferConfigError(
+                self.id, f"Bundle {self.id} needs slots, each with at least one sku"
+            )
+        if len(self.slots) > MAX_BUNDLE_SLOTS:
+            raise InvalidOfferConfigError(
+                self.id, f"Bundle {self.id} has more than {MAX_BUNDLE_SLOTS} slots"
+            )
+        if any(len(slot) != len(set(slot)) for slot in self.slots):
+            raise InvalidOfferConfigError(
+                self.id, "product sku's of a slot must not contain duplicates"
+            )
+        try:
+            if not isinstance(self.price, Money):
+                self.price = Money(self.price)
+        except ValueError as error:
+            raise InvalidOfferConfigError(self.id, f"Bundle {self.id}: {error}")
+        if not self.price.is_positive():
+            raise InvalidOfferConfigError(
+                self.id, f"Bundle {self.id} price must be positive"
+            )
+
+        for position, slot in enumerate(self.slots):
+            for sku in slot:
+                self._slot_masks[sku] = self._slot_masks.get(sku, 0) | 1 << position
+        masks = range(1 << len(self.slots))
+        self._supersets = [
+            [superset for superset in masks if superset & mask == mask]
+            for mask in masks
+        ]
+        self._slot_counts = [bin(mask).count("1") for mask in masks]
+        self._price_units = self.price.minor_units
+        self._scope = frozenset(self._slot_masks)
+        logger.debug(f"Bundle offer {self.name} created")
+
+    def evaluate(self, basket: Basket) -> OfferEvaluation:
+        runs: List[BundleRun] = []
+        names: Dict[int, str] = {}
+        for sku, basket_item in basket.get_items_list().items():
+            mask = self._slot_masks.get(sku)
+            if mask is not None:
+                price = basket_item.product.price.minor_units
+                runs.append((sku, price, basket_item.qty, mask))
+                names[sku] = basket_item.product.name
+        bundles, saving, used = self._best_bundles(runs)
+        if not bundles:
+            logger.debug(f"No bundle of offer '{self.name}' saves anything")
+            return NOT_APPLICABLE
+        logger.debug(f"Formed {bundles} bundles of offer '{self.name}'")
+        return OfferEvaluation(
+            True, Money.from_minor_units(saving), [names[sku] for sku in used]
+        )
+
+    def is_applicable(self, basket: Basket) -> bool:
+        return self.evaluate(basket).applicable
+
+    def calculate_discount(self, basket: Basket) -> Money:
+        return self.evaluate(basket).discount
+
+    def scope_skus(self) -> FrozenSet[int]:
+        return self._scope
+
+    def dominates(self, other: AbstractBaseOffer) -> bool:
+        if not isinstance(other, BundleOffer):
+            return False
+        # the same slots for less makes every bundle of other cheaper
+        same_slots = sorted(map(sorted, self.slots)) == sorted(map(sorted, other.slots))
+        return same_slots and self.price <= other.price
+
+    @classmethod
+    def dominated_kinds(cls) -> Tuple[type, ...]:
+        return (BundleOffer,)
+
+    def allocation_options(
+        self, units: Mapping[int, PricedLine]
+    ) -> List[Dict[int, int]]:
+        runs = sorted(self._runs(units), key=lambda run: run[1], reverse=True)
+        bundles, _, _ = self._best_bundles(runs)
+        if not bundles:
+            return []  # no units of the basket make a bundle worth forming
+        options: List[Dict[int, int]] = []
+        seen = set()
+
+        def add(option: Dict[int, int]) -> bool:
+            """Keep option unless it was seen, False once there are enough"""
+            key = tuple(sorted(option.items()))
+            if key not in seen:
+                seen.add(key)
+                options.append(option)
+            return len(options) < MAX_SPLIT_OPTIONS
+
+        # whole bundles only, each one fewer leaves its units to other offers
+        counts = range(bundles, max(bundles - MAX_GROUP_OPTIONS, 0), -1)
+        fills = [(count, self._fill(runs, count)[1]) for count in counts]
+        for _, fill in fills:
+            add(fill)
+        # the same bundles with some units of one sku held back, filled from
+        # the other skus of its slots, for an offer that wants that sku more
+        for count, fill in fills:
+            for sku, used in fill.items():
+                for held_back in range(1, used + 1):
+                    held = [
+                        (
+                            (run[0], run[1], used - held_back, run[3])
+                            if run[0] == sku
+                            else run
+                        )
+                        for run in runs
+                    ]
+                    variant = self._fill(held, count)
+                    if variant is None:
+                        break
+                    if not add(variant[1]):
+                        return options
+        # then any units in scope, every split of a small basket
+        for option in split_options(units, self._scope, len(self.slots)):
+            if not add(option):
+                break
+        return options
+
+    def discount_for_units(
+        self, units: Mapping[int, PricedLine]
+    ) -> tuple[Money, Dict[int, int]]:
+        bundles, saving, used = self._best_bundles(self._runs(units))
+        if not bundles:
+            return Money.zero(), {}
+        return Money.from_minor_units(saving), used
+
+    def _runs(self, units: Mapping[int, PricedLine]) -> List[BundleRun]:
+        runs: List[BundleRun] = []
+        for sku, line in units.items():
+            mask = self._slot_masks.get(sku)
+            if mask is not None and line.qty > 0:
+                runs.append((sku, line.unit_price.minor_units, line.qty, mask))
+        return runs
+
+    def _best_bundles(self, runs: List[BundleRun]) -> Tuple[int, int, Dict[int, int]]:
+        """Number of bundles saving the most, the saving in minor units and
+        the units of each sku they use"""
+        runs = sorted(runs, key=lambda run: run[1], reverse=True)
+        fills: Dict[int, Optional[BundleFill]] = {0: (0, {})}
+
+        def fill(bundles: int) -> Optional[BundleFill]:
+            if bundles not in fills:
+                fills[bundles] = self._fill(runs, bundles)
+            return fills[bundles]
+
+        def worth_it(bundles: int) -> bool:
+            """True when the bundles can be formed and the last one saves"""
+            current = fill(bundles)
+            if current is None:
+                return False
+            return current[0] - fill(bundles - 1)[0] > self._price_units
+
+        # the savings of successive bundles only fall, so the bundles worth
+        # forming are a prefix, found by binary search
+        fewest, most = 0, sum(run[2] for run in runs) // len(self.slots)
+        while fewest < most:
+            middle = (fewest + most + 1) // 2
+            if worth_it(middle):
+                fewest = middle
+            else:
+                most = middle - 1
+        total, used = fill(fewest)
+        return fewest, total - fewest * self._price_units, used
+
+    def _fill(self, runs: List[BundleRun], bundles: int) -> Optional[BundleFill]:
+        """
+        Dearest units filling every slot of the bundles, from runs sorted
+        dearest first, None when the slots cannot all be filled. Units fit
+        while, for every set of slots, the units that can only go to those
+        slots are no more than the bundles times the number of slots.
+        """
+        needed = bundles * len(self.slots)
+        placed = [0] * len(self._supersets)  # slot mask -> units confined to it
+        total = taken = 0
+        used: Dict[int, int] = {}
+        for sku, price, qty, mask in runs:
+            if taken == needed:
+                break
+            supersets = self._supersets[mask]
+            room = min(
+                bundles * self._slot_counts[superset] - placed[superset]
+                for superset in supersets
+            )
+            units = min(qty, room)
+            if units <= 0:
+                continue
+            for superset in supersets:
+                placed[superset] += units
+            total += price * units
+            taken += units
+            used[sku] = units
+        if taken < needed:
+            return None
+        return total, used
+
+    def __str__(self) -> str:
+        return f"{self.name}: one of each of {len(self.slots)} slots for {self.price}"
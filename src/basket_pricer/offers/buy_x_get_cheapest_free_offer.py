@@ -1,9 +1,19 @@
 import logging
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import ClassVar, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
 
-from src.basket_pricer.models import Basket, BasketItem, Money
+from src.basket_pricer.models import Basket, BasketItem, Money, MoneyAccumulator
 from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import (
+    NOT_APPLICABLE,
+    OfferEvaluation,
+    PricedLine,
+    split_options,
+)
+from src.basket_pricer.offers.offer_kernels import (
+    BasketColumns,
+    cheapest_free_discounts,
+)
 from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
 
 logger = logging.getLogger(__name__)
@@ -13,6 +23,12 @@ logger = logging.getLogger(__name__)
 class BuyXGetCheapestFreeOffer(AbstractBaseOffer):
     product_skus: List[int] = field(default_factory=list)
     quantity: int = 0
+    # which units it takes decides what is left for every other offer
+    allocation_order: ClassVar[int] = 0
+    # product_skus as a set, built once so membership checks are O(1)
+    _scope: FrozenSet[int] = field(
+        default=frozenset(), init=False, repr=False, compare=False
+    )
 
     def __post_init__(self) -> None:
         super().__post_init__()
@@ -33,14 +49,26 @@ class BuyXGetCheapestFreeOffer(AbstractBaseOffer):
             raise InvalidOfferConfigError(
                 f"Multi-product offer needs at least 2 products, got {len(self.product_skus)}"
             )
+        self._scope = frozenset(self.product_skus)
         logger.debug("BuyXGetCheapestFree Offer Created")
 
-    def is_applicable(self, basket: Basket) -> bool:
-        total_eligible, _ = self.get_eligible_basket_items(basket)
-        is_applicable = total_eligible >= self.quantity
-        if not is_applicable:
+    def evaluate(self, basket: Basket) -> OfferEvaluation:
+        runs = []
+        eligible_product_names: List[str] = []
+        for sku, basket_item in basket.get_items_list().items():
+            if sku in self._scope:
+                runs.append((sku, basket_item.product.price, basket_item.qty))
+                eligible_product_names.append(basket_item.product.name)
+        total_eligible = sum(qty for _, _, qty in runs)
+        if total_eligible < self.quantity:
             logger.debug("Insufficient Items in basket for buyXGetCheapestFree Offer")
-        return is_applicable
+            return NOT_APPLICABLE
+        discount, _ = self._group_runs(runs)
+        logger.debug("Calculated discount of BuyXGetCheapestOffer discount.")
+        return OfferEvaluation(True, discount, eligible_product_names)
+
+    def is_applicable(self, basket: Basket) -> bool:
+        return self.evaluate(basket).applicable
 
     def get_eligible_basket_items(
         self, basket: Basket
@@ -50,60 +78,96 @@ class BuyXGetCheapestFreeOffer(AbstractBaseOffer):
 
         basket_items = basket.get_items_list()  # [(sku, BasketItem),..]
         for sku, basket_item in basket_items.items():
-            if sku in self.product_skus:
+            if sku in self._scope:
                 total_eligible += basket_item.qty
                 eligible_product_names.append(basket_item.product.name)
 
         return total_eligible, eligible_product_names
 
     def calculate_discount(self, basket: Basket) -> Money:
-        all_eligible_items: List[tuple[int, Money]] = []  # (sku, price)
-        free_items: List[tuple[int, Money]] = []  # Form groups and calculate discount
-        total_discount = Money.zero()
-
-        basket_items = basket.get_items_list()  # returns [(sku, BasketItem),..]
-
-        # Adding each eligible unit individually in form of (sku, price), for sorting on price
-        # Example: 3 Large Shampoos will have 3 entries of (Large, 3.50)
-        for sku, basket_item in basket_items.items():
-            if sku in self.product_skus:
-                for _ in range(basket_item.qty):
-                    all_eligible_items.append(
-                        (basket_item.product.sku, basket_item.product.price)
-                    )
+        return self.evaluate(basket).discount
+
+    def scope_skus(self) -> FrozenSet[int]:
+        return self._scope
+
+    def dominates(self, other: AbstractBaseOffer) -> bool:
+        if not isinstance(other, BuyXGetCheapestFreeOffer):
+            return False
+        if not other.quantity:
+            return True  # other never gives a discount
+        # on the same units, smaller groups free at least as many units, each
+        # at least as dear, and a wider scope can take every unit other can
+        return 0 < self.quantity <= other.quantity and other._scope <= self._scope
+
+    @classmethod
+    def dominated_kinds(cls) -> Tuple[type, ...]:
+        return (BuyXGetCheapestFreeOffer,)
+
+    def allocation_options(
+        self, units: Mapping[int, PricedLine]
+    ) -> List[Dict[int, int]]:
+        # whole groups of any units in scope, not just the dearest ones, as
+        # the units it pays for may be worth more to another offer
+        return split_options(units, self._scope, self.quantity)
+
+    def discount_for_units(
+        self, units: Mapping[int, PricedLine]
+    ) -> tuple[Money, Dict[int, int]]:
+        runs = [
+            (sku, line.unit_price, line.qty)
+            for sku, line in units.items()
+            if line.qty > 0 and sku in self._scope
+        ]
+        return self._group_runs(runs)
+
+    def _group_runs(
+        self, eligible_runs: List[tuple[int, Money, int]]
+    ) -> tuple[Money, Dict[int, int]]:
+        """
+        Discount for (sku, unit price, qty) runs, and the units of each sku
+        that end up in a complete group.
+        One run per eligible sku instead of one entry per unit, so the work
+        depends on the number of distinct skus and not on their quantities
+        """
+        total_eligible = sum(qty for _, _, qty in eligible_runs)
 
         # If not enough items, no discount
-        if len(all_eligible_items) < self.quantity:
-            return Money.zero()
+        if not self.quantity or total_eligible < self.quantity:
+            return Money.zero(), {}
 
         # Sorting by price DESCENDING (expensive first) so that
         # expensive items are "bought", cheap ones are "free"
-        all_eligible_items.sort(key=lambda x: x[1], reverse=True)
+        eligible_runs = sorted(eligible_runs, key=lambda run: run[1], reverse=True)
 
         # total groups can be formed
-        num_groups = len(all_eligible_items) // self.quantity
-
-        for group_idx in range(num_groups):
-            # Get items for this group
-            start = group_idx * self.quantity
-            end = start + self.quantity
-            group = all_eligible_items[start:end]
-
-            # After sorting descending, last item is cheapest
-            cheapest_item = group[-1]  # Last item in group
-            free_items.append(cheapest_item)
-            total_discount = (
-                total_discount + cheapest_item[1]
-            )  # cheapest_item[1] will give the unit price of the item
-
-        logger.debug("Calculated discount of BuyXGetCheapestOffer discount.")
-
-        return total_discount
+        num_groups = total_eligible // self.quantity
+        grouped_units = num_groups * self.quantity
+        total_discount = MoneyAccumulator()
+        grouped: Dict[int, int] = {}
+
+        # Laying the runs out in sorted order, the cheapest (free) unit of group k
+        # sits at position k * quantity - 1, so a run covering positions
+        # [start, end) holds the free units of groups start // quantity + 1
+        # up to end // quantity
+        start = 0
+        for sku, unit_price, qty in eligible_runs:
+            end = min(start + qty, grouped_units)
+            free_units = end // self.quantity - start // self.quantity
+            if free_units > 0:
+                total_discount.add_times(unit_price, free_units)
+            grouped[sku] = end - start
+            if end == grouped_units:
+                break
+            start = end
+
+        return total_discount.total(), grouped
+
+    def batch_discounts(self, columns: BasketColumns) -> Sequence[int]:
+        return cheapest_free_discounts(columns, self._scope, self.quantity)
 
     def __str__(self) -> str:
         products_str = ", ".join(self.product_skus)
         return f"Buy {self.quantity} Get Cheapest Free from sku's : [{products_str}] "
 
     def _get_affected_items(self, basket: Basket):
-        _, prod_names = self.get_eligible_basket_items(basket)
-        return prod_names
+        return self.evaluate(basket).affected_items
@@ -1,18 +1,41 @@
 import logging
-from dataclasses import dataclass
+import math
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, FrozenSet, List, Mapping, Sequence, Tuple
 
 from src.basket_pricer.models import Basket, Money
 from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import (
+    MAX_GROUP_OPTIONS,
+    NOT_APPLICABLE,
+    OfferEvaluation,
+    PricedLine,
+)
+from src.basket_pricer.offers.offer_kernels import (
+    BasketColumns,
+    buy_x_get_y_discounts,
+)
 from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
 
 logger = logging.getLogger(__name__)
 
+# offers with group sizes repeating over more units than this are compared
+# by group size and free units only, instead of unit count by unit count
+MAX_DOMINANCE_PERIOD = 10_000
+
 
 @dataclass
 class BuyXgetYfree(AbstractBaseOffer):
     sku: int  # sku of the product on which this discount is valid
     buy: int = 0  # number of product should be bought to avail this offer
     free: int = 0  # number of prod
+    # items needed for one free group (buy + free), derived once
+    _group_size: int = field(default=0, init=False, repr=False, compare=False)
+    _scope: FrozenSet[int] = field(
+        default=frozenset(), init=False, repr=False, compare=False
+    )
+    # whole groups only, so it is searched before offers taking any leftover
+    allocation_order: ClassVar[int] = 1
 
     def __post_init__(self):
         super().__post_init__()  # call the parents validations first
@@ -22,46 +45,89 @@ class BuyXgetYfree(AbstractBaseOffer):
             )
         if self.buy < 0 or self.free < 0:
             raise InvalidOfferConfigError(f"X and Y in {self.name} must be positive")
+        self._group_size = self.buy + self.free
+        self._scope = frozenset([self.sku])
         logger.debug(f"Buy {self.buy} get {self.free} free offer created.")
 
-    def is_applicable(self, basket: Basket):
-        is_applicable: bool = False
+    def evaluate(self, basket: Basket) -> OfferEvaluation:
         if not isinstance(basket, Basket):
             raise TypeError(f"Expected Basket Type, but got {type(basket).__name__}")
-
-        min_req_qty = self.buy + self.free
-        if basket.has_product(
-            self.sku
-        ):  # if required sku for the offer is peresent in the basket
-            prod_qty = basket.fetch_quantity(self.sku)
-            is_applicable = (
-                prod_qty >= min_req_qty
-            )  # if minimum required items are present in basket
-        if not is_applicable:
+        basket_item = basket.get_items_list().get(self.sku)  # the only line it needs
+        if basket_item is None or basket_item.qty < self._group_size:
             logger.debug(
-                f"Offer not valid on the basket, as minimum {min_req_qty} product are required"
+                f"Offer not valid on the basket, as minimum {self._group_size} product are required"
             )
+            return NOT_APPLICABLE
+        groups = basket_item.qty // self._group_size if self._group_size else 0
+        final_discount = basket_item.product.price * (groups * self.free)
+        logger.debug(f"Discount Calculated for offer '{self.name}' : {final_discount}")
+        return OfferEvaluation(True, final_discount, [basket_item.product.name])
 
-        return is_applicable
+    def is_applicable(self, basket: Basket):
+        return self.evaluate(basket).applicable
 
     def calculate_discount(self, basket):
-        if not isinstance(basket, Basket):
-            raise TypeError(f"Expected Basket Type, but got {type(basket).__name__}")
-        if not basket.has_product(self.sku):
-            return Money.zero()  # already checked in is_applicable()
-        quantity = basket.fetch_quantity(
-            self.sku
-        )  # fetch total items present in the basket of this sku
-        product = basket.fetch_product(self.sku)
-        unit_price = product.price
-        min_items = (
-            self.buy + self.free
-        )  # minimum elements required for availing the offer
-        groups = quantity // min_items
-        group_amount = unit_price * groups
-        final_discount = group_amount * self.free
-        logger.debug(f"Discount Calculated for offer '{self.name}' : {final_discount}")
-        return final_discount
+        return self.evaluate(basket).discount
+
+    def scope_skus(self) -> FrozenSet[int]:
+        return self._scope
+
+    def dominates(self, other: AbstractBaseOffer) -> bool:
+        if not isinstance(other, BuyXgetYfree) or other.sku != self.sku:
+            return False
+        if not other._group_size or not other.free:
+            return True  # other never gives a discount
+        if not self._group_size or not self.free:
+            return False
+        return self._frees_at_least(other)
+
+    @classmethod
+    def dominated_kinds(cls) -> Tuple[type, ...]:
+        return (BuyXgetYfree,)
+
+    def _frees_at_least(self, other: "BuyXgetYfree") -> bool:
+        """
+        True when this offer frees at least as many units as `other` for
+        every quantity. The free units of both repeat every lcm of the group
+        sizes, so checking one period covers every quantity.
+        """
+        period = math.lcm(self._group_size, other._group_size)
+        if period > MAX_DOMINANCE_PERIOD:
+            return self._group_size <= other._group_size and self.free >= other.free
+        return all(
+            (qty // self._group_size) * self.free
+            >= (qty // other._group_size) * other.free
+            for qty in range(1, period + 1)
+        )
+
+    def allocation_options(
+        self, units: Mapping[int, PricedLine]
+    ) -> List[Dict[int, int]]:
+        line = units.get(self.sku)
+        if line is None or not self._group_size or not self.free:
+            return []
+        groups = line.qty // self._group_size
+        fewest = max(groups - MAX_GROUP_OPTIONS, 0)
+        # whole groups only, the units left over can go to another offer
+        return [
+            {self.sku: count * self._group_size} for count in range(groups, fewest, -1)
+        ]
+
+    def discount_for_units(
+        self, units: Mapping[int, PricedLine]
+    ) -> tuple[Money, Dict[int, int]]:
+        line = units.get(self.sku)
+        if line is None or not self._group_size or not self.free:
+            return Money.zero(), {}
+        groups = line.qty // self._group_size
+        if groups == 0:
+            return Money.zero(), {}
+        return line.unit_price * (groups * self.free), {
+            self.sku: groups * self._group_size
+        }
+
+    def batch_discounts(self, columns: BasketColumns) -> Sequence[int]:
+        return buy_x_get_y_discounts(columns, self.sku, self._group_size, self.free)
 
     def __str__(self) -> str:
         return f"Buy {self.buy} Get {self.free} Free Offer on product sku : {self.sku}"
@@ -0,0 +1,324 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from src.basket_pricer.models import Money
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import PricedLine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_BUDGET = 0.05  # seconds of search per basket
+# components with more competing offers than this go straight to greedy
+MAX_SEARCH_OFFERS = 64
+_CLOCK_CHECK_EVERY = 128  # search nodes between two looks at the clock
+
+PositionedOffer = Tuple[int, AbstractBaseOffer]
+
+
+@dataclass(frozen=True)
+class OfferAllocation:
+    """One offer with the units it was given and the discount they earn"""
+
+    offer: AbstractBaseOffer
+    position: int  # position of the offer in the offer list
+    discount: Money
+    units: Dict[int, int]  # sku -> units used by the offer
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class OfferAllocator:
+    """
+    Gives every unit in the basket to at most one offer, choosing the split
+    that maximises the total discount.
+
+    Offers only compete through the skus they share, so the basket is cut
+    into independent components first and each one is searched on its own.
+    The search is a memoised branch and bound over each offer's candidate
+    units, it falls back to a greedy split once the time budget is spent.
+    """
+
+    def __init__(self, time_budget: Optional[float] = DEFAULT_TIME_BUDGET) -> None:
+        if time_budget is not None and time_budget < 0:
+            raise ValueError(f"Time budget cannot be negative, got {time_budget}")
+        self.time_budget = time_budget
+
+    def allocate(
+        self,
+        offers: Sequence[PositionedOffer],
+        lines: Mapping[int, PricedLine],
+    ) -> List[OfferAllocation]:
+        """Best allocation of the basket lines (sku -> PricedLine) to offers,
+        in offer order"""
+        deadline = self.deadline()
+        allocations: List[OfferAllocation] = []
+        for component_offers, component_skus in self.components(offers, lines):
+            allocations.extend(
+                self.allocate_component(
+                    component_offers, component_skus, lines, deadline
+                )
+            )
+        allocations.sort(key=lambda allocation: allocation.position)
+        return allocations
+
+    def deadline(self) -> Optional[float]:
+        """perf_counter time at which a search started now must give up"""
+        if self.time_budget is None:
+            return None
+        return time.perf_counter() + self.time_budget
+
+    @staticmethod
+    def components(
+        offers: Sequence[PositionedOffer], lines: Mapping[int, PricedLine]
+    ) -> List[Tuple[List[PositionedOffer], List[int]]]:
+        """Split offers into groups that share no basket sku, with their skus"""
+        parent: Dict[int, int] = {}
+
+        def find(sku: int) -> int:
+            root = parent.setdefault(sku, sku)
+            while root != parent[root]:
+                parent[root] = parent[parent[root]]
+                root = parent[root]
+            return root
+
+        scoped: List[Tuple[PositionedOffer, List[int]]] = []
+        for position, offer in offers:
+            skus = [sku for sku in offer.scope_skus() if sku in lines]
+            if not skus:
+                continue
+            first = find(skus[0])
+            for sku in skus[1:]:
+                parent[find(sku)] = first
+            scoped.append(((position, offer), skus))
+
+        grouped: Dict[int, Tuple[List[PositionedOffer], List[int]]] = {}
+        for positioned, skus in scoped:
+            grouped.setdefault(find(skus[0]), ([], []))[0].append(positioned)
+        # sorted, so the result does not depend on the order lines were added
+        for sku in sorted(parent):
+            grouped[find(sku)][1].append(sku)
+        return list(grouped.values())
+
+    def allocate_component(
+        self,
+        offers: List[PositionedOffer],
+        skus: List[int],
+        lines: Mapping[int, PricedLine],
+        deadline: Optional[float] = None,
+    ) -> List[OfferAllocation]:
+        """Allocate the units of one component between its offers"""
+        if len(offers) == 1:
+            # nothing competes, all the units it can use are the best choice
+            return _greedy(offers, skus, lines)
+        if len(offers) > MAX_SEARCH_OFFERS:
+            logger.warning(
+                f"{len(offers)} offers compete for the same skus, allocating greedily"
+            )
+            return _greedy(offers, skus, lines)
+        try:
+            return _ComponentSearch(offers, skus, lines, deadline).solve()
+        except _BudgetExceeded:
+            logger.info(
+                f"Offer allocation over {len(offers)} offers ran out of time, "
+                "allocating greedily"
+            )
+            return _greedy(offers, skus, lines)
+
+
+def _offer_units(
+    offer: AbstractBaseOffer,
+    skus: List[int],
+    lines: Mapping[int, PricedLine],
+    remaining: Mapping[int, int],
+) -> Dict[int, PricedLine]:
+    """Lines still unallocated that this offer can use"""
+    scope = offer.scope_skus()
+    return {
+        sku: lines[sku]._replace(qty=remaining[sku])
+        for sku in skus
+        if sku in scope and remaining[sku] > 0
+    }
+
+
+def _standalone(
+    offer: AbstractBaseOffer,
+    skus: List[int],
+    lines: Mapping[int, PricedLine],
+    remaining: Mapping[int, int],
+) -> int:
+    """Minor units the offer would give on its own from the remaining units"""
+    discount, _ = offer.discount_for_units(_offer_units(offer, skus, lines, remaining))
+    return discount.minor_units
+
+
+def _greedy(
+    offers: List[PositionedOffer],
+    skus: List[int],
+    lines: Mapping[int, PricedLine],
+) -> List[OfferAllocation]:
+    """Biggest standalone discount first, each offer takes what it can use"""
+    remaining = {sku: lines[sku].qty for sku in skus}
+    ranked = sorted(
+        offers,
+        key=lambda entry: (-_standalone(entry[1], skus, lines, remaining), entry[0]),
+    )
+    allocations: List[OfferAllocation] = []
+    for position, offer in ranked:
+        units = _offer_units(offer, skus, lines, remaining)
+        if not units:
+            continue
+        discount, used = offer.discount_for_units(units)
+        if discount.is_zero():
+            continue
+        for sku, qty in used.items():
+            remaining[sku] -= qty
+        allocations.append(OfferAllocation(offer, position, discount, used))
+    return allocations
+
+
+class _ComponentSearch:
+    """
+    Depth first search over the offers of one component, one offer per level.
+    At each level the offer takes one of its candidate units or nothing,
+    results are memoised on (level, units left) and a branch is cut when
+    its discount plus the most the later offers could add cannot beat the
+    best found so far.
+
+    Offers spanning several skus are searched first. Once they have taken
+    their units the single-sku offers of different skus no longer interact,
+    so each sku is searched on its own (stage = sku) and the results added.
+    """
+
+    def __init__(
+        self,
+        offers: List[PositionedOffer],
+        skus: List[int],
+        lines: Mapping[int, PricedLine],
+        deadline: Optional[float],
+    ) -> None:
+        self.lines = lines
+        self.deadline = deadline
+        self.memo: Dict[tuple, Tuple[int, tuple]] = {}
+        self.nodes = 0
+
+        shared: List[PositionedOffer] = []
+        single: Dict[int, List[PositionedOffer]] = {}
+        for entry in offers:
+            scope = [sku for sku in skus if sku in entry[1].scope_skus()]
+            if len(scope) > 1:
+                shared.append(entry)
+            else:
+                single.setdefault(scope[0], []).append(entry)
+
+        # stage -> (offers in search order, their skus, (sku, slot) scope of each
+        # offer, bound from each level on)
+        self.stages: Dict[Optional[int], tuple] = {}
+        singles_bound = 0
+        for sku, sku_offers in single.items():
+            self.stages[sku] = self._stage(sku_offers, [sku], 0)
+            singles_bound += self.stages[sku][3][0]
+        self.stages[None] = self._stage(shared, skus, singles_bound)
+
+    def _stage(
+        self, offers: List[PositionedOffer], skus: List[int], tail: int
+    ) -> tuple:
+        offers = sorted(offers, key=lambda entry: (entry[1].allocation_order, entry[0]))
+        # (sku, slot in the remaining units) each offer can use, found once
+        scopes = []
+        for _, offer in offers:
+            scope = offer.scope_skus()
+            scopes.append(
+                [(sku, slot) for slot, sku in enumerate(skus) if sku in scope]
+            )
+        # discounts never shrink with more units, so what an offer gets on the
+        # whole basket bounds what it gets from any leftover
+        full = {sku: self.lines[sku].qty for sku in skus}
+        upper = [tail] * (len(offers) + 1)
+        for level in range(len(offers) - 1, -1, -1):
+            upper[level] = upper[level + 1] + _standalone(
+                offers[level][1], skus, self.lines, full
+            )
+        return offers, skus, scopes, upper
+
+    def solve(self) -> List[OfferAllocation]:
+        skus = self.stages[None][1]
+        start = tuple(self.lines[sku].qty for sku in skus)
+        _, choices = self._best(None, 0, start)
+        allocations: List[OfferAllocation] = []
+        for stage, level, discount, used in choices:
+            position, offer = self.stages[stage][0][level]
+            allocations.append(OfferAllocation(offer, position, discount, used))
+        return allocations
+
+    def _tick(self) -> None:
+        self.nodes += 1
+        if (
+            self.deadline is not None
+            and self.nodes % _CLOCK_CHECK_EVERY == 1
+            and time.perf_counter() > self.deadline
+        ):
+            raise _BudgetExceeded()
+
+    def _singles(self, remaining: tuple) -> Tuple[int, tuple]:
+        """Best of every sku's single-sku offers over the units left"""
+        skus = self.stages[None][1]
+        value, choices = 0, ()
+        for sku, qty in zip(skus, remaining):
+            if qty > 0 and sku in self.stages:
+                sku_value, sku_choices = self._best(sku, 0, (qty,))
+                value += sku_value
+                choices += sku_choices
+        return value, choices
+
+    def _best(
+        self, stage: Optional[int], level: int, remaining: tuple
+    ) -> Tuple[int, tuple]:
+        """(best discount in minor units, choices made) from this level on"""
+        offers, skus, scopes, upper = self.stages[stage]
+        if level == len(offers):
+            return self._singles(remaining) if stage is None else (0, ())
+        if upper[level] == 0:
+            return 0, ()
+        key = (stage, level, remaining)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+        self._tick()
+
+        _, offer = offers[level]
+        slots = {}
+        units = {}
+        for sku, slot in scopes[level]:
+            if remaining[slot] > 0:
+                slots[sku] = slot
+                units[sku] = self.lines[sku]._replace(qty=remaining[slot])
+
+        best = self._best(stage, level + 1, remaining)  # offer gets nothing
+        if units:
+            for option in offer.allocation_options(units):
+                if best[0] >= upper[level]:
+                    break  # nothing can do better than the bound
+                given = {
+                    sku: units[sku]._replace(qty=qty)
+                    for sku, qty in option.items()
+                    if qty > 0
+                }
+                if not given:
+                    continue
+                discount, used = offer.discount_for_units(given)
+                value = discount.minor_units
+                if value == 0 or value + upper[level + 1] <= best[0]:
+                    continue
+                after = list(remaining)
+                for sku, qty in used.items():
+                    after[slots[sku]] -= qty
+                rest, choices = self._best(stage, level + 1, tuple(after))
+                if value + rest > best[0]:
+                    best = (value + rest, ((stage, level, discount, used),) + choices)
+
+        self.memo[key] = best
+        return best
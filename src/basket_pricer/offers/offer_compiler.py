@@ -0,0 +1,158 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.basket_pricer.offers import AbstractBaseOffer
+
+logger = logging.getLogger(__name__)
+
+# newest offers of one class kept on a sku that an offer is compared with,
+# once for being dominated by them and once for dominating them
+MAX_DOMINANCE_CHECKS = 8
+
+
+@dataclass(frozen=True)
+class DroppedOffer:
+    """An offer left out of pricing, and the kept offer that beats it"""
+
+    offer: AbstractBaseOffer
+    dominated_by: AbstractBaseOffer
+
+    def __str__(self):
+        return (
+            f"'{self.offer.name}' ({self.offer.id}) dropped, "
+            f"dominated by '{self.dominated_by.name}' ({self.dominated_by.id})"
+        )
+
+
+@dataclass(frozen=True)
+class CompiledOffers:
+    """Offers worth evaluating at runtime, in their original order"""
+
+    offers: Tuple[AbstractBaseOffer, ...]
+    dropped: Tuple[DroppedOffer, ...] = ()
+
+
+def compile_offers(
+    offers: Iterable[AbstractBaseOffer], windows: bool = True
+) -> CompiledOffers:
+    """
+    Drop offers dominated by another offer on the same skus, e.g. 10% off
+    a sku that also has 20% off, since they can never win a unit. Of two
+    offers that are as good as each other the first one is kept. Only
+    offers sharing a sku are compared, and basket-level offers are always
+    kept. An offer is only dropped for one that is live whenever it is,
+    unless windows is False for offers all live at the same moment.
+
+    Offers are taken in order. Each is compared only with the offers kept
+    so far on its skus, of the classes dominated_kinds() pairs it with, and
+    the kept ones it dominates are dropped in turn. Dominance carries over, so the kept
+    offers stand for the dropped ones. At most MAX_DOMINANCE_CHECKS of
+    them are compared each way, so many offers on one sku compile in
+    linear time; an offer past the limit is kept, which only costs time
+    when pricing.
+    """
+    offers = list(offers)
+    dropped_by: Dict[int, int] = {}  # position -> position of a dominating offer
+    # offer class -> sku -> positions of the offers of the class kept on the
+    # sku, newest last; a dropped offer stays on its other skus until met
+    kept: Dict[type, Dict[int, List[int]]] = {}
+    # class -> the kept offers of the classes that can dominate it, and of
+    # the classes it can dominate, rebuilt when a new class turns up
+    dominating: Dict[type, List[Dict[int, List[int]]]] = {}
+    dominated: Dict[type, List[Dict[int, List[int]]]] = {}
+
+    def beats(rival_position: int, position: int) -> bool:
+        rival, offer = offers[rival_position], offers[position]
+        if not rival.dominates(offer):
+            return False
+        return not windows or rival.live_throughout(offer)
+
+    for position, offer in enumerate(offers):
+        scope = offer.scope_skus()
+        if not scope:
+            continue
+        kind = type(offer)
+        if kind not in kept:
+            kept[kind] = {}
+            kinds = {one: one.dominated_kinds() for one in kept}
+            for one in kept:
+                dominating[one] = [
+                    kept[other] for other in kept if issubclass(one, kinds[other])
+                ]
+                dominated[one] = [
+                    kept[other] for other in kept if issubclass(other, kinds[one])
+                ]
+        # a dominating offer covers every sku of this one, so any of them will do
+        first_sku = next(iter(scope))
+        for by_sku in dominating[kind]:
+            positions = by_sku.get(first_sku)
+            if positions:
+                rival_position = _dominating(position, positions, dropped_by, beats)
+                if rival_position is not None:
+                    dropped_by[position] = rival_position
+                    break
+        if position in dropped_by:
+            continue
+        # the kept offers this one dominates have all their skus in its scope
+        for by_sku in dominated[kind]:
+            for sku in scope:
+                positions = by_sku.get(sku)
+                if positions:
+                    _drop_dominated(position, positions, dropped_by, beats)
+        by_sku = kept[kind]
+        for sku in scope:
+            positions = by_sku.get(sku)
+            if positions is None:
+                by_sku[sku] = [position]
+            else:
+                positions.append(position)
+
+    dropped: List[DroppedOffer] = []
+    for position in sorted(dropped_by):
+        # report an offer that is kept, dominance carries over the chain
+        rival_position = dropped_by[position]
+        while rival_position in dropped_by:
+            rival_position = dropped_by[rival_position]
+        dropped.append(DroppedOffer(offers[position], offers[rival_position]))
+        logger.debug(f"Offer {dropped[-1]}")
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} of {len(offers)} offers as dominated")
+    kept_offers = tuple(
+        offer for position, offer in enumerate(offers) if position not in dropped_by
+    )
+    return CompiledOffers(offers=kept_offers, dropped=tuple(dropped))
+
+
+def _dominating(
+    position: int,
+    positions: List[int],
+    dropped_by: Dict[int, int],
+    beats: Callable[[int, int], bool],
+) -> Optional[int]:
+    """Position of one of the newest kept offers of positions dominating the
+    one at position, None when none of them does"""
+    oldest = max(len(positions) - MAX_DOMINANCE_CHECKS, 0)
+    for index in range(len(positions) - 1, oldest - 1, -1):
+        rival_position = positions[index]
+        if rival_position not in dropped_by and beats(rival_position, position):
+            return rival_position
+    return None
+
+
+def _drop_dominated(
+    position: int,
+    positions: List[int],
+    dropped_by: Dict[int, int],
+    beats: Callable[[int, int], bool],
+) -> None:
+    """Drop the newest kept offers of positions that the one at position
+    dominates, and clear out the ones dropped since they were kept"""
+    oldest = max(len(positions) - MAX_DOMINANCE_CHECKS, 0)
+    for index in range(len(positions) - 1, oldest - 1, -1):
+        rival_position = positions[index]
+        if rival_position in dropped_by:
+            del positions[index]
+        elif beats(position, rival_position) and not beats(rival_position, position):
+            dropped_by[rival_position] = position
+            del positions[index]
@@ -0,0 +1,81 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from src.basket_pricer.offers import AbstractBaseOffer
+
+logger = logging.getLogger(__name__)
+
+
+class OfferIndex:
+    """
+    Inverted index from sku to the offers that can apply to it.
+    Built once, so pricing a basket only looks at the offers touching
+    the skus that are actually in the basket.
+    """
+
+    def __init__(self, offers: Iterable[AbstractBaseOffer]) -> None:
+        self.offers: List[AbstractBaseOffer] = list(offers)
+        self._single_sku: Dict[int, List[AbstractBaseOffer]] = {}
+        # multi-sku entries are offer positions, so results follow offer order;
+        # plain ints, which the garbage collector never has to walk
+        self._multi_sku: Dict[int, List[int]] = {}
+        self._basket_level: List[Tuple[int, AbstractBaseOffer]] = []
+        # positions of every offer that discounts particular skus, for unit
+        # allocation
+        self._scoped: Dict[int, List[int]] = {}
+
+        for position, offer in enumerate(self.offers):
+            # classified by the skus the offer declares, whatever its class
+            scope = offer.scope_skus()
+            for sku in scope:
+                self._scoped.setdefault(sku, []).append(position)
+            if len(scope) == 1:
+                self._single_sku.setdefault(next(iter(scope)), []).append(offer)
+            elif scope:
+                for sku in scope:
+                    self._multi_sku.setdefault(sku, []).append(position)
+            else:
+                # no skus: treating as basket‑level, evaluated for every basket
+                self._basket_level.append((position, offer))
+        logger.debug(
+            f"Indexed {len(self.offers)} offers over "
+            f"{len(self._single_sku) + len(self._multi_sku)} skus"
+        )
+
+    def single_sku_offers(self, sku: int) -> List[AbstractBaseOffer]:
+        """Single-sku offers for this sku, in offer order"""
+        return self._single_sku.get(sku, [])
+
+    def multi_sku_offers(self, skus: Iterable[int]) -> List[AbstractBaseOffer]:
+        """Multi-sku and basket-level offers touching any of these skus,
+        each returned once and in offer order"""
+        return [offer for _, offer in self.multi_sku_offer_positions(skus)]
+
+    def multi_sku_offer_positions(
+        self, skus: Iterable[int]
+    ) -> List[Tuple[int, AbstractBaseOffer]]:
+        """Same as multi_sku_offers, paired with each offer's position"""
+        found: Dict[int, AbstractBaseOffer] = dict(self._basket_level)
+        for sku in skus:
+            for position in self._multi_sku.get(sku, ()):
+                found[position] = self.offers[position]
+        return sorted(found.items(), key=lambda entry: entry[0])
+
+    def scoped_offers(self, skus: Iterable[int]) -> List[Tuple[int, AbstractBaseOffer]]:
+        """(position, offer) for every single or multi-sku offer touching
+        any of these skus, each returned once and in offer order"""
+        found: Dict[int, AbstractBaseOffer] = {}
+        for sku in skus:
+            for position in self._scoped.get(sku, ()):
+                found[position] = self.offers[position]
+        return sorted(found.items(), key=lambda entry: entry[0])
+
+    def basket_level_offers(self) -> List[Tuple[int, AbstractBaseOffer]]:
+        """(position, offer) for offers not tied to any sku"""
+        return self._basket_level
+
+    def has_offers(self) -> bool:
+        return bool(self.offers)
+
+    def __len__(self) -> int:
+        return len(self.offers)
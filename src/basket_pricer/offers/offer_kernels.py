@@ -0,0 +1,309 @@
+import logging
+from array import array
+from decimal import Decimal
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence
+
+from src.basket_pricer.models import Basket, CompactBasket, Money
+from src.basket_pricer.offers.base_offer import PricedLine
+from src.basket_pricer.utils.exceptions import CatalogueError, InvalidBasketError
+
+try:
+    import numpy
+except ImportError:  # optional, installed with basket-pricer[fast]
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+HAVE_NUMPY = numpy is not None
+COLUMN_TYPECODE = "q"
+INT64_MAX = 2**63 - 1
+
+
+class BasketColumns:
+    """
+    Lines of many baskets as parallel columns of basket position, sku,
+    quantity and unit price in minor units, the rows of each basket next to
+    each other and one row per sku of a basket. Built once and then priced
+    by the batch kernel of every offer, each a single pass over the columns,
+    with NumPy arrays when it is installed and Python arrays otherwise.
+    """
+
+    __slots__ = ("basket_ids", "offsets", "rows", "skus", "qtys", "prices")
+
+    def __init__(
+        self,
+        basket_ids: Iterable[Any],
+        skus: Iterable[int],
+        qtys: Iterable[int],
+        prices: Iterable[int],
+        use_numpy: Optional[bool] = None,
+    ):
+        basket_ids, skus = list(basket_ids), [int(sku) for sku in skus]
+        qtys, prices = [int(qty) for qty in qtys], [int(price) for price in prices]
+        if not len(basket_ids) == len(skus) == len(qtys) == len(prices):
+            raise InvalidBasketError(
+                f"Columns differ in length: {len(basket_ids)} basket ids, "
+                f"{len(skus)} skus, {len(qtys)} quantities, {len(prices)} prices"
+            )
+        if qtys and min(qtys) <= 0:
+            raise ValueError("Quantity must be positive and greater than 0")
+        if prices and min(prices) < 0:
+            raise ValueError("Prices cannot be negative")
+
+        self.basket_ids: List[Any] = []
+        offsets, rows = [0], []
+        merged_skus: List[int] = []
+        merged_qtys: List[int] = []
+        merged_prices: List[int] = []
+        seen = set()
+        lines: Dict[int, int] = {}  # sku -> row of the current basket
+        for basket_id, sku, qty, price in zip(basket_ids, skus, qtys, prices):
+            if not self.basket_ids or basket_id != self.basket_ids[-1]:
+                if basket_id in seen:
+                    raise InvalidBasketError(
+                        f"Lines of basket {basket_id} are not next to each other"
+                    )
+                seen.add(basket_id)
+                if self.basket_ids:
+                    offsets.append(len(rows))
+                self.basket_ids.append(basket_id)
+                lines = {}
+            row = lines.get(sku)
+            if row is None:  # repeated skus are merged, like Basket.add_item does
+                lines[sku] = len(rows)
+                rows.append(len(self.basket_ids) - 1)
+                merged_skus.append(sku)
+                merged_qtys.append(qty)
+                merged_prices.append(price)
+            elif merged_prices[row] != price:
+                raise InvalidBasketError(
+                    f"Basket {basket_id} has sku {sku} at two different prices"
+                )
+            else:
+                merged_qtys[row] += qty
+        if rows:
+            offsets.append(len(rows))
+
+        if use_numpy is None:
+            use_numpy = HAVE_NUMPY
+        elif use_numpy and not HAVE_NUMPY:
+            raise ImportError("NumPy is not installed, pip install basket-pricer[fast]")
+        column = _numpy_column if use_numpy else _python_column
+        self.offsets = column(offsets)
+        self.rows = column(rows)
+        self.skus = column(merged_skus)
+        self.qtys = column(merged_qtys)
+        self.prices = column(merged_prices)
+        logger.debug(f"Basket columns built: {len(self)} baskets, {len(rows)} lines")
+
+    @classmethod
+    def from_baskets(
+        cls,
+        baskets: Iterable[Any],
+        prices: Optional[Mapping[int, Money]] = None,
+        use_numpy: Optional[bool] = None,
+    ) -> "BasketColumns":
+        """
+        From Baskets or CompactBaskets, or (basket_id, basket) pairs like
+        calculate_many takes. Basket lines keep their product's price,
+        CompactBasket lines are priced from prices, e.g. context.prices.
+        Empty baskets have no lines, so they are left out.
+        """
+        basket_ids: List[Any] = []
+        skus: List[int] = []
+        qtys: List[int] = []
+        minor_prices: List[int] = []
+        for position, item in enumerate(baskets):
+            basket_id, basket = item if isinstance(item, tuple) else (position, item)
+            if isinstance(basket, Basket):
+                lines = [
+                    (sku, basket_item.qty, basket_item.product.price)
+                    for sku, basket_item in basket.get_items_list().items()
+                ]
+            elif isinstance(basket, CompactBasket):
+                lines = []
+                for sku, qty in basket.items():
+                    price = prices.get(sku) if prices is not None else None
+                    if price is None:
+                        raise CatalogueError(f"No price for sku {sku}")
+                    lines.append((sku, qty, price))
+            else:
+                raise TypeError(f"Expected Basket Type and got {type(basket).__name__}")
+            for sku, qty, price in lines:
+                basket_ids.append(basket_id)
+                skus.append(sku)
+                qtys.append(qty)
+                minor_prices.append(price.minor_units)
+        return cls(basket_ids, skus, qtys, minor_prices, use_numpy=use_numpy)
+
+    @property
+    def uses_numpy(self) -> bool:
+        return not isinstance(self.skus, array)
+
+    def basket_units(self, position: int) -> Dict[int, PricedLine]:
+        """Lines of one basket as allocation units, for offers without a kernel"""
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        return {
+            int(sku): PricedLine(
+                int(sku), int(qty), Money.from_minor_units(int(price)), f"sku {sku}"
+            )
+            for sku, qty, price in zip(
+                self.skus[start:end], self.qtys[start:end], self.prices[start:end]
+            )
+        }
+
+    def zeros(self) -> Sequence[int]:
+        """One zero discount per basket, in the columns' array type"""
+        if self.uses_numpy:
+            return numpy.zeros(len(self), dtype=numpy.int64)
+        return array(COLUMN_TYPECODE, bytes(8 * len(self)))
+
+    def _fits_int64(self, factor: int) -> bool:
+        """True when every row's price x quantity x factor, summed over all
+        rows, stays within int64, so NumPy arithmetic cannot overflow"""
+        if not len(self.rows):
+            return True
+        largest = int(self.prices.max()) * int(self.qtys.max())
+        return largest * factor * len(self.rows) <= INT64_MAX
+
+    def _as_python(self) -> "BasketColumns":
+        """The same columns as Python arrays, whose kernels work on Python ints"""
+        columns = object.__new__(BasketColumns)
+        columns.basket_ids = self.basket_ids
+        for name in ("offsets", "rows", "skus", "qtys", "prices"):
+            setattr(columns, name, _python_column(getattr(self, name).tolist()))
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.basket_ids)
+
+    def __repr__(self):
+        backend = "numpy" if self.uses_numpy else "python"
+        return f"BasketColumns(baskets={len(self)}, lines={len(self.rows)}, {backend})"
+
+
+def _python_column(values: List[int]) -> array:
+    return array(COLUMN_TYPECODE, values)
+
+
+def _numpy_column(values: List[int]):
+    return numpy.array(values, dtype=numpy.int64)
+
+
+def _to_numpy(discounts: array):
+    return numpy.array(discounts, dtype=numpy.int64)
+
+
+def percentage_discounts(columns: BasketColumns, sku: int, rate: Decimal):
+    """
+    Discount of rate off every line of the sku, per basket, rounded half up
+    to minor units like Money does. The rate is an exact fraction, so the
+    rounding is done in integers.
+    """
+    numerator, denominator = rate.as_integer_ratio()
+    if columns.uses_numpy and not columns._fits_int64(2 * numerator + denominator):
+        return _to_numpy(percentage_discounts(columns._as_python(), sku, rate))
+    discounts = columns.zeros()
+    if columns.uses_numpy:
+        lines = columns.skus == sku
+        totals = columns.prices[lines] * columns.qtys[lines]
+        discounts[columns.rows[lines]] = (2 * totals * numerator + denominator) // (
+            2 * denominator
+        )
+        return discounts
+    for row, line_sku, qty, price in zip(
+        columns.rows, columns.skus, columns.qtys, columns.prices
+    ):
+        if line_sku == sku:
+            discounts[row] = (2 * price * qty * numerator + denominator) // (
+                2 * denominator
+            )
+    return discounts
+
+
+def buy_x_get_y_discounts(columns: BasketColumns, sku: int, group_size: int, free: int):
+    """Free units of the sku in every complete group, per basket"""
+    discounts = columns.zeros()
+    if not group_size or not free:
+        return discounts
+    if columns.uses_numpy and not columns._fits_int64(free):
+        return _to_numpy(
+            buy_x_get_y_discounts(columns._as_python(), sku, group_size, free)
+        )
+    if columns.uses_numpy:
+        lines = columns.skus == sku
+        groups = columns.qtys[lines] // group_size
+        discounts[columns.rows[lines]] = columns.prices[lines] * groups * free
+        return discounts
+    for row, line_sku, qty, price in zip(
+        columns.rows, columns.skus, columns.qtys, columns.prices
+    ):
+        if line_sku == sku:
+            discounts[row] = price * (qty // group_size) * free
+    return discounts
+
+
+def cheapest_free_discounts(
+    columns: BasketColumns, skus: FrozenSet[int], quantity: int
+):
+    """
+    Every quantity-th unit free, cheapest last, over the lines of the skus,
+    per basket. Same layout as BuyXGetCheapestFreeOffer._group_runs: within
+    a basket the lines are sorted by price, dearest first, and the free
+    units of group k sit at position k * quantity - 1.
+    """
+    discounts = columns.zeros()
+    if not quantity or not skus:
+        return discounts
+    if columns.uses_numpy and not columns._fits_int64(1):
+        return _to_numpy(cheapest_free_discounts(columns._as_python(), skus, quantity))
+    if columns.uses_numpy:
+        lines = numpy.isin(columns.skus, numpy.fromiter(skus, dtype=numpy.int64))
+        rows, prices, qtys = (
+            columns.rows[lines],
+            columns.prices[lines],
+            columns.qtys[lines],
+        )
+        if not len(rows):
+            return discounts
+        order = numpy.lexsort((-prices, rows))  # by basket, dearest first
+        rows, prices, qtys = rows[order], prices[order], qtys[order]
+        first = numpy.empty(len(rows), dtype=bool)
+        first[0] = True
+        first[1:] = rows[1:] != rows[:-1]
+        starts = numpy.flatnonzero(first)
+        basket_of_line = numpy.cumsum(first) - 1
+        ends = numpy.cumsum(qtys)
+        basket_start = (ends - qtys)[starts]
+        basket_total = numpy.append(basket_start[1:], ends[-1]) - basket_start
+        grouped = (basket_total // quantity * quantity)[basket_of_line]
+        line_start = numpy.minimum(ends - qtys - basket_start[basket_of_line], grouped)
+        line_end = numpy.minimum(ends - basket_start[basket_of_line], grouped)
+        free_units = line_end // quantity - line_start // quantity
+        discounts[rows[starts]] = numpy.add.reduceat(prices * free_units, starts)
+        return discounts
+
+    for position in range(len(columns)):
+        start, end = columns.offsets[position], columns.offsets[position + 1]
+        runs = [
+            (price, qty)
+            for sku, qty, price in zip(
+                columns.skus[start:end],
+                columns.qtys[start:end],
+                columns.prices[start:end],
+            )
+            if sku in skus
+        ]
+        total = sum(qty for _, qty in runs)
+        if total < quantity:
+            continue
+        grouped = total // quantity * quantity
+        start = discount = 0
+        for price, qty in sorted(runs, reverse=True):
+            end = min(start + qty, grouped)
+            discount += price * (end // quantity - start // quantity)
+            if end == grouped:
+                break
+            start = end
+        discounts[position] = discount
+    return discounts
@@ -0,0 +1,198 @@
+import itertools
+import json
+import logging
+import os
+import threading
+from typing import IO, Any, Callable, Iterator, List, Optional, Set, Tuple
+
+from src.basket_pricer.models.catalogue_loader import CatalogueSource
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.offer_registry import offer_from_record
+from src.basket_pricer.offers.offer_set import OfferSet, offer_set_versions
+from src.basket_pricer.utils.exceptions import InvalidOfferConfigError, OfferLoadError
+from src.basket_pricer.utils.records import open_source
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_INTERVAL = 1.0  # seconds between two checks of a watched file
+# lines of a JSONL file parsed together, the file itself is never held whole
+JSONL_CHUNK_LINES = 1024
+# (line or entry number, record, problem found while reading it)
+RawOffer = Tuple[int, Any, Optional[str]]
+
+
+def _json_offers(stream: IO[str]) -> Iterator[RawOffer]:
+    try:
+        document = json.load(stream)
+    except ValueError as error:
+        raise OfferLoadError([(0, f"invalid JSON ({error})")])
+    records = document.get("offers") if isinstance(document, dict) else document
+    if not isinstance(records, list):
+        raise OfferLoadError([(0, 'expected a list of offers or {"offers": [...]}')])
+    for position, record in enumerate(records, start=1):
+        yield position, record, None
+
+
+def _jsonl_offers(stream: IO[str]) -> Iterator[RawOffer]:
+    numbered = (
+        (line_number, line)
+        for line_number, line in enumerate(stream, start=1)
+        if line and not line.isspace()
+    )
+    while True:
+        chunk = list(itertools.islice(numbered, JSONL_CHUNK_LINES))
+        if not chunk:
+            return
+        yield from _jsonl_chunk(chunk)
+
+
+def _jsonl_chunk(chunk: List[Tuple[int, str]]) -> Iterator[RawOffer]:
+    # one parse of a chunk is much faster than one per line, and a chunk
+    # that fails it is parsed again line by line to find the bad lines
+    try:
+        records = json.loads(f"[{','.join(line for _, line in chunk)}]")
+    except ValueError:
+        records = None
+    if records is not None and len(records) == len(chunk):
+        for (line_number, _), record in zip(chunk, records):
+            yield line_number, record, None
+        return
+    for line_number, line in chunk:
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as error:
+            yield line_number, None, f"invalid JSON ({error})"
+
+
+_READERS = {"json": _json_offers, "jsonl": _jsonl_offers}
+
+
+def load_offers(source: CatalogueSource, format: Optional[str] = None) -> OfferSet:
+    """
+    Read every offer of a JSON file (a list, or {"offers": [...]}) or a
+    JSONL file, one offer object per line. Each object names its "type"
+    from OFFER_TYPES. The whole file is validated in one pass and every bad
+    offer is reported together in one OfferLoadError; a good file becomes
+    a new compiled OfferSet with the next offer set version.
+
+    The format is taken from the file extension when not given.
+    """
+    if format is None:
+        is_path = isinstance(source, (str, os.PathLike))
+        format = "jsonl" if is_path and os.fspath(source).endswith(".jsonl") else "json"
+    reader = _READERS.get(format)
+    if reader is None:
+        raise ValueError(f"Unknown offer file format {format!r}, use 'json' or 'jsonl'")
+
+    offers: List[AbstractBaseOffer] = []
+    errors: List[Tuple[int, str]] = []
+    ids: Set[str] = set()
+    with open_source(source) as stream:
+        for position, record, problem in reader(stream):
+            if problem is not None:
+                errors.append((position, problem))
+                continue
+            try:
+                offer = offer_from_record(record)
+            except InvalidOfferConfigError as error:
+                errors.append((position, str(error)))
+                continue
+            if offer.id in ids:
+                errors.append((position, f"duplicate offer id {offer.id!r}"))
+                continue
+            ids.add(offer.id)
+            offers.append(offer)
+
+    if errors:
+        logger.error(f"{len(errors)} invalid offers while loading the offer file")
+        raise OfferLoadError(errors)
+    offer_set = OfferSet.build(
+        offers,
+        version=next(offer_set_versions),
+        source=os.fspath(source) if isinstance(source, (str, os.PathLike)) else None,
+    )
+    logger.info(f"Loaded {len(offers)} offers as offer set version {offer_set.version}")
+    return offer_set
+
+
+class OfferFileWatcher:
+    """
+    Keeps an OfferSet in step with an offer file. A changed file is loaded
+    and compiled in full before anything is replaced; only a file that
+    loads cleanly becomes the current set and is handed to on_reload, e.g.
+    pricer.set_offers. A bad file is logged and the current set kept.
+
+    Write a new version of the file under another name and rename it over
+    the old one, so a half written file is never read.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: Optional[str] = None,
+        on_reload: Optional[Callable[[OfferSet], None]] = None,
+    ) -> None:
+        self.path = path
+        self.format = format
+        self.on_reload = on_reload
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamp = self._file_stamp()
+        # the first load has nothing to fall back on, so its errors are raised
+        self.offer_set = load_offers(path, format=format)
+
+    def _file_stamp(self) -> Tuple[int, int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def reload_if_changed(self) -> bool:
+        """Load the file again if it changed since the last check"""
+        with self._lock:
+            try:
+                stamp = self._file_stamp()
+            except OSError as error:
+                logger.error(f"Offer file {self.path} cannot be read: {error}")
+                return False
+            if stamp == self._stamp:
+                return False
+            # taken before reading, a change made while loading is seen next time
+            self._stamp = stamp
+            try:
+                offer_set = load_offers(self.path, format=self.format)
+            except (OSError, InvalidOfferConfigError) as error:
+                logger.error(
+                    f"Offer file {self.path} not reloaded, keeping offer set "
+                    f"version {self.offer_set.version}: {error}"
+                )
+                return False
+            self.offer_set = offer_set
+        if self.on_reload is not None:
+            self.on_reload(offer_set)
+        return True
+
+    def start(self, interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        """Check the file every interval seconds on a background thread"""
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, args=(interval,), name="offer-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as error:  # e.g. from on_reload, the watcher keeps going
+                logger.error(f"Reloading offers from {self.path} failed: {error}")
@@ -0,0 +1,159 @@
+import dataclasses
+import logging
+import typing
+from typing import Any, Callable, Dict, List, Mapping, Optional, Type
+
+from src.basket_pricer.offers import (
+    AbstractBaseOffer,
+    BundleOffer,
+    BuyXGetCheapestFreeOffer,
+    BuyXgetYfree,
+    PercentageOffer,
+    SpendThresholdOffer,
+    TieredQuantityOffer,
+)
+from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
+
+logger = logging.getLogger(__name__)
+
+# "type" of an offer record -> offer class built from the rest of the record
+OFFER_TYPES: Dict[str, Type[AbstractBaseOffer]] = {
+    "percentage": PercentageOffer,
+    "buy_x_get_y_free": BuyXgetYfree,
+    "buy_x_get_cheapest_free": BuyXGetCheapestFreeOffer,
+    "spend_threshold": SpendThresholdOffer,
+    "tiered_quantity": TieredQuantityOffer,
+    "bundle": BundleOffer,
+}
+# per offer class, a type check for each init field, read once from the class
+_FIELD_CHECKS: Dict[type, Optional[Dict[str, Callable[[Any], bool]]]] = {}
+
+
+def register_offer_type(type_name: str, offer_class: Type[AbstractBaseOffer]) -> None:
+    """Make offer_class loadable from records with this "type" """
+    if not isinstance(offer_class, type) or not issubclass(
+        offer_class, AbstractBaseOffer
+    ):
+        raise TypeError(f"{offer_class!r} is not an AbstractBaseOffer subclass")
+    if type_name in OFFER_TYPES and OFFER_TYPES[type_name] is not offer_class:
+        raise InvalidOfferConfigError(
+            type_name, f"Offer type '{type_name}' is already registered"
+        )
+    OFFER_TYPES[type_name] = offer_class
+    logger.debug(f"Registered offer type '{type_name}': {offer_class.__name__}")
+
+
+def _is_int(value: Any) -> bool:
+    return type(value) is int  # JSON has no other ints, and bool is not one
+
+
+def _is_number(value: Any) -> bool:
+    return type(value) is int or type(value) is float
+
+
+def _is_str(value: Any) -> bool:
+    return type(value) is str
+
+
+def _is_int_list(value: Any) -> bool:
+    return type(value) is list and all(type(item) is int for item in value)
+
+
+def _is_number_list(value: Any) -> bool:
+    return type(value) is list and all(_is_number(item) for item in value)
+
+
+def _is_int_lists(value: Any) -> bool:
+    return type(value) is list and all(_is_int_list(item) for item in value)
+
+
+def _accept(value: Any) -> bool:
+    return True  # anything else is left to the offer to check
+
+
+def _check_for(hint: Any) -> Callable[[Any], bool]:
+    if hint is int:
+        return _is_int
+    if hint is float:
+        return _is_number
+    if hint is str:
+        return _is_str
+    if typing.get_origin(hint) is list and typing.get_args(hint) == (int,):
+        return _is_int_list
+    if typing.get_origin(hint) is list and typing.get_args(hint) == (float,):
+        return _is_number_list
+    if typing.get_origin(hint) is list and typing.get_args(hint) == (List[int],):
+        return _is_int_lists
+    return _accept
+
+
+def _field_checks(offer_class: type) -> Optional[Dict[str, Callable[[Any], bool]]]:
+    """name -> type check of the dataclass init fields, None for other classes"""
+    if offer_class not in _FIELD_CHECKS:
+        checks = None
+        if dataclasses.is_dataclass(offer_class):
+            hints = typing.get_type_hints(offer_class)
+            checks = {
+                field.name: _check_for(hints.get(field.name))
+                for field in dataclasses.fields(offer_class)
+                if field.init
+            }
+        _FIELD_CHECKS[offer_class] = checks
+    return _FIELD_CHECKS[offer_class]
+
+
+_EXPECTED = {
+    _is_int: "a whole number",
+    _is_number: "a number",
+    _is_str: "a string",
+    _is_int_list: "a list of whole numbers",
+    _is_number_list: "a list of numbers",
+    _is_int_lists: "a list of lists of whole numbers",
+}
+
+
+def offer_from_record(record: Mapping[str, Any]) -> AbstractBaseOffer:
+    """
+    Build an offer from a record such as
+    {"type": "percentage", "id": "p1", "name": "20% off", "sku": 5, "percentage": 20}.
+    Raises InvalidOfferConfigError naming every problem with the record.
+    """
+    if not isinstance(record, dict):
+        raise InvalidOfferConfigError(
+            "", f"expected an offer object, got {type(record).__name__}"
+        )
+    type_name = record.get("type")
+    offer_class = OFFER_TYPES.get(type_name) if isinstance(type_name, str) else None
+    if offer_class is None:
+        raise InvalidOfferConfigError(
+            "", f"unknown offer type {type_name!r}, known: {sorted(OFFER_TYPES)}"
+        )
+    values = dict(record)
+    del values["type"]
+
+    checks = _field_checks(offer_class)
+    if checks is not None:
+        for name, value in values.items():
+            check = checks.get(name)
+            if check is None or not check(value):
+                raise InvalidOfferConfigError("", _field_problems(values, checks))
+    try:
+        return offer_class(**values)
+    except InvalidOfferConfigError:
+        raise
+    except (TypeError, ValueError) as error:
+        raise InvalidOfferConfigError("", str(error))
+
+
+def _field_problems(
+    values: Dict[str, Any], checks: Dict[str, Callable[[Any], bool]]
+) -> str:
+    """Every unknown or mistyped field of a record, for the error message"""
+    problems = []
+    for name, value in values.items():
+        check = checks.get(name)
+        if check is None:
+            problems.append(f"unknown field {name!r}")
+        elif not check(value):
+            problems.append(f"{name} must be {_EXPECTED[check]}, got {value!r}")
+    return "; ".join(problems)
@@ -4,6 +4,7 @@ from typing import Iterable, List, Optional, Tuple
 
 from src.basket_pricer.models import Basket, BasketItem, Money
 from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.offer_index import OfferIndex
 
 logger = logging.getLogger(__name__)
 
@@ -21,25 +22,38 @@ class OfferResolver:
     to the same BasketItem / basket, by choosing the maximum discount.
     """
 
-    def __init__(self, offers: Iterable[AbstractBaseOffer]) -> None:
+    def __init__(
+        self,
+        offers: Iterable[AbstractBaseOffer],
+        index: Optional[OfferIndex] = None,
+    ) -> None:
         self.offers: List[AbstractBaseOffer] = list(offers)
+        # reuse a prebuilt index when the caller already has one
+        self.index = index if index is not None else OfferIndex(self.offers)
 
     def get_applicable_single_sku_offers(
         self, basket_item: BasketItem
     ) -> List[AbstractBaseOffer]:
         """
-        Filter offers that are applicable to this particular basket item
-        (based on sku or product_skus).
+        Single-sku offers applicable to this particular basket item,
+        looked up in the sku index instead of scanning every offer.
         """
-        applicable: List[AbstractBaseOffer] = []
-        sku = basket_item.product.sku
+        return self.index.single_sku_offers(basket_item.product.sku)
 
-        for offer in self.offers:
-            # single‑SKU offers only
-            if hasattr(offer, "sku") and getattr(offer, "sku") == sku:
-                applicable.append(offer)
+    def evaluate_offer(
+        self, offer: AbstractBaseOffer, basket: Basket
+    ) -> Optional[OfferChoice]:
+        """Apply one offer to the basket, None unless it gives a discount"""
+        result: Optional[Tuple[Money, List[str]]] = offer.apply_to_basket(basket)
+        if result is None:
+            return None
 
-        return applicable
+        discount, affected_items = result
+        if discount.is_zero():
+            return None
+        return OfferChoice(
+            offer=offer, discount=discount, affected_items=affected_items
+        )
 
     def resolve_best_offer_for_item(
         self, basket: Basket, basket_item: BasketItem
@@ -56,17 +70,11 @@ class OfferResolver:
         best_choice: Optional[OfferChoice] = None
 
         for offer in applicable_offers:
-            result: Optional[Tuple[Money, List[str]]] = offer.apply_to_basket(basket)
-            if result is None:
-                continue
-
-            discount, affected_items = result
-            if discount.is_zero():
+            choice = self.evaluate_offer(offer, basket)
+            if choice is None:
                 continue
 
-            if best_choice is None or discount > best_choice.discount:
-                best_choice = OfferChoice(
-                    offer=offer, discount=discount, affected_items=affected_items
-                )
+            if best_choice is None or choice.discount > best_choice.discount:
+                best_choice = choice
 
         return best_choice
@@ -0,0 +1,134 @@
+import logging
+import math
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from src.basket_pricer.offers import AbstractBaseOffer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class OfferSchedule:
+    """
+    Interval index over the validity windows of offers, finding the offers
+    live at a moment without scanning them all.
+
+    Windowed offers are sorted by start and kept in a binary tree holding
+    the latest end below each node. The offers live at a moment are those
+    starting at or before it, found by binary search, that have not ended;
+    subtrees that all ended before it are skipped, so a lookup costs
+    O(log n) per live offer found. Offers without a window are always live.
+
+    The start and end times split time into segments in which the same
+    offers are live; segment() names the one a moment falls in, so
+    whatever is built for the offers of one moment can be reused for every
+    other moment of the same segment.
+    """
+
+    def __init__(self, offers: Iterable[AbstractBaseOffer]) -> None:
+        self.offers: Tuple[AbstractBaseOffer, ...] = tuple(offers)
+        self._always: List[int] = []
+        windows: List[Tuple[float, float, int]] = []
+        for position, offer in enumerate(self.offers):
+            if offer.is_scheduled():
+                starts_at, ends_at = offer.window()
+                windows.append((starts_at, ends_at, position))
+            else:
+                self._always.append(position)
+        windows.sort()
+        self._starts = [starts_at for starts_at, _, _ in windows]
+        self._positions = [position for _, _, position in windows]
+
+        # implicit tree over the windows in start order: leaves from _size
+        # on, node n has children 2n and 2n + 1 and the latest end below it
+        self._size = 1
+        while self._size < len(windows):
+            self._size *= 2
+        self._latest_end = [-math.inf] * (2 * self._size)
+        for leaf, (_, ends_at, _) in enumerate(windows, start=self._size):
+            self._latest_end[leaf] = ends_at
+        for node in range(self._size - 1, 0, -1):
+            self._latest_end[node] = max(
+                self._latest_end[2 * node], self._latest_end[2 * node + 1]
+            )
+
+        bounds = {bound for window in windows for bound in window[:2]}
+        self._bounds = sorted(bound for bound in bounds if math.isfinite(bound))
+        logger.debug(
+            f"Offer schedule built: {len(windows)} windowed and "
+            f"{len(self._always)} always live offers, {len(self._bounds)} changes"
+        )
+
+    def segment(self, at: float) -> int:
+        """Number of the stretch of time, between two offer start or end
+        times, that at falls in"""
+        return bisect_right(self._bounds, at)
+
+    def live_positions(self, at: float) -> List[int]:
+        """Positions of the offers live at at, in offer order"""
+        started = bisect_right(self._starts, at)
+        live = list(self._always)
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, first, width = stack.pop()
+            if first >= started or self._latest_end[node] <= at:
+                continue  # none started yet, or all of them ended
+            if width == 1:
+                live.append(self._positions[first])
+                continue
+            half = width // 2
+            stack.append((2 * node + 1, first + half, half))
+            stack.append((2 * node, first, half))
+        live.sort()
+        return live
+
+    def live_offers(self, at: float) -> List[AbstractBaseOffer]:
+        """Offers live at at, in offer order"""
+        return [self.offers[position] for position in self.live_positions(at)]
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+
+class SegmentMemo(Generic[T]):
+    """
+    Values built for segments of a schedule, kept for every later moment of
+    the same segment, at most maxsize of them with the least recently used
+    going first, or all of them when maxsize is None.
+
+    Safe to share between threads: values are built outside the lock and
+    the first one stored for a segment is the one every thread gets. A
+    pickled memo is empty, each process builds its own values.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None) -> None:
+        if maxsize is not None and maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self._values: "OrderedDict[int, T]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, segment: int, build: Callable[[], T]) -> T:
+        """Value kept for the segment, built by build() the first time"""
+        with self._lock:
+            value = self._values.get(segment)
+            if value is not None:
+                self._values.move_to_end(segment)
+                return value
+        value = build()
+        with self._lock:
+            value = self._values.setdefault(segment, value)
+            self._values.move_to_end(segment)
+            if self.maxsize is not None and len(self._values) > self.maxsize:
+                self._values.popitem(last=False)  # least recently used
+        return value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __reduce__(self):
+        return type(self), (self.maxsize,)
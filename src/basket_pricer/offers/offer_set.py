@@ -0,0 +1,97 @@
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Tuple
+
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.offer_compiler import DroppedOffer, compile_offers
+from src.basket_pricer.offers.offer_index import OfferIndex
+from src.basket_pricer.offers.offer_schedule import OfferSchedule, SegmentMemo
+
+logger = logging.getLogger(__name__)
+
+# Process wide counter identifying each distinct set of offers given to a pricer
+offer_set_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class OfferSet:
+    """
+    Offers compiled once: dominated offers dropped and the rest indexed by
+    sku. Never modified, every pricing context made from it shares the
+    index, and a changed offer list becomes a new set with a new version.
+
+    When some offers have a validity window the set also holds their
+    schedule, and at() gives the set of the offers live at a moment.
+    """
+
+    offers: Tuple[AbstractBaseOffer, ...]  # as given
+    active: Tuple[AbstractBaseOffer, ...]  # the ones evaluated when pricing
+    index: OfferIndex
+    dropped: Tuple[DroppedOffer, ...] = ()
+    version: Optional[int] = None
+    source: Optional[str] = None  # file the offers were loaded from
+    # interval index over the active offers, None when none has a window
+    schedule: Optional[OfferSchedule] = None
+    # version of the live offers of each segment of the schedule, so the
+    # offers of a moment keep theirs however often they are compiled
+    _versions: SegmentMemo[int] = field(
+        default_factory=SegmentMemo, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def build(
+        cls,
+        offers: Optional[Iterable[AbstractBaseOffer]],
+        version: Optional[int] = None,
+        source: Optional[str] = None,
+    ) -> "OfferSet":
+        offers = tuple(offers or ())
+        for offer in offers:
+            if not isinstance(offer, AbstractBaseOffer):
+                raise TypeError(
+                    "All offers must be AbstractBaseOffer, "
+                    f"but got {type(offer).__name__}"
+                )
+        compiled = compile_offers(offers)
+        scheduled = any(offer.is_scheduled() for offer in compiled.offers)
+        offer_set = cls(
+            offers=offers,
+            active=compiled.offers,
+            index=OfferIndex(compiled.offers),
+            dropped=compiled.dropped,
+            version=version,
+            source=source,
+            schedule=OfferSchedule(compiled.offers) if scheduled else None,
+        )
+        logger.debug(
+            f"Offer set {version} compiled: {len(compiled.offers)} of "
+            f"{len(offers)} offers active"
+        )
+        return offer_set
+
+    def at(self, at: float) -> "OfferSet":
+        """
+        Set of the offers live at the POSIX timestamp at, compiled again
+        as at one moment an offer can be beaten by one whose window does
+        not cover all of its own. Every moment of a segment of the schedule
+        gets the same version. The set itself when no offer has a window.
+        """
+        if self.schedule is None:
+            return self
+        live = self.schedule.live_offers(at)
+        compiled = compile_offers(live, windows=False)
+        version = self._versions.get(
+            self.schedule.segment(at), lambda: next(offer_set_versions)
+        )
+        return OfferSet(
+            offers=tuple(live),
+            active=compiled.offers,
+            index=OfferIndex(compiled.offers),
+            dropped=self.dropped + compiled.dropped,
+            version=version,
+            source=self.source,
+        )
+
+    def __len__(self) -> int:
+        return len(self.offers)
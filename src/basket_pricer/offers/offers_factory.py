@@ -1,13 +1,25 @@
-from typing import List
+from typing import Any, List, Mapping, Union
 
+from src.basket_pricer.models import Money
 from src.basket_pricer.offers import (
+    AbstractBaseOffer,
+    BundleOffer,
     BuyXGetCheapestFreeOffer,
     BuyXgetYfree,
     PercentageOffer,
+    SpendThresholdOffer,
+    TieredQuantityOffer,
 )
+from src.basket_pricer.offers.offer_registry import offer_from_record
 
 
 class OffersFactory:
+    @staticmethod
+    def create(record: Mapping[str, Any]) -> AbstractBaseOffer:
+        """Offer from a config record naming its "type", see offer_registry"""
+        return offer_from_record(record)
+
+    @staticmethod
     def create_buy_x_get_y_free(
         id: int,
         name: str,
@@ -21,6 +33,7 @@ class OffersFactory:
 
         return BuyXgetYfree(id=id, name=name, buy=buy, free=free, sku=sku)
 
+    @staticmethod
     def create_buy_x_get_cheapest_free(
         id: int, name: str, product_skus: List[int], quantity: int
     ) -> BuyXGetCheapestFreeOffer:
@@ -32,6 +45,7 @@ class OffersFactory:
             id=id, name=name, product_skus=product_skus, quantity=quantity
         )
 
+    @staticmethod
     def create_percentage_offer(
         id: int, name: str, sku: int, percentage: float
     ) -> PercentageOffer:
@@ -40,3 +54,56 @@ class OffersFactory:
             id = f"{percentage}_off_on_sku_{sku}"
 
         return PercentageOffer(id=id, name=name, sku=sku, percentage=percentage)
+
+    @staticmethod
+    def create_spend_threshold_offer(
+        id: int,
+        name: str,
+        product_skus: List[int],
+        thresholds: List[Union[str, Money]],
+        savings: List[Union[str, Money]],
+    ) -> SpendThresholdOffer:
+
+        if id is None:
+            id = f"spend_{thresholds[0]}_{name.lower().replace(' ', '_')}"
+
+        return SpendThresholdOffer(
+            id=id,
+            name=name,
+            product_skus=product_skus,
+            thresholds=thresholds,
+            savings=savings,
+        )
+
+    @staticmethod
+    def create_tiered_quantity_offer(
+        id: int,
+        name: str,
+        product_skus: List[int],
+        quantities: List[int],
+        percentages: List[float],
+    ) -> TieredQuantityOffer:
+
+        if id is None:
+            id = f"tiered_{quantities[0]}_{name.lower().replace(' ', '_')}"
+
+        return TieredQuantityOffer(
+            id=id,
+            name=name,
+            product_skus=product_skus,
+            quantities=quantities,
+            percentages=percentages,
+        )
+
+    @staticmethod
+    def create_bundle_offer(
+        id: int,
+        name: str,
+        slots: List[List[int]],
+        price: Union[str, Money],
+    ) -> BundleOffer:
+
+        if id is None:
+            id = f"bundle_{len(slots)}_{name.lower().replace(' ', '_')}"
+
+        return BundleOffer(id=id, name=name, slots=slots, price=price)
@@ -1,9 +1,20 @@
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
+from typing import Dict, FrozenSet, Mapping, Sequence, Tuple
 
 from src.basket_pricer.models import Basket, Money
 from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import (
+    NOT_APPLICABLE,
+    OfferEvaluation,
+    PricedLine,
+)
+from src.basket_pricer.offers.buy_x_get_y_free import BuyXgetYfree
+from src.basket_pricer.offers.offer_kernels import (
+    BasketColumns,
+    percentage_discounts,
+)
 from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
 
 logger = logging.getLogger(__name__)
@@ -13,6 +24,11 @@ logger = logging.getLogger(__name__)
 class PercentageOffer(AbstractBaseOffer):
     sku: int
     percentage: float = 0.0
+    # precise decimal rate, derived once from percentage
+    _rate: Decimal = field(default=Decimal("0"), init=False, repr=False, compare=False)
+    _scope: FrozenSet[int] = field(
+        default=frozenset(), init=False, repr=False, compare=False
+    )
 
     def __post_init__(self):
         super().__post_init__()  # call the parents validations first
@@ -22,35 +38,56 @@ class PercentageOffer(AbstractBaseOffer):
             )
         if self.percentage < 0:
             raise InvalidOfferConfigError("Percentage must be positive")
+        self._rate = Decimal(str(self.percentage)) / Decimal("100")
+        self._scope = frozenset([self.sku])
         logger.debug(f"{self.name} offer is created.")
 
-    def is_applicable(self, basket: Basket):
+    def evaluate(self, basket: Basket) -> OfferEvaluation:
         if not isinstance(basket, Basket):
             raise TypeError(f"Expected Basket Type, but got {type(basket).__name__}")
-        is_applicable = basket.has_product(
-            self.sku
-        )  # check if offer sku is present in the basket
-        if not is_applicable:
+        basket_item = basket.get_items_list().get(self.sku)  # the only line it needs
+        if basket_item is None:
             logger.debug(
                 f"Offer not valid on the basket, it is only valid on SKU:{self.sku}"
             )
-        return is_applicable
-
-    def calculate_discount(self, basket):
-        if not isinstance(basket, Basket):
-            raise TypeError(f"Expected Basket Type, but got {type(basket).__name__}")
-        if not basket.has_product(self.sku):
-            return Money.zero()
-        product = basket.fetch_product(self.sku)
-        total = product.price * basket.fetch_quantity(sku=self.sku)
-        percentage_decimal = Decimal(str(self.percentage)) / Decimal(
-            "100"
-        )  # precise decimal percentage
-        discount = total * percentage_decimal
+            return NOT_APPLICABLE
+        discount = basket_item.product.price * basket_item.qty * self._rate
         logger.debug(
             f"Calculated discount for offer '{self.name}', total discount: {discount}"
         )
-        return discount
+        return OfferEvaluation(True, discount, [basket_item.product.name])
+
+    def is_applicable(self, basket: Basket):
+        return self.evaluate(basket).applicable
+
+    def calculate_discount(self, basket):
+        return self.evaluate(basket).discount
+
+    def scope_skus(self) -> FrozenSet[int]:
+        return self._scope
+
+    def dominates(self, other: AbstractBaseOffer) -> bool:
+        if isinstance(other, PercentageOffer) and other.sku == self.sku:
+            return self._rate >= other._rate
+        if isinstance(other, BuyXgetYfree) and other.sku == self.sku:
+            # buy X get Y free is at most Y / (X + Y) off every unit it takes
+            return self._rate * other._group_size >= other.free
+        return False
+
+    @classmethod
+    def dominated_kinds(cls) -> Tuple[type, ...]:
+        return PercentageOffer, BuyXgetYfree
+
+    def discount_for_units(
+        self, units: Mapping[int, PricedLine]
+    ) -> tuple[Money, Dict[int, int]]:
+        line = units.get(self.sku)
+        if line is None or line.qty <= 0:
+            return Money.zero(), {}
+        return line.unit_price * line.qty * self._rate, {self.sku: line.qty}
+
+    def batch_discounts(self, columns: BasketColumns) -> Sequence[int]:
+        return percentage_discounts(columns, self.sku, self._rate)
 
     def __str__(self) -> str:
         return f"{self.name} Offer on product sku : {self.sku}"
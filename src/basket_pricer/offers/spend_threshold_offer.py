@@ -0,0 +1,148 @@
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, FrozenSet, List, Mapping, Tuple
+
+from src.basket_pricer.models import Basket, Money
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import (
+    NOT_APPLICABLE,
+    OfferEvaluation,
+    PricedLine,
+    split_options,
+)
+from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpendThresholdOffer(AbstractBaseOffer):
+    """
+    Fixed saving once the spend on a group of skus reaches a threshold, e.g.
+    spend £20 on shampoo, save £3. With more thresholds the saving of the
+    highest one reached is given: spend £20 save £3, spend £40 save £8.
+    """
+
+    product_skus: List[int] = field(default_factory=list)
+    thresholds: List[Money] = field(default_factory=list)  # spend of each tier
+    savings: List[Money] = field(default_factory=list)  # saving of each tier
+    # which units count towards the spend decides what is left for the others
+    allocation_order: ClassVar[int] = 0
+    # tiers in minor units, derived once so a tier is found by binary search
+    _threshold_units: List[int] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _saving_units: List[int] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _scope: FrozenSet[int] = field(
+        default=frozenset(), init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        if not self.product_skus:
+            raise InvalidOfferConfigError(self.id, "product sku cannot be empty")
+        if len(self.product_skus) != len(set(self.product_skus)):
+            raise InvalidOfferConfigError(
+                self.id, "product sku's list must not contain duplicates"
+            )
+        if not self.thresholds or len(self.thresholds) != len(self.savings):
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} needs one saving per spend threshold"
+            )
+        try:
+            self.thresholds = [_as_money(amount) for amount in self.thresholds]
+            self.savings = [_as_money(amount) for amount in self.savings]
+        except ValueError as error:
+            raise InvalidOfferConfigError(self.id, f"Offer {self.id}: {error}")
+        thresholds = [threshold.minor_units for threshold in self.thresholds]
+        savings = [saving.minor_units for saving in self.savings]
+        if thresholds[0] <= 0 or any(
+            lower >= higher for lower, higher in zip(thresholds, thresholds[1:])
+        ):
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} spend thresholds must be positive, rising"
+            )
+        if any(lower > higher for lower, higher in zip(savings, savings[1:])):
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} savings cannot fall as the spend rises"
+            )
+        if any(saving > threshold for threshold, saving in zip(thresholds, savings)):
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} cannot save more than the spend needed"
+            )
+        self._threshold_units = thresholds
+        self._saving_units = savings
+        self._scope = frozenset(self.product_skus)
+        logger.debug(f"Spend threshold offer {self.name} created")
+
+    def saving_for(self, spend: int) -> int:
+        """Saving in minor units for a spend in minor units on the group"""
+        tier = bisect_right(self._threshold_units, spend)
+        return self._saving_units[tier - 1] if tier else 0
+
+    def evaluate(self, basket: Basket) -> OfferEvaluation:
+        spend = 0
+        eligible_product_names: List[str] = []
+        for sku, basket_item in basket.get_items_list().items():
+            if sku in self._scope:
+                spend += basket_item.product.price.minor_units * basket_item.qty
+                eligible_product_names.append(basket_item.product.name)
+        saving = self.saving_for(spend)
+        if not saving:
+            logger.debug(f"Spend too low for offer '{self.name}'")
+            return NOT_APPLICABLE
+        return OfferEvaluation(
+            True, Money.from_minor_units(saving), eligible_product_names
+        )
+
+    def is_applicable(self, basket: Basket) -> bool:
+        return self.evaluate(basket).applicable
+
+    def calculate_discount(self, basket: Basket) -> Money:
+        return self.evaluate(basket).discount
+
+    def scope_skus(self) -> FrozenSet[int]:
+        return self._scope
+
+    def dominates(self, other: AbstractBaseOffer) -> bool:
+        # a flat saving does not grow with the spend beyond its tier, so two
+        # threshold offers on separate units can save more than the better
+        # one on all of them: neither ever makes the other redundant
+        return False
+
+    @classmethod
+    def dominated_kinds(cls) -> Tuple[type, ...]:
+        return ()
+
+    def allocation_options(
+        self, units: Mapping[int, PricedLine]
+    ) -> List[Dict[int, int]]:
+        return split_options(units, self._scope)
+
+    def discount_for_units(
+        self, units: Mapping[int, PricedLine]
+    ) -> tuple[Money, Dict[int, int]]:
+        spend = 0
+        used: Dict[int, int] = {}
+        for sku, line in units.items():
+            if line.qty > 0 and sku in self._scope:
+                spend += line.unit_price.minor_units * line.qty
+                used[sku] = line.qty
+        saving = self.saving_for(spend)
+        if not saving:
+            return Money.zero(), {}
+        return Money.from_minor_units(saving), used
+
+    def __str__(self) -> str:
+        tiers = ", ".join(
+            f"spend {threshold} save {saving}"
+            for threshold, saving in zip(self.thresholds, self.savings)
+        )
+        return f"{self.name}: {tiers} on sku's {self.product_skus}"
+
+
+def _as_money(amount) -> Money:
+    return amount if isinstance(amount, Money) else Money(amount)
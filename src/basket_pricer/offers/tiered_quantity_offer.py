@@ -0,0 +1,139 @@
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import ClassVar, Dict, FrozenSet, List, Mapping, Tuple
+
+from src.basket_pricer.models import Basket, Money
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import (
+    NOT_APPLICABLE,
+    OfferEvaluation,
+    PricedLine,
+    split_options,
+)
+from src.basket_pricer.utils.exceptions import InvalidOfferConfigError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TieredQuantityOffer(AbstractBaseOffer):
+    """
+    Percentage off every unit of a group of skus, rising with the number of
+    units bought, e.g. buy 2 save 10%, buy 3 save 20%.
+    """
+
+    product_skus: List[int] = field(default_factory=list)
+    quantities: List[int] = field(default_factory=list)  # units of each tier
+    percentages: List[float] = field(default_factory=list)  # off at each tier
+    # which units count towards a tier decides what is left for the others
+    allocation_order: ClassVar[int] = 0
+    # precise decimal rate of each tier, derived once
+    _rates: List[Decimal] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _scope: FrozenSet[int] = field(
+        default=frozenset(), init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        if not self.product_skus:
+            raise InvalidOfferConfigError(self.id, "product sku cannot be empty")
+        if len(self.product_skus) != len(set(self.product_skus)):
+            raise InvalidOfferConfigError(
+                self.id, "product sku's list must not contain duplicates"
+            )
+        if not self.quantities or len(self.quantities) != len(self.percentages):
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} needs one percentage per quantity"
+            )
+        if self.quantities[0] <= 0 or any(
+            lower >= higher
+            for lower, higher in zip(self.quantities, self.quantities[1:])
+        ):
+            raise InvalidOfferConfigError(
+                self.id, f"Offer {self.id} quantities must be positive, rising"
+            )
+        if any(not 0 < percentage <= 100 for percentage in self.percentages) or any(
+            lower > higher
+            for lower, higher in zip(self.percentages, self.percentages[1:])
+        ):
+            raise InvalidOfferConfigError(
+                self.id,
+                f"Offer {self.id} percentages must be within 0-100 and not fall",
+            )
+        self._rates = [
+            Decimal(str(percentage)) / Decimal("100") for percentage in self.percentages
+        ]
+        self._scope = frozenset(self.product_skus)
+        logger.debug(f"Tiered quantity offer {self.name} created")
+
+    def rate_for(self, quantity: int) -> Decimal:
+        """Rate off every unit when quantity units of the group are bought"""
+        tier = bisect_right(self.quantities, quantity)
+        return self._rates[tier - 1] if tier else Decimal("0")
+
+    def evaluate(self, basket: Basket) -> OfferEvaluation:
+        quantity = spend = 0
+        eligible_product_names: List[str] = []
+        for sku, basket_item in basket.get_items_list().items():
+            if sku in self._scope:
+                quantity += basket_item.qty
+                spend += basket_item.product.price.minor_units * basket_item.qty
+                eligible_product_names.append(basket_item.product.name)
+        if quantity < self.quantities[0]:
+            logger.debug(f"Too few units for offer '{self.name}'")
+            return NOT_APPLICABLE
+        discount = Money.from_minor_units(spend) * self.rate_for(quantity)
+        return OfferEvaluation(True, discount, eligible_product_names)
+
+    def is_applicable(self, basket: Basket) -> bool:
+        return self.evaluate(basket).applicable
+
+    def calculate_discount(self, basket: Basket) -> Money:
+        return self.evaluate(basket).discount
+
+    def scope_skus(self) -> FrozenSet[int]:
+        return self._scope
+
+    def dominates(self, other: AbstractBaseOffer) -> bool:
+        if not isinstance(other, TieredQuantityOffer):
+            return False
+        # both rates are steps rising with the quantity, so comparing them
+        # where other's steps up covers every quantity
+        return other._scope <= self._scope and all(
+            self.rate_for(quantity) >= rate
+            for quantity, rate in zip(other.quantities, other._rates)
+        )
+
+    @classmethod
+    def dominated_kinds(cls) -> Tuple[type, ...]:
+        return (TieredQuantityOffer,)
+
+    def allocation_options(
+        self, units: Mapping[int, PricedLine]
+    ) -> List[Dict[int, int]]:
+        return split_options(units, self._scope)
+
+    def discount_for_units(
+        self, units: Mapping[int, PricedLine]
+    ) -> tuple[Money, Dict[int, int]]:
+        quantity = spend = 0
+        used: Dict[int, int] = {}
+        for sku, line in units.items():
+            if line.qty > 0 and sku in self._scope:
+                quantity += line.qty
+                spend += line.unit_price.minor_units * line.qty
+                used[sku] = line.qty
+        if quantity < self.quantities[0]:
+            return Money.zero(), {}
+        return Money.from_minor_units(spend) * self.rate_for(quantity), used
+
+    def __str__(self) -> str:
+        tiers = ", ".join(
+            f"buy {quantity} save {percentage}%"
+            for quantity, percentage in zip(self.quantities, self.percentages)
+        )
+        return f"{self.name}: {tiers} on sku's {self.product_skus}"
@@ -1,3 +1,13 @@
 from .basket_pricer import BasketPricer
+from .batch import BatchResult
+from .incremental_pricer import IncrementalPricer
+from .price_cache import PriceCache
+from .pricing_context import PricingContext
 
-__all__ = ["BasketPricer"]
+__all__ = [
+    "BasketPricer",
+    "BatchResult",
+    "IncrementalPricer",
+    "PriceCache",
+    "PricingContext",
+]
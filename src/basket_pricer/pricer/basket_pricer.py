@@ -1,159 +1,361 @@
 import logging
-from typing import List, Optional
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money
+from src.basket_pricer.models import (
+    Basket,
+    BasketItem,
+    Catalogue,
+    CompactBasket,
+    Money,
+    MoneyAccumulator,
+    Product,
+)
+from src.basket_pricer.models.price_history import Timestamp, to_timestamp
 from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import PricedLine
+from src.basket_pricer.offers.offer_allocator import OfferAllocator
+from src.basket_pricer.offers.offer_compiler import DroppedOffer
+from src.basket_pricer.offers.offer_index import OfferIndex
 from src.basket_pricer.offers.offer_resolver import OfferResolver
+from src.basket_pricer.offers.offer_set import OfferSet, offer_set_versions
+from src.basket_pricer.pricer.batch import (
+    DEFAULT_CHUNKSIZE,
+    BatchItem,
+    BatchResult,
+    price_many,
+)
 from src.basket_pricer.pricer.offer_summary import OfferApplied
+from src.basket_pricer.pricer.price_cache import PriceCache
 from src.basket_pricer.pricer.price_summary import (
     PriceSummary,
+    discounted_summary,
     no_discount_summary,
     zero_summary,
 )
-from src.basket_pricer.utils.exceptions import CatalogueError, PricingException
+from src.basket_pricer.pricer.pricing_context import PricingContext
 
 logger = logging.getLogger(__name__)
 
 
 class BasketPricer:
-    def __init__(self, catalogue: Catalogue, offers: Optional[List[AbstractBaseOffer]]):
+    def __init__(
+        self,
+        catalogue: Catalogue,
+        offers: Union[List[AbstractBaseOffer], OfferSet, None],
+        cache: Optional[PriceCache] = None,
+        allocator: Optional[OfferAllocator] = None,
+    ):
         if not isinstance(catalogue, Catalogue):
             raise TypeError(
                 f"catalogue must be Catalogue, got {type(catalogue).__name__}"
             )
+        if cache is not None and not isinstance(cache, PriceCache):
+            raise TypeError(f"cache must be PriceCache, got {type(cache).__name__}")
         self.catalogue = catalogue
-        self.offers = offers or []
-        self.offer_resolver = OfferResolver(self.offers)
-        for offer in self.offers:
-            if not isinstance(offer, AbstractBaseOffer):
-                raise TypeError(
-                    f"All offers must be AbstractBaseOffer, but got {type(offer).__name__}"
-                )
+        self.offer_set = _as_offer_set(offers)
+        self.offers = list(self.offer_set.offers)
+        self.cache = cache
+        self.allocator = allocator
+        # held while the catalogue and its context are swapped together
+        self._swap_lock = threading.Lock()
+        # all the setup that does not depend on the basket is done once here
+        self._context = PricingContext.build(
+            catalogue, self.offer_set, allocator=allocator
+        )
         logger.debug("Basket Pricer Created")
 
-    def calculate(self, basket: Basket) -> PriceSummary:
-        if not isinstance(basket, Basket):
-            raise TypeError(f"Expected Basket Type and got {type(basket).__name__}")
-        if basket.is_empty():
-            logger.info("Basket is empty.")
-            return zero_summary()
+    def set_offers(
+        self, offers: Union[List[AbstractBaseOffer], OfferSet, None]
+    ) -> None:
+        """
+        Replace the offers, e.g. with an OfferSet reloaded from a file. The
+        offers are compiled before the switch, calculations already running
+        finish on the old ones, and cached prices for them stop matching.
+        """
+        offer_set = _as_offer_set(offers)
+        with self._swap_lock:
+            context = PricingContext.build(
+                self.catalogue, offer_set, allocator=self.allocator
+            )
+            self.offer_set = offer_set
+            self.offers = list(offer_set.offers)
+            self._context = context
+        logger.info(f"Offers replaced, offer set version {context.offers_version}")
 
-        sub_total = self.calculate_subtotal_basket(basket)
+    def set_catalogue(self, catalogue: Catalogue) -> None:
+        """
+        Switch to another catalogue version, e.g. one made by
+        Catalogue.with_changes. The new context is compiled before the
+        switch, calculations already running finish on the old version.
+        """
+        if not isinstance(catalogue, Catalogue):
+            raise TypeError(
+                f"catalogue must be Catalogue, got {type(catalogue).__name__}"
+            )
+        with self._swap_lock:
+            context = PricingContext.build(
+                catalogue, self.offer_set, allocator=self.allocator
+            )
+            self.catalogue = catalogue
+            self._context = context
+        logger.info(f"Switched to catalogue version {catalogue.version}")
 
-        if not self.offers:
-            logger.info("No offers Available")
-            return no_discount_summary(sub_total)
+    @classmethod
+    def from_context(cls, context: PricingContext) -> "BasketPricer":
+        """Pricer over an already compiled context, e.g. inside a worker process"""
+        if not isinstance(context, PricingContext):
+            raise TypeError(
+                f"context must be PricingContext, got {type(context).__name__}"
+            )
+        pricer = cls.__new__(cls)
+        pricer.catalogue = None
+        pricer.offer_set = context.offer_set or OfferSet(
+            offers=context.offers,
+            active=context.offers,
+            index=context.offer_index,
+            dropped=context.dropped_offers,
+            version=context.offers_version,
+        )
+        pricer.offers = list(context.offers)
+        pricer.cache = None
+        pricer.allocator = context.allocator
+        pricer._swap_lock = threading.Lock()
+        pricer._context = context
+        return pricer
 
-        total_discount, applied_offers = self._apply_offers(basket=basket)
-        if total_discount < Money("0"):
-            raise PricingException("Total discount must be poitive")
+    @property
+    def context(self) -> PricingContext:
+        """Compiled context, rebuilt if products were added to the catalogue"""
+        context = self._context
+        catalogue = self.catalogue
+        if catalogue is None or catalogue.version == context.catalogue_version:
+            return context
+        with self._swap_lock:
+            # checked again, a swap may have finished while waiting
+            context = self._context
+            if self.catalogue.version != context.catalogue_version:
+                context = PricingContext.build(
+                    self.catalogue, self.offer_set, allocator=context.allocator
+                )
+                self._context = context
+            return context
 
-        if total_discount > sub_total:
-            total_discount = sub_total  # making items free and no negative
+    @property
+    def offer_index(self) -> OfferIndex:
+        return self.context.offer_index
 
-        total = sub_total - total_discount  # final amount to be paid by the customer
+    @property
+    def offer_resolver(self) -> OfferResolver:
+        return self.context.offer_resolver
 
-        if total < Money("0"):
-            logger.error("Negative total calculated and must be positive")
-            raise PricingException(
-                f"Discount ({total_discount}) exceeds sub-total ({sub_total}), "
-                f"resulting in negative total ({total})"
-            )
+    @property
+    def dropped_offers(self) -> Tuple[DroppedOffer, ...]:
+        """Offers left out of pricing as dominated by another offer"""
+        return self.context.dropped_offers
+
+    def context_at(self, as_of: Optional[Timestamp] = None) -> PricingContext:
+        """
+        Context for pricing at as_of: the prices in force and the offers
+        live then. Without as_of, the current prices and the offers live now.
+        """
+        context = self.context
+        if as_of is not None:
+            return context.at(as_of)
+        if context.is_scheduled:
+            return context.offers_at(time.time())
+        return context
 
-        result = PriceSummary(
-            sub_total=sub_total,
-            discount=total_discount,
-            total_amount=total,
-            applied_offers=applied_offers,
+    def calculate(
+        self,
+        basket: Union[Basket, CompactBasket],
+        as_of: Optional[Timestamp] = None,
+    ) -> PriceSummary:
+        """
+        Price the basket, at the prices in force and with the offers live
+        at as_of when it is given, e.g. the basket's transaction time
+        """
+        if not isinstance(basket, (Basket, CompactBasket)):
+            raise TypeError(f"Expected Basket Type and got {type(basket).__name__}")
+        # read once, so a whole calculation uses the same context
+        context = self.context_at(as_of)
+        if basket.is_empty():
+            logger.info("Basket is empty.")
+            return zero_summary(context.catalogue_version)
+        if self.cache is None:
+            return self._price_basket(basket, context)
+
+        # a Basket names products itself, a CompactBasket through the
+        # catalogue, so the two never share a summary
+        key = (
+            basket.fingerprint(),
+            isinstance(basket, CompactBasket),
+            context.catalogue_version,
+            context.offers_version,
+        )
+        if as_of is not None:
+            key += (to_timestamp(as_of),)
+        summary = self.cache.get(key)
+        if summary is None:
+            summary = self._price_basket(basket, context)
+            self.cache.put(key, summary)
+        return summary
+
+    def _price_basket(
+        self, basket: Union[Basket, CompactBasket], context: PricingContext
+    ) -> PriceSummary:
+        lines = self._priced_lines(basket, context)
+        sub_total = self._subtotal(lines)
+
+        if not context.offers:
+            logger.info("No offers Available")
+            return no_discount_summary(sub_total, context.catalogue_version)
+
+        total_discount, applied_offers = self._apply_offers(basket, context, lines)
+        result = discounted_summary(
+            sub_total, total_discount, applied_offers, context.catalogue_version
         )
         logger.debug("calculated final bill summary")
         return result
 
-    def calculate_subtotal_basket(self, basket: Basket) -> Money:
-        sub_total = Money("0")
+    def calculate_many(
+        self,
+        baskets: Iterable[BatchItem],
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        ordered: bool = True,
+    ) -> Iterator[BatchResult]:
+        """Price many baskets, optionally over a pool of worker processes.
+
+        Items are Baskets or (basket_id, Basket) pairs, results carry the id
+        (the input position for plain Baskets) and come back in input order
+        unless ordered is False. A basket that fails to price gives a
+        BatchResult with the error instead of stopping the batch.
+        """
+        return price_many(
+            self, baskets, workers=workers, chunksize=chunksize, ordered=ordered
+        )
+
+    def calculate_subtotal_basket(
+        self, basket: Basket, context: Optional[PricingContext] = None
+    ) -> Money:
+        return self._subtotal(self._priced_lines(basket, context or self.context))
+
+    def _priced_lines(
+        self, basket: Union[Basket, CompactBasket], context: PricingContext
+    ) -> Dict[int, PricedLine]:
+        """Basket lines with their catalogue unit price, in basket order"""
+        if isinstance(basket, CompactBasket):
+            return self._compact_lines(basket, context)
+        prices = context.prices
+        lines: Dict[int, PricedLine] = {}
         basket_items = basket.get_items_list()  # (sku, BasketItem)
         for sku, basket_item in basket_items.items():
-            if not self.catalogue.has_product(sku):
+            item_price = prices.get(sku)  # one lookup instead of has + fetch
+            if item_price is None:
+                error = context.missing_price(sku)
                 logger.error(
-                    f"Product '{basket_item.product.name}' from basket not present in catalogue"
+                    f"Product '{basket_item.product.name}' from basket: {error}"
                 )
-                raise CatalogueError(f"Product {sku} not in the catalogue")
-            item_price = self.catalogue.fetch_price(sku)
-            basket_item_total = item_price * basket_item.qty
-            sub_total = basket_item_total + sub_total
-        logger.debug(f"calculated basket subtotal: {sub_total}")
-        return sub_total
+                raise error
+            lines[sku] = PricedLine(
+                sku, basket_item.qty, item_price, basket_item.product.name
+            )
+        return lines
 
-    def _get_applicable_offers(self, basket_item: BasketItem) -> AbstractBaseOffer:
-        """Get all offers And resolve if there are more than one offer applicable on a product
-        and finally return a final maximum discount offer applicable on that item"""
-        applicable = []
-        for offer in self.offers:
-            # Check if offer is applicable to this item
-            if hasattr(offer, "sku") and offer.sku == basket_item.product.sku:
-                applicable.append(offer)
-            elif (
-                hasattr(offer, "product_skus")
-                and basket_item.product.sku in offer.product_skus
-            ):
-                applicable.append(offer)
-        return applicable
-
-    def _apply_offers(self, basket: Basket) -> tuple[Money, List[OfferApplied]]:
-        total_discount = Money.zero()
-        applied_offers: List[OfferApplied] = []
-
-        # Spliting offers into single‑SKU and multi‑SKU offers
-        # helpful for resolving the conflicts
-        single_sku_offers: List[AbstractBaseOffer] = []
-        multi_sku_offers: List[AbstractBaseOffer] = []
-
-        for offer in self.offers:
-            if hasattr(offer, "sku"):
-                single_sku_offers.append(offer)
-            elif hasattr(offer, "product_skus"):
-                multi_sku_offers.append(offer)
-            else:
-                # fallback: treating as basket‑level / multi‑sku
-                multi_sku_offers.append(offer)
-
-        # Apply multi‑SKU offers ONCE at basket level
-        for offer in multi_sku_offers:
-            result = offer.apply_to_basket(basket)
-            if result is None:
-                logger.debug("Offer not applied")
-                continue
+    def _compact_lines(
+        self, basket: CompactBasket, context: PricingContext
+    ) -> Dict[int, PricedLine]:
+        """Lines of a compact basket, products resolved through the catalogue"""
+        prices = context.prices
+        # names are only shown for offers, without offers none are looked up
+        name = self._product_name if context.offers else _no_name
+        lines: Dict[int, PricedLine] = {}
+        for sku, qty in zip(basket.skus, basket.qtys):
+            item_price = prices.get(sku)
+            if item_price is None:
+                error = context.missing_price(sku)
+                logger.error(f"Sku {sku} from basket: {error}")
+                raise error
+            lines[sku] = PricedLine(sku, qty, item_price, name(sku))
+        return lines
 
-            discount, affected_items = result
-            if discount.is_zero():
-                continue
+    def _product_name(self, sku: int) -> str:
+        catalogue = self.catalogue
+        if catalogue is not None and catalogue.has_product(sku):
+            return catalogue.fetch_product(sku).name
+        return f"sku {sku}"  # e.g. in a worker, which only has the prices
 
-            applied_offers.append(
-                OfferApplied(
-                    offer_name=offer.name,
-                    discount=discount,
-                    products_effected=affected_items,
+    @staticmethod
+    def _as_basket(lines: Dict[int, PricedLine]) -> Basket:
+        """Basket of the priced lines, for offers that work on a whole Basket"""
+        return Basket(
+            [
+                BasketItem(
+                    product=Product.trusted(line.sku, line.name, line.unit_price),
+                    qty=line.qty,
                 )
-            )
-            total_discount = total_discount + discount
-            logger.info("multi-sku offer applied to basket")
+                for line in lines.values()
+            ]
+        )
+
+    @staticmethod
+    def _subtotal(lines: Dict[int, PricedLine]) -> Money:
+        accumulator = MoneyAccumulator()
+        for line in lines.values():
+            accumulator.add_times(line.unit_price, line.qty)
+        sub_total = accumulator.total()
+        logger.debug(f"calculated basket subtotal: {sub_total}")
+        return sub_total
 
-        # Resolve conflicts between single‑SKU offers per item
-        resolver = OfferResolver(single_sku_offers)
+    def _apply_offers(
+        self,
+        basket: Union[Basket, CompactBasket],
+        context: Optional[PricingContext] = None,
+        lines: Optional[Dict[int, PricedLine]] = None,
+    ) -> tuple[Money, List[OfferApplied]]:
+        context = context or self.context
+        if lines is None:
+            lines = self._priced_lines(basket, context)
+        total_discount = MoneyAccumulator()
+        applied: List[Tuple[int, OfferApplied]] = []  # (offer position, applied)
+
+        # every unit goes to at most one of the offers tied to its sku,
+        # split between them for the biggest total discount
+        allocations = context.allocator.allocate(
+            context.offer_index.scoped_offers(lines), lines
+        )
+        for allocation in allocations:
+            applied.append(
+                (allocation.position, OfferApplied.from_allocation(allocation, lines))
+            )
+            total_discount.add(allocation.discount)
+        logger.debug(f"{len(allocations)} offers allocated to basket units")
 
-        for sku, basket_item in basket.get_items_list().items():
-            choice = resolver.resolve_best_offer_for_item(basket, basket_item)
+        # basket-level offers are not tied to units, they apply to the whole basket
+        basket_level = context.offer_index.basket_level_offers()
+        if basket_level and isinstance(basket, CompactBasket):
+            basket = self._as_basket(lines)
+        for position, offer in basket_level:
+            choice = context.offer_resolver.evaluate_offer(offer, basket)
             if choice is None:
+                logger.debug("Offer not applied")
                 continue
+            applied.append((position, OfferApplied.from_choice(choice)))
+            total_discount.add(choice.discount)
+            logger.info("basket-level offer applied to basket")
+
+        applied.sort(key=lambda entry: entry[0])
+        return total_discount.total(), [offer_applied for _, offer_applied in applied]
+
+
+def _as_offer_set(offers: Union[List[AbstractBaseOffer], OfferSet, None]) -> OfferSet:
+    """Offers as given, or compiled into a new set with the next version"""
+    if isinstance(offers, OfferSet):
+        return offers
+    return OfferSet.build(offers, version=next(offer_set_versions))
 
-            applied_offers.append(
-                OfferApplied(
-                    offer_name=choice.offer.name,
-                    discount=choice.discount,
-                    products_effected=choice.affected_items,
-                )
-            )
-            total_discount = total_discount + choice.discount
-            logger.info("single-sku offer applied to basket item")
 
-        return total_discount, applied_offers
+def _no_name(sku: int) -> str:
+    return ""
@@ -0,0 +1,133 @@
+import logging
+import pickle
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from src.basket_pricer.models import Basket, CompactBasket
+from src.basket_pricer.pricer.price_summary import PriceSummary
+from src.basket_pricer.pricer.pricing_context import PricingContext
+from src.basket_pricer.utils.exceptions import PricingException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 256
+
+# A batch item is either a Basket or CompactBasket (identified by its input
+# position) or a (basket_id, basket) pair
+BatchItem = Union[Basket, CompactBasket, Tuple[Any, Union[Basket, CompactBasket]]]
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """Outcome of pricing one basket of a batch, either a summary or an error"""
+
+    basket_id: Any
+    summary: Optional[PriceSummary] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Pricer of the current worker process, created once by _init_worker
+_worker_pricer = None
+
+
+def _init_worker(context: PricingContext) -> None:
+    """Runs once per worker process, so catalogue and offers are copied once"""
+    global _worker_pricer
+    from src.basket_pricer.pricer.basket_pricer import BasketPricer
+
+    _worker_pricer = BasketPricer.from_context(context)
+
+
+def _portable_error(error: Exception) -> Exception:
+    """The error itself if it survives pickling, else a PricingException copy"""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return PricingException(f"{type(error).__name__}: {error}")
+
+
+def price_chunk(pricer, chunk: List[Tuple[Any, Basket]]) -> List[BatchResult]:
+    """Price every basket of the chunk, a failing basket only fails itself"""
+    results: List[BatchResult] = []
+    for basket_id, basket in chunk:
+        try:
+            results.append(BatchResult(basket_id, summary=pricer.calculate(basket)))
+        except Exception as error:
+            logger.error(f"Pricing basket {basket_id} failed: {error}")
+            results.append(BatchResult(basket_id, error=_portable_error(error)))
+    return results
+
+
+def _price_chunk_in_worker(chunk: List[Tuple[Any, Basket]]) -> List[BatchResult]:
+    return price_chunk(_worker_pricer, chunk)
+
+
+def _chunks(
+    baskets: Iterable[BatchItem], chunksize: int
+) -> Iterator[List[Tuple[Any, Basket]]]:
+    """Pair every basket with its id and group them, reading the input lazily"""
+    items = (
+        item if isinstance(item, tuple) else (position, item)
+        for position, item in enumerate(baskets)
+    )
+    while chunk := list(islice(items, chunksize)):
+        yield chunk
+
+
+def price_many(
+    pricer,
+    baskets: Iterable[BatchItem],
+    workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """
+    Price a stream of baskets, yielding one BatchResult per basket.
+
+    With workers > 1 the chunks are spread over a process pool; each worker
+    receives the compiled pricing context once, when it starts. At most two
+    chunks per worker are in flight, so arbitrarily long inputs are streamed.
+    """
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be positive, got {chunksize}")
+    chunks = _chunks(baskets, chunksize)
+
+    if not workers or workers <= 1:
+        for chunk in chunks:
+            yield from price_chunk(pricer, chunk)
+        return
+
+    max_pending = workers * 2
+    executor = ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(pricer.context,)
+    )
+    try:
+        if ordered:
+            queue: Deque[Future] = deque()
+            for chunk in chunks:
+                queue.append(executor.submit(_price_chunk_in_worker, chunk))
+                if len(queue) >= max_pending:
+                    yield from queue.popleft().result()
+            while queue:
+                yield from queue.popleft().result()
+        else:
+            pending: Set[Future] = set()
+            for chunk in chunks:
+                pending.add(executor.submit(_price_chunk_in_worker, chunk))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            for future in wait(pending).done:
+                yield from future.result()
+    finally:
+        # also reached when the caller stops iterating early
+        executor.shutdown(wait=True, cancel_futures=True)
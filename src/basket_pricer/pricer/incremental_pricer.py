@@ -0,0 +1,196 @@
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.basket_pricer.models import Basket, Money
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.base_offer import PricedLine
+from src.basket_pricer.pricer.basket_pricer import BasketPricer
+from src.basket_pricer.pricer.offer_summary import OfferApplied
+from src.basket_pricer.pricer.price_summary import (
+    PriceSummary,
+    discounted_summary,
+    no_discount_summary,
+    zero_summary,
+)
+from src.basket_pricer.pricer.pricing_context import PricingContext
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Component:
+    """Allocation of one group of skus that share offers"""
+
+    skus: List[int]
+    applied: List[Tuple[int, OfferApplied]]  # (offer position, applied)
+    discount: int  # minor units
+
+
+class IncrementalPricer:
+    """
+    Keeps one basket priced while it changes, e.g. at the till on every scan.
+
+    Line totals and offer allocations from the previous price are kept, and
+    only the lines changed since then (as reported by
+    Basket.pop_changed_skus) and the groups of offers sharing skus with them
+    are evaluated again. Quantities must be changed through the Basket API
+    for the changes to be seen.
+    """
+
+    def __init__(self, pricer: BasketPricer, basket: Basket):
+        if not isinstance(pricer, BasketPricer):
+            raise TypeError(f"Expected BasketPricer and got {type(pricer).__name__}")
+        if not isinstance(basket, Basket):
+            raise TypeError(f"Expected Basket Type and got {type(basket).__name__}")
+        self.pricer = pricer
+        self.basket = basket
+        self._context: Optional[PricingContext] = None
+        self._summary: Optional[PriceSummary] = None
+        self._lines: Dict[int, PricedLine] = {}
+        self._sub_total = 0
+        # allocations per group of skus sharing offers, and the group of each sku
+        self._components: Dict[int, _Component] = {}
+        self._sku_component: Dict[int, int] = {}
+        self._component_ids = itertools.count()
+        self._basket_level_applied: List[Tuple[int, OfferApplied]] = []
+        self._discount = 0
+
+    def price(self) -> PriceSummary:
+        """Current price of the basket, re-evaluating only what changed"""
+        context = self.pricer.context_at()
+        if context is not self._context:
+            # catalogue, offers or the live offers changed, nothing from
+            # before can be reused
+            self._reset(context)
+            changed = set(self.basket.get_items_list())
+            self.basket.pop_changed_skus()
+        else:
+            changed = self.basket.pop_changed_skus()
+            if not changed and self._summary is not None:
+                return self._summary
+
+        self._update_lines(changed, context)
+        self._update_offers(changed, context)
+        self._summary = self._summarise(context)
+        logger.debug(f"Repriced basket for {len(changed)} changed skus")
+        return self._summary
+
+    def _reset(self, context: PricingContext) -> None:
+        self._context = context
+        self._summary = None
+        self._lines.clear()
+        self._components.clear()
+        self._sku_component.clear()
+        self._basket_level_applied = []
+        self._sub_total = 0
+        self._discount = 0
+
+    def _update_lines(self, changed, context: PricingContext) -> None:
+        basket_items = self.basket.get_items_list()
+        for sku in changed:
+            previous = self._lines.pop(sku, None)
+            if previous is not None:
+                self._sub_total -= previous.unit_price.minor_units * previous.qty
+            basket_item = basket_items.get(sku)
+            if basket_item is None:
+                continue
+            item_price = context.fetch_price(sku)
+            if item_price is None:
+                error = context.missing_price(sku)
+                logger.error(
+                    f"Product '{basket_item.product.name}' from basket: {error}"
+                )
+                self._context = None  # a failed update must not be reused
+                raise error
+            self._lines[sku] = PricedLine(
+                sku, basket_item.qty, item_price, basket_item.product.name
+            )
+            self._sub_total += item_price.minor_units * basket_item.qty
+
+    def _update_offers(self, changed, context: PricingContext) -> None:
+        index = context.offer_index
+        allocator = context.allocator
+
+        # every group holding a changed sku is allocated again, together with
+        # any group the changed skus now share an offer with
+        dirty: Set[int] = set()
+        offers: Dict[int, AbstractBaseOffer] = {}
+        pending = list(changed)
+        while pending:
+            sku = pending.pop()
+            if sku in dirty:
+                continue
+            dirty.add(sku)
+            component_id = self._sku_component.pop(sku, None)
+            component = self._components.pop(component_id, None)
+            if component is not None:
+                self._discount -= component.discount
+                pending.extend(component.skus)
+            if sku not in self._lines:
+                continue
+            for position, offer in index.scoped_offers((sku,)):
+                if position in offers:
+                    continue
+                offers[position] = offer
+                pending.extend(
+                    other for other in offer.scope_skus() if other in self._lines
+                )
+
+        lines = {sku: self._lines[sku] for sku in dirty if sku in self._lines}
+        deadline = allocator.deadline()
+        for component_offers, skus in allocator.components(
+            sorted(offers.items(), key=lambda entry: entry[0]), lines
+        ):
+            allocations = allocator.allocate_component(
+                component_offers, skus, lines, deadline
+            )
+            component = _Component(
+                skus=skus,
+                applied=[
+                    (
+                        allocation.position,
+                        OfferApplied.from_allocation(allocation, lines),
+                    )
+                    for allocation in allocations
+                ],
+                discount=sum(a.discount.minor_units for a in allocations),
+            )
+            component_id = next(self._component_ids)
+            self._components[component_id] = component
+            for sku in skus:
+                self._sku_component[sku] = component_id
+            self._discount += component.discount
+
+        # basket-level offers can change with any line
+        basket_level = index.basket_level_offers()
+        if basket_level or self._basket_level_applied:
+            for _, applied in self._basket_level_applied:
+                self._discount -= applied.discount.minor_units
+            self._basket_level_applied = []
+            for position, offer in basket_level:
+                choice = context.offer_resolver.evaluate_offer(offer, self.basket)
+                if choice is not None:
+                    self._basket_level_applied.append(
+                        (position, OfferApplied.from_choice(choice))
+                    )
+                    self._discount += choice.discount.minor_units
+
+    def _summarise(self, context: PricingContext) -> PriceSummary:
+        if self.basket.is_empty():
+            return zero_summary(context.catalogue_version)
+        sub_total = Money.from_minor_units(self._sub_total)
+        if not context.offers:
+            return no_discount_summary(sub_total, context.catalogue_version)
+
+        applied: List[Tuple[int, OfferApplied]] = list(self._basket_level_applied)
+        for component in self._components.values():
+            applied.extend(component.applied)
+        applied.sort(key=lambda entry: entry[0])
+        return discounted_summary(
+            sub_total,
+            Money.from_minor_units(self._discount),
+            [offer_applied for _, offer_applied in applied],
+            context.catalogue_version,
+        )
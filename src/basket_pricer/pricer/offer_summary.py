@@ -20,9 +20,29 @@ class OfferApplied:
         if not self.products_effected:
             logger.error("List of products required")
             raise ValueError("List of products required on which the offer is applied")
-        if self.discount < Money("0"):
+        if self.discount < Money.zero():
             raise ValueError("Discount must be greater than 0")
 
+    @classmethod
+    def from_choice(cls, choice) -> "OfferApplied":
+        """Build from the OfferChoice picked by the OfferResolver"""
+        return cls(
+            offer_name=choice.offer.name,
+            discount=choice.discount,
+            products_effected=choice.affected_items,
+        )
+
+    @classmethod
+    def from_allocation(cls, allocation, lines) -> "OfferApplied":
+        """Build from an OfferAllocation, naming the lines whose units it used"""
+        return cls(
+            offer_name=allocation.offer.name,
+            discount=allocation.discount,
+            products_effected=[
+                lines[sku].name for sku, qty in allocation.units.items() if qty > 0
+            ],
+        )
+
     def __str__(self):
         items_str = ", ".join(self.products_effected)
         return f"{self.offer_name}: -{self.discount} ({items_str})"
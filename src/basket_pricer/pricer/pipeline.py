@@ -0,0 +1,251 @@
+import csv
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from src.basket_pricer.models import CompactBasket
+from src.basket_pricer.models.catalogue_loader import CatalogueSource
+from src.basket_pricer.pricer.batch import DEFAULT_CHUNKSIZE, BatchResult
+from src.basket_pricer.utils.exceptions import TillLogError
+from src.basket_pricer.utils.records import RECORD_FORMATS, open_source, read_records
+
+logger = logging.getLogger(__name__)
+
+TILL_LOG_FIELDS = ("basket_id", "sku", "qty")
+DEFAULT_PROGRESS_EVERY = 100_000  # baskets between two progress reports
+# ids of at least this many baskets read last are kept, to notice a basket
+# whose lines are not together
+RECENT_BASKET_IDS = 65_536
+SUMMARY_FIELDS = (
+    "basket_id",
+    "sub_total",
+    "discount",
+    "total",
+    "catalogue_version",
+    "offers",
+    "error",
+)
+
+
+@dataclass
+class PipelineStats:
+    """Counters of a pipeline run, updated as results are written"""
+
+    lines: int = 0
+    bad_lines: int = 0
+    # baskets whose id came back after lines of other baskets
+    split_baskets: int = 0
+    baskets: int = 0
+    errors: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def baskets_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.baskets / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.baskets} baskets ({self.errors} failed) from {self.lines} lines "
+            f"({self.bad_lines} skipped) in {self.elapsed:.1f} s, "
+            f"{self.baskets_per_second:.0f} baskets/s"
+        )
+
+
+def read_till_log(
+    source: CatalogueSource,
+    format: str = "csv",
+    stats: Optional[PipelineStats] = None,
+) -> Iterator[Tuple[str, CompactBasket]]:
+    """
+    Yield (basket_id, CompactBasket) from a till log of basket_id, sku, qty
+    lines, as CSV with a header or JSONL. Lines of one basket are written
+    together, so only the basket being read is held in memory. Bad lines,
+    and the lines of a basket they cannot make, are logged, counted and
+    skipped.
+
+    A basket ends at the first line of another basket. Lines of its id
+    found later are priced as a separate basket of the same id; when that
+    id was among the last RECENT_BASKET_IDS baskets it is logged and
+    counted in split_baskets.
+    """
+    if format not in RECORD_FORMATS:
+        raise ValueError(f"Unknown till log format {format!r}, use 'csv' or 'jsonl'")
+    stats = stats if stats is not None else PipelineStats()
+    basket_id: Optional[str] = None
+    lines: List[Tuple[int, int]] = []
+    # the ids of the baskets read last, and the ones read before them
+    recent: Set[str] = set()
+    older: Set[str] = set()
+    with open_source(source) as stream:
+        records = read_records(stream, format, TILL_LOG_FIELDS, error=TillLogError)
+        for line_number, problem, raw_basket, raw_sku, raw_qty in records:
+            stats.lines += 1
+            if problem is not None:
+                stats.bad_lines += 1
+                logger.warning(f"Till log line {line_number} skipped: {problem}")
+                continue
+            try:
+                line_basket = str(raw_basket)
+                sku, qty = int(raw_sku), int(raw_qty)
+                if qty <= 0:
+                    raise ValueError(f"quantity {qty} must be positive")
+            except (TypeError, ValueError) as error:
+                stats.bad_lines += 1
+                logger.warning(f"Till log line {line_number} skipped: {error!r}")
+                continue
+            if line_basket != basket_id:
+                if lines:
+                    basket = _compact_basket(basket_id, lines, stats)
+                    if basket is not None:
+                        yield basket_id, basket
+                    recent.add(basket_id)
+                    if len(recent) >= RECENT_BASKET_IDS:
+                        recent, older = set(), recent
+                if line_basket in recent or line_basket in older:
+                    stats.split_baskets += 1
+                    logger.warning(
+                        f"Till log line {line_number}: basket {line_basket} "
+                        "continues after other baskets, priced as a separate basket"
+                    )
+                basket_id, lines = line_basket, []
+            lines.append((sku, qty))
+    if lines:
+        basket = _compact_basket(basket_id, lines, stats)
+        if basket is not None:
+            yield basket_id, basket
+
+
+def _compact_basket(
+    basket_id: str, lines: List[Tuple[int, int]], stats: PipelineStats
+) -> Optional[CompactBasket]:
+    """Basket of the lines, None when they do not make one, e.g. merged
+    quantities over MAX_QTY; its lines are logged and counted as bad"""
+    try:
+        return CompactBasket.from_lines(lines)
+    except (ValueError, OverflowError) as error:
+        stats.bad_lines += len(lines)
+        logger.warning(f"Till log basket {basket_id} skipped: {error!r}")
+        return None
+
+
+def summary_record(result: BatchResult) -> Dict[str, Any]:
+    """One result as plain JSON-friendly values"""
+    summary = result.summary
+    if summary is None:
+        return {"basket_id": result.basket_id, "error": str(result.error)}
+    return {
+        "basket_id": result.basket_id,
+        "sub_total": str(summary.sub_total.amount),
+        "discount": str(summary.discount.amount),
+        "total": str(summary.total_amount.amount),
+        "catalogue_version": summary.catalogue_version,
+        "offers": [
+            {
+                "name": offer.offer_name,
+                "discount": str(offer.discount.amount),
+                "products": offer.products_effected,
+            }
+            for offer in summary.applied_offers or []
+        ],
+    }
+
+
+class JsonlSummarySink:
+    """Writes one JSON object per result"""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._stream = stream
+
+    def write(self, result: BatchResult) -> None:
+        self._stream.write(json.dumps(summary_record(result)) + "\n")
+
+
+class CsvSummarySink:
+    """Writes one row per result, offers as 'name: discount' joined by ';'"""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._writer = csv.DictWriter(stream, fieldnames=SUMMARY_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, result: BatchResult) -> None:
+        record = summary_record(result)
+        record["offers"] = "; ".join(
+            f"{offer['name']}: {offer['discount']}"
+            for offer in record.get("offers", ())
+        )
+        self._writer.writerow(record)
+
+
+SummarySink = Union[JsonlSummarySink, CsvSummarySink]
+_SINKS = {"jsonl": JsonlSummarySink, "csv": CsvSummarySink}
+
+
+@contextmanager
+def open_summary_sink(
+    target: Union[str, os.PathLike, IO[str]], format: str = "jsonl"
+) -> Iterator[SummarySink]:
+    """Sink writing to a path or an open text stream"""
+    sink_class = _SINKS.get(format)
+    if sink_class is None:
+        raise ValueError(f"Unknown sink format {format!r}, use 'jsonl' or 'csv'")
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "w", newline="", encoding="utf-8") as stream:
+            yield sink_class(stream)
+    else:
+        yield sink_class(target)  # caller owns the stream
+
+
+def run_pipeline(
+    pricer,
+    source: CatalogueSource,
+    sink: SummarySink,
+    format: str = "csv",
+    workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    progress_every: int = DEFAULT_PROGRESS_EVERY,
+    on_progress: Optional[Callable[[PipelineStats], None]] = None,
+) -> PipelineStats:
+    """
+    Price every basket of a till log and write each result to the sink as
+    soon as it is ready. Everything is a generator: the log is read only as
+    fast as results are written, calculate_many keeps at most two chunks
+    per worker in flight, so memory does not grow with the size of the log.
+    """
+    if progress_every <= 0:
+        raise ValueError(f"progress_every must be positive, got {progress_every}")
+    stats = PipelineStats()
+    baskets = read_till_log(source, format=format, stats=stats)
+    for result in pricer.calculate_many(baskets, workers=workers, chunksize=chunksize):
+        sink.write(result)
+        stats.baskets += 1
+        if not result.ok:
+            stats.errors += 1
+        if stats.baskets % progress_every == 0:
+            logger.info(f"Pipeline progress: {stats}")
+            if on_progress is not None:
+                on_progress(stats)
+    stats.finished = time.perf_counter()
+    logger.info(f"Pipeline finished: {stats}")
+    return stats
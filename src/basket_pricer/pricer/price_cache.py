@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional, Tuple
+
+from src.basket_pricer.pricer.price_summary import PriceSummary
+
+logger = logging.getLogger(__name__)
+
+# (basket fingerprint, compact basket or not, catalogue version, offer set
+# version), and the pricing time for calculations as of a moment
+CacheKey = Tuple[Hashable, bool, Optional[int], Optional[int]]
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class PriceCache:
+    """
+    Bounded LRU cache of PriceSummary results, with an optional time to live.
+
+    Keys include the catalogue and offer set versions, so a summary priced
+    before a product was added or the offers changed is never returned.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, Tuple[float, PriceSummary]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[PriceSummary]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, summary = entry
+                if expires_at >= self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return summary
+                del self._entries[key]  # expired
+            self.misses += 1
+            return None
+
+    def put(self, key: CacheKey, summary: PriceSummary) -> None:
+        expires_at = float("inf") if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, summary)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)  # least recently used
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        logger.debug("Price cache cleared")
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, len(self._entries), self.maxsize)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self):
+        stats = self.stats()
+        return (
+            f"PriceCache({stats.size}/{stats.maxsize} entries, "
+            f"hits={stats.hits}, misses={stats.misses})"
+        )
@@ -1,8 +1,12 @@
+import logging
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 from src.basket_pricer.models.money import Money
 from src.basket_pricer.pricer.offer_summary import OfferApplied
+from src.basket_pricer.utils.exceptions import PricingException
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -11,6 +15,8 @@ class PriceSummary:
     discount: Money
     total_amount: Money
     applied_offers: List[OfferApplied] = None
+    # catalogue version the prices came from, for audits and cache keys
+    catalogue_version: Optional[int] = None
 
     def __post_init__(self):
         # sub total should be positive
@@ -65,20 +71,55 @@ class PriceSummary:
         return result
 
 
-def no_discount_summary(sub_total: Money) -> PriceSummary:
+def no_discount_summary(
+    sub_total: Money, catalogue_version: Optional[int] = None
+) -> PriceSummary:
     return PriceSummary(
         sub_total=sub_total,
         discount=Money.zero(),
         total_amount=sub_total,
         applied_offers=[],
+        catalogue_version=catalogue_version,
     )
 
 
-def zero_summary() -> PriceSummary:
+def zero_summary(catalogue_version: Optional[int] = None) -> PriceSummary:
     zero = Money.zero()
     return PriceSummary(
         sub_total=zero,
         discount=zero,
-        total=zero,
+        total_amount=zero,
         applied_offers=[],
+        catalogue_version=catalogue_version,
+    )
+
+
+def discounted_summary(
+    sub_total: Money,
+    total_discount: Money,
+    applied_offers: List[OfferApplied],
+    catalogue_version: Optional[int] = None,
+) -> PriceSummary:
+    """Summary for a basket with offers, the discount is capped at the sub-total"""
+    if total_discount < Money.zero():
+        raise PricingException("Total discount must be poitive")
+
+    if total_discount > sub_total:
+        total_discount = sub_total  # making items free and no negative
+
+    total = sub_total - total_discount  # final amount to be paid by the customer
+
+    if total < Money.zero():
+        logger.error("Negative total calculated and must be positive")
+        raise PricingException(
+            f"Discount ({total_discount}) exceeds sub-total ({sub_total}), "
+            f"resulting in negative total ({total})"
+        )
+
+    return PriceSummary(
+        sub_total=sub_total,
+        discount=total_discount,
+        total_amount=total,
+        applied_offers=applied_offers,
+        catalogue_version=catalogue_version,
     )
@@ -0,0 +1,161 @@
+import dataclasses
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, Mapping, Optional, Tuple, Union
+
+from src.basket_pricer.models import Catalogue, Money
+from src.basket_pricer.models.price_history import (
+    PriceHistory,
+    Timestamp,
+    to_timestamp,
+)
+from src.basket_pricer.offers import AbstractBaseOffer
+from src.basket_pricer.offers.offer_allocator import OfferAllocator
+from src.basket_pricer.offers.offer_compiler import DroppedOffer
+from src.basket_pricer.offers.offer_index import OfferIndex
+from src.basket_pricer.offers.offer_resolver import OfferResolver
+from src.basket_pricer.offers.offer_schedule import SegmentMemo
+from src.basket_pricer.offers.offer_set import OfferSet
+from src.basket_pricer.utils.exceptions import CatalogueError
+
+logger = logging.getLogger(__name__)
+
+# contexts kept per stretch of time with the same live offers
+MAX_LIVE_CONTEXTS = 256
+
+
+@dataclass(frozen=True)
+class PricingContext:
+    """
+    Everything BasketPricer needs that does not depend on the basket,
+    compiled once from a catalogue and a set of offers.
+
+    The compiled fields are never modified after the context is built, so
+    it can be shared between threads and pickled to worker processes. The
+    only state it gains is the contexts made by offers_at(), kept in a
+    SegmentMemo that locks around its changes and is left empty when the
+    context is pickled.
+    """
+
+    prices: Mapping[int, Money]  # sku -> unit price, frozen from the catalogue
+    offers: Tuple[AbstractBaseOffer, ...]
+    offer_index: OfferIndex
+    offer_resolver: OfferResolver
+    catalogue_version: Optional[int] = None
+    offers_version: Optional[int] = None
+    allocator: OfferAllocator = field(default_factory=OfferAllocator)
+    price_history: Optional[PriceHistory] = None
+    # offers left out of offers because another offer always beats them
+    dropped_offers: Tuple[DroppedOffer, ...] = ()
+    # the offers compiled, with their schedule when some have a validity window
+    offer_set: Optional[OfferSet] = None
+    # context with the live offers, per segment of the schedule
+    _live: SegmentMemo["PricingContext"] = field(
+        default_factory=lambda: SegmentMemo(MAX_LIVE_CONTEXTS),
+        init=False,
+        repr=False,
+        compare=False,
+    )
+
+    @classmethod
+    def build(
+        cls,
+        catalogue: Catalogue,
+        offers: Union[OfferSet, Iterable[AbstractBaseOffer], None],
+        offers_version: Optional[int] = None,
+        allocator: Optional[OfferAllocator] = None,
+    ) -> "PricingContext":
+        """
+        Context for the catalogue and offers. An OfferSet is used as it is,
+        with its own version; a list of offers is compiled into one first,
+        versioned offers_version.
+        """
+        if not isinstance(catalogue, Catalogue):
+            raise TypeError(
+                f"catalogue must be Catalogue, got {type(catalogue).__name__}"
+            )
+        if allocator is not None and not isinstance(allocator, OfferAllocator):
+            raise TypeError(
+                f"allocator must be OfferAllocator, got {type(allocator).__name__}"
+            )
+        # dominated offers are dropped, and the rest classified and indexed
+        # by sku once, not for every basket
+        offer_set = (
+            offers
+            if isinstance(offers, OfferSet)
+            else OfferSet.build(offers, version=offers_version)
+        )
+        context = cls(
+            prices=catalogue.price_table(),
+            offers=offer_set.active,
+            offer_index=offer_set.index,
+            offer_resolver=OfferResolver(offer_set.active, index=offer_set.index),
+            catalogue_version=catalogue.version,
+            offers_version=offer_set.version,
+            allocator=allocator or OfferAllocator(),
+            price_history=catalogue.price_history,
+            dropped_offers=offer_set.dropped,
+            offer_set=offer_set,
+        )
+        logger.debug(
+            f"Pricing context compiled: {len(context.prices)} prices, "
+            f"{len(offer_set.active)} offers"
+        )
+        return context
+
+    def fetch_price(self, sku: int) -> Optional[Money]:
+        """Unit price for the sku, or None when it has none"""
+        return self.prices.get(sku)
+
+    def missing_price(self, sku: int) -> CatalogueError:
+        """Why fetch_price gave None for the sku: no price known yet at the
+        moment of a context for an earlier time, else not in the catalogue"""
+        try:
+            self.prices[sku]
+        except CatalogueError as error:
+            return error
+        except KeyError:
+            pass
+        return CatalogueError(f"Product {sku} not in the catalogue")
+
+    @property
+    def is_scheduled(self) -> bool:
+        """True when some offers are only live during a validity window"""
+        return self.offer_set is not None and self.offer_set.schedule is not None
+
+    def at(self, as_of: Timestamp) -> "PricingContext":
+        """
+        The same context with the prices in force and the offers live at
+        as_of. Prices are looked up in the history per sku as baskets are
+        priced, nothing is rebuilt for the moment.
+        """
+        context = self.offers_at(to_timestamp(as_of))
+        if context.price_history is None:
+            return context
+        return dataclasses.replace(
+            context, prices=context.price_history.prices_at(as_of, context.prices)
+        )
+
+    def offers_at(self, at: float) -> "PricingContext":
+        """
+        The same context with only the offers live at the POSIX timestamp
+        at. The schedule finds them in logarithmic time, and the context
+        made for them is kept for every moment with the same live offers.
+        """
+        if not self.is_scheduled:
+            return self
+        segment = self.offer_set.schedule.segment(at)
+        return self._live.get(segment, lambda: self._with_live_offers(at))
+
+    def _with_live_offers(self, at: float) -> "PricingContext":
+        live = self.offer_set.at(at)
+        logger.debug(f"Offers live at {at}: {len(live.active)} of {len(self.offers)}")
+        return dataclasses.replace(
+            self,
+            offers=live.active,
+            offer_index=live.index,
+            offer_resolver=OfferResolver(live.active, index=live.index),
+            offers_version=live.version,
+            dropped_offers=live.dropped,
+            offer_set=live,
+        )
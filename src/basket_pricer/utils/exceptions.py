@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 
 
 # Base class
@@ -55,9 +55,49 @@ class DuplicateProductError(CatalogueError):
         super().__init__(f"Product '{sku}' already exists in catalogue")
 
 
+class CatalogueLoadError(CatalogueError):
+    "raised once with every bad row found while loading a catalogue file"
+
+    def __init__(self, errors: List[Tuple[int, str]], message: Optional[str] = None):
+        self.errors = errors  # (line number, problem) for each bad row
+        if message is None:
+            shown = "; ".join(
+                f"line {line}: {problem}" for line, problem in errors[:10]
+            )
+            more = f" ... and {len(errors) - 10} more" if len(errors) > 10 else ""
+            message = f"{len(errors)} invalid catalogue rows: {shown}{more}"
+        super().__init__(message)
+
+
+# Pipeline exceptions
+class TillLogError(PricerException):
+    "raised when a till log cannot be read at all, e.g. its header is wrong"
+
+    def __init__(self, errors: List[Tuple[int, str]], message: Optional[str] = None):
+        self.errors = errors  # (line number, problem) for each problem found
+        if message is None:
+            shown = "; ".join(f"line {line}: {problem}" for line, problem in errors)
+            message = f"Till log cannot be read: {shown}"
+        super().__init__(message)
+
+
 # Offer exceptions
 class InvalidOfferConfigError(PricerException):
     def __init__(self, offer: str, message: Optional[str] = None):
         if message is None:
             message = f"Offer {offer} is confiured properly."
         super().__init__(message)
+
+
+class OfferLoadError(InvalidOfferConfigError):
+    "raised once with every bad offer found while loading an offer file"
+
+    def __init__(self, errors: List[Tuple[int, str]], message: Optional[str] = None):
+        self.errors = errors  # (line or entry number, problem) for each bad offer
+        if message is None:
+            shown = "; ".join(
+                f"offer {position}: {problem}" for position, problem in errors[:10]
+            )
+            more = f" ... and {len(errors) - 10} more" if len(errors) > 10 else ""
+            message = f"{len(errors)} invalid offers: {shown}{more}"
+        super().__init__("", message)
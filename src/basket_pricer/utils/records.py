@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import IO, Any, Callable, Iterator, List, Sequence, Tuple, Union
+
+from src.basket_pricer.utils.exceptions import CatalogueLoadError
+
+RECORD_FORMATS = ("csv", "jsonl")
+
+RecordSource = Union[str, os.PathLike, IO[str]]
+# (line number, problem found while reading the line, then the values of the
+# fields asked for in their order, all None when there is a problem); one flat
+# tuple a line, since loaders hold whole chunks of them
+Record = Tuple[Any, ...]
+
+
+@contextmanager
+def open_source(source: RecordSource) -> Iterator[IO[str]]:
+    """Text stream of a path, or the stream itself, left open for its owner"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="", encoding="utf-8") as stream:
+            yield stream
+    else:
+        yield source  # caller owns the stream
+
+
+def read_records(
+    stream: IO[str],
+    format: str,
+    fields: Sequence[str],
+    error: Callable[[List[Tuple[int, str]]], Exception] = CatalogueLoadError,
+) -> Iterator[Record]:
+    """
+    The values of fields on every line of a CSV file with a header, or of
+    a JSONL file of objects, blank lines skipped and an empty file read as
+    no records. CSV header names are matched stripped and lower-cased. A
+    header without all of fields raises error, called with the problem on
+    line 1, so each kind of file reports it with its own exception; a bad
+    line is a record with the problem instead.
+    """
+    if format == "csv":
+        return _csv_records(stream, fields, error)
+    if format == "jsonl":
+        return _jsonl_records(stream, fields)
+    raise ValueError(f"Unknown record format {format!r}, use 'csv' or 'jsonl'")
+
+
+def _csv_records(
+    stream: IO[str],
+    fields: Sequence[str],
+    error: Callable[[List[Tuple[int, str]]], Exception],
+) -> Iterator[Record]:
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {name.strip().lower(): position for position, name in enumerate(header)}
+    missing = [name for name in fields if name not in columns]
+    if missing:
+        raise error([(1, f"header is missing columns {missing}")])
+    positions = [columns[name] for name in fields]
+    width = max(positions) + 1
+    values = _values_at(positions)
+    blank = (None,) * len(fields)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            yield (reader.line_num, f"expected {width} fields", *blank)
+            continue
+        yield (reader.line_num, None) + values(row)
+
+
+def _values_at(positions: List[int]) -> Callable[[List[str]], Tuple[str, ...]]:
+    """Tuple of the values of a row at positions, one C call per row"""
+    getter = itemgetter(*positions)
+    if len(positions) > 1:
+        return getter
+    return lambda row: (getter(row),)
+
+
+def _jsonl_records(stream: IO[str], fields: Sequence[str]) -> Iterator[Record]:
+    blank = (None,) * len(fields)
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as problem:
+            yield (line_number, f"invalid JSON ({problem})", *blank)
+            continue
+        if not isinstance(record, dict):
+            yield (line_number, "expected a JSON object", *blank)
+            continue
+        try:
+            values = [record[name] for name in fields]
+        except KeyError as missing:
+            yield (line_number, f"missing field {missing}", *blank)
+            continue
+        yield (line_number, None, *values)
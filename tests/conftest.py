@@ -3,9 +3,12 @@ import pytest
 # Import all components
 from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
 from src.basket_pricer.offers import (
+    BundleOffer,
     BuyXGetCheapestFreeOffer,
     BuyXgetYfree,
     PercentageOffer,
+    SpendThresholdOffer,
+    TieredQuantityOffer,
 )
 from src.basket_pricer.offers.offers_factory import OffersFactory
 
@@ -277,6 +280,41 @@ def shampoo_buy_3_cheapest_free() -> BuyXGetCheapestFreeOffer:
     )
 
 
+@pytest.fixture
+def shampoo_spend_save() -> SpendThresholdOffer:
+    """Fixture for spend £10 save £1, spend £15 save £3 on Shampoos."""
+    return OffersFactory.create_spend_threshold_offer(
+        id="104",
+        name="Spend and save on shampoo",
+        product_skus=[4, 5, 6],
+        thresholds=["10.00", "15.00"],
+        savings=["1.00", "3.00"],
+    )
+
+
+@pytest.fixture
+def shampoo_tiered() -> TieredQuantityOffer:
+    """Fixture for buy 2 save 10%, buy 3 save 20% on Shampoos."""
+    return OffersFactory.create_tiered_quantity_offer(
+        id="105",
+        name="Buy more save more on shampoo",
+        product_skus=[4, 5, 6],
+        quantities=[2, 3],
+        percentages=[10, 20],
+    )
+
+
+@pytest.fixture
+def meal_deal() -> BundleOffer:
+    """Fixture for any main + snack + drink for £3.00."""
+    return OffersFactory.create_bundle_offer(
+        id="106",
+        name="Meal deal",
+        slots=[[3, 6], [2], [1]],
+        price="3.00",
+    )
+
+
 @pytest.fixture
 def basic_offers(
     beans_buy_2_get_1_free: BuyXgetYfree, sardines_25_percent_off: PercentageOffer
@@ -1,8 +1,33 @@
+import io
+import json
+import pickle
+import random
+import threading
+from decimal import Decimal
+
 import pytest
 
-from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
+import src.basket_pricer.pricer.pricing_context as pricing_context_module
+from src.basket_pricer.models import (
+    Basket,
+    BasketItem,
+    Catalogue,
+    CompactBasket,
+    Money,
+    PriceHistory,
+    Product,
+)
+from src.basket_pricer.offers import PercentageOffer
+from src.basket_pricer.offers.offer_loader import OfferFileWatcher
 from src.basket_pricer.offers.offers_factory import OffersFactory
-from src.basket_pricer.pricer import BasketPricer
+from src.basket_pricer.pricer import BasketPricer, IncrementalPricer, PriceCache
+from src.basket_pricer.pricer.pipeline import (
+    PipelineStats,
+    open_summary_sink,
+    read_till_log,
+    run_pipeline,
+)
+from src.basket_pricer.utils.exceptions import CatalogueError, TillLogError
 
 
 @pytest.mark.integration
@@ -155,10 +180,537 @@ class TestConflictOffers:
         # shampoo large : 3 * 3.50 = 10.50
         # discount 1: beans buy2 get 1: discount = 0.99, total amount = 1.98
         # discount 2: 20 % off: discount = 0.59, total amount = 2.38
-        # discount 3: discount = 5.50
-        # discount 4: discount = 2.62
-        # and so maximum discount is 0.99 + 2.63 + 5.50
+        # discount 3: cheapest free over all 6 shampoos: discount = 5.50
+        # discount 4: 25% off the 3 large: discount = 2.63
+        # each unit takes one offer: beans 0.99, and the large shampoos are
+        # worth more in the cheapest free groups (5.50) than at 25% off
+        # (2.63 + 2.00 from the groups left without them)
         assert result.sub_total == Money("19.97")
-        assert result.discount == Money("9.12")
-        assert result.total_amount == Money("10.85")
-        assert len(result.applied_offers) == 3
+        assert result.discount == Money("6.49")
+        assert result.total_amount == Money("13.48")
+        assert len(result.applied_offers) == 2
+
+    def test_spend_and_tiered_offers_share_units(
+        self,
+        shampoo_catalogue: Catalogue,
+        basket_with_shampoo_scenario: Basket,
+        shampoo_spend_save,
+        shampoo_tiered,
+        shampoo_large_25_percent_off,
+    ):
+        offers = [shampoo_spend_save, shampoo_tiered, shampoo_large_25_percent_off]
+        pricer = BasketPricer(catalogue=shampoo_catalogue, offers=offers)
+        result = pricer.calculate(basket_with_shampoo_scenario)
+        # shampoo: 2 small at 2.00, 1 medium at 2.50, 3 large at 3.50 = 17.00
+        # spend offer on everything: 3.00, tiered on all 6 units: 20% = 3.40
+        # best split: 25% off the 3 large (2.63) and the tiered offer on the
+        # other 3 units, 20% of 6.50 = 1.30
+        assert result.sub_total == Money("17.00")
+        assert result.discount == Money("3.93")
+        assert sorted(applied.offer_name for applied in result.applied_offers) == [
+            "25 percent off on shampoo large",
+            "Buy more save more on shampoo",
+        ]
+
+    def test_threshold_offers_split_the_basket(self):
+        """Compiling the offers keeps both, each reaches £20 on its own sku"""
+        first = Product(sku=1, name="Hamper", price=Money("20.00"))
+        second = Product(sku=2, name="Wine Case", price=Money("20.00"))
+        offers = [
+            OffersFactory.create_spend_threshold_offer(
+                "a", "Spend 20 save 3", [1, 2], ["20.00"], ["3.00"]
+            ),
+            OffersFactory.create_spend_threshold_offer(
+                "b", "Spend 20 save 2", [1, 2], ["20.00"], ["2.00"]
+            ),
+        ]
+        pricer = BasketPricer(catalogue=Catalogue([first, second]), offers=offers)
+        basket = Basket(
+            [BasketItem(product=first, qty=1), BasketItem(product=second, qty=1)]
+        )
+        assert pricer.calculate(basket).discount == Money("5.00")
+
+    def test_meal_deal_against_single_sku_offers(
+        self,
+        full_catalogue: Catalogue,
+        meal_deal,
+        beans_buy_2_get_1_free,
+        shampoo_large_25_percent_off,
+        beans_product: Product,
+        biscuits_product: Product,
+        sardines_product: Product,
+        shampoo_large: Product,
+    ):
+        basket = Basket(
+            [
+                BasketItem(product=beans_product, qty=3),
+                BasketItem(product=biscuits_product, qty=2),
+                BasketItem(product=sardines_product, qty=1),
+                BasketItem(product=shampoo_large, qty=2),
+            ]
+        )
+        offers = [beans_buy_2_get_1_free, shampoo_large_25_percent_off, meal_deal]
+        pricer = BasketPricer(catalogue=full_catalogue, offers=offers)
+        result = pricer.calculate(basket)
+        # two bundles of large shampoo, biscuits and beans at 5.69 for 3.00
+        # save 5.38, more than 25% off the shampoo plus buy 2 get 1 on beans
+        assert result.sub_total == Money("14.26")
+        assert result.discount == Money("5.38")
+        assert [applied.offer_name for applied in result.applied_offers] == [
+            "Meal deal"
+        ]
+
+
+class TestPricingContext:
+    """Tests for the compiled context shared by calculate() calls"""
+
+    def test_context_is_reused_across_calls(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """Setup runs once, repeated calculations reuse the same context"""
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        context = pricer.context
+        first = pricer.calculate(basket_with_mixed_items)
+        second = pricer.calculate(basket_with_mixed_items)
+        assert pricer.context is context
+        assert first.total_amount == second.total_amount == Money("3.40")
+
+    def test_context_rebuilt_when_catalogue_changes(
+        self, basic_catalogue: Catalogue, shampoo_small: Product
+    ):
+        """Products added after the pricer was created can still be priced"""
+        pricer = BasketPricer(basic_catalogue, [])
+        context = pricer.context
+        basic_catalogue.add_product(shampoo_small)
+        basket = Basket([BasketItem(product=shampoo_small, qty=2)])
+        assert pricer.calculate(basket).total_amount == Money("4.00")
+        assert pricer.context is not context
+
+    def test_compact_basket_has_its_own_cache_entry(
+        self, basic_catalogue: Catalogue, beans_buy_2_get_1_free
+    ):
+        """A compact basket is named through the catalogue, not by a Basket
+        of the same contents priced before it"""
+        pricer = BasketPricer(
+            basic_catalogue, [beans_buy_2_get_1_free], cache=PriceCache()
+        )
+        beans = Product(sku=1, name="Till Beans", price=Money("0.99"))
+        basket = Basket([BasketItem(product=beans, qty=3)])
+        compact = CompactBasket.from_basket(basket)
+        assert compact.fingerprint() == basket.fingerprint()
+        named = pricer.calculate(basket).applied_offers[0].products_effected
+        looked_up = pricer.calculate(compact).applied_offers[0].products_effected
+        assert (named, looked_up) == (["Till Beans"], ["Baked Beans"])
+
+    def test_catalogue_swap(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """Summaries record their catalogue version, a swap changes prices
+        without touching contexts already handed out"""
+        pricer = BasketPricer(basic_catalogue, basic_offers, cache=PriceCache())
+        before = pricer.calculate(basket_with_mixed_items)
+        old_context = pricer.context
+        assert before.catalogue_version == basic_catalogue.version
+
+        cheaper = basic_catalogue.with_changes(prices={1: "0.49"})
+        pricer.set_catalogue(cheaper)
+        after = pricer.calculate(basket_with_mixed_items)
+        assert after.catalogue_version == cheaper.version
+        assert after.total_amount == before.total_amount - Money("1.00")
+        assert old_context.fetch_price(1) == Money("0.99")
+
+    def test_calculations_see_one_version_during_swaps(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """Every summary matches the prices of the version it records"""
+        versions = [basic_catalogue]
+        for price in ("0.20", "0.40", "0.60", "0.80"):
+            versions.append(basic_catalogue.with_changes(prices={1: price}))
+        expected = {
+            catalogue.version: BasketPricer(catalogue, basic_offers)
+            .calculate(basket_with_mixed_items)
+            .total_amount
+            for catalogue in versions
+        }
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        results = []
+
+        def price_baskets():
+            for _ in range(200):
+                results.append(pricer.calculate(basket_with_mixed_items))
+
+        threads = [threading.Thread(target=price_baskets) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for catalogue in versions * 5:
+            pricer.set_catalogue(catalogue)
+        for thread in threads:
+            thread.join()
+        assert len(results) == 800
+        for summary in results:
+            assert summary.total_amount == expected[summary.catalogue_version]
+
+    def test_calculate_as_of(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """Receipts are repriced at the prices in force when they were made"""
+        history = PriceHistory()
+        history.add_change(1, "2024-01-01T00:00:00", "0.49")
+        history.add_change(1, "2024-06-01T00:00:00", "0.99")
+        basic_catalogue.set_price_history(history)
+        pricer = BasketPricer(basic_catalogue, basic_offers, cache=PriceCache())
+
+        then = pricer.calculate(basket_with_mixed_items, as_of="2024-03-01T09:30:00")
+        now = pricer.calculate(basket_with_mixed_items)
+        assert then.total_amount == Money("2.40")
+        assert now.total_amount == Money("3.40")
+        assert pricer.calculate(
+            basket_with_mixed_items, as_of="2024-07-01T09:30:00"
+        ).total_amount == Money("3.40")
+        # before the first change of a sku its price is not known
+        for basket in (
+            basket_with_mixed_items,
+            CompactBasket.from_basket(basket_with_mixed_items),
+        ):
+            with pytest.raises(CatalogueError, match="No price known for sku 1 at"):
+                pricer.calculate(basket, as_of="2023-12-01T00:00:00")
+
+    def test_offers_live_at_transaction_time(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """Receipts are repriced with the offers live when they were made"""
+        promotion = PercentageOffer(
+            id="summer",
+            name="Summer sardines",
+            sku=3,
+            percentage=50,
+            starts_at="2024-06-01T00:00:00+00:00",
+            ends_at="2024-07-01T00:00:00+00:00",
+        )
+        pricer = BasketPricer(
+            basic_catalogue, basic_offers + [promotion], cache=PriceCache()
+        )
+        without = BasketPricer(basic_catalogue, basic_offers)
+
+        during = pricer.calculate(basket_with_mixed_items, as_of=1_718_000_000)
+        after = pricer.calculate(basket_with_mixed_items, as_of="2024-08-01T00:00:00")
+        assert during.discount > after.discount
+        assert "Summer sardines" in [
+            applied.offer_name for applied in during.applied_offers
+        ]
+        assert after == without.calculate(basket_with_mixed_items)
+        assert pricer.calculate(basket_with_mixed_items) == after  # ended by now
+        assert pricer.context_at(1_718_000_000) is pricer.context_at(1_719_000_000)
+
+    def test_live_contexts_not_pickled(
+        self, monkeypatch, basic_catalogue: Catalogue, basic_offers
+    ):
+        """Evicted live offers come back with their version, and a pickled
+        context leaves the ones it made behind"""
+        monkeypatch.setattr(pricing_context_module, "MAX_LIVE_CONTEXTS", 1)
+        promotion = PercentageOffer(
+            id="summer", name="Summer", sku=3, percentage=50, starts_at=10, ends_at=20
+        )
+        context = BasketPricer(basic_catalogue, basic_offers + [promotion]).context
+        during = context.offers_at(15)
+        context.offers_at(25)
+        assert context.offers_at(15) is not during
+        assert context.offers_at(15).offers_version == during.offers_version
+        worker_context = pickle.loads(pickle.dumps(context))
+        assert len(context._live) == 1 and len(worker_context._live) == 0
+        assert worker_context.offers_at(15).offers == during.offers
+
+    def test_compact_basket_priced_like_basket(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """A CompactBasket gives the same summary, in process and in a worker"""
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        compact = CompactBasket.from_basket(basket_with_mixed_items)
+        expected = pricer.calculate(basket_with_mixed_items)
+        assert pricer.calculate(compact) == expected
+        worker_pricer = BasketPricer.from_context(
+            pickle.loads(pickle.dumps(pricer.context))
+        )
+        result = worker_pricer.calculate(pickle.loads(pickle.dumps(compact)))
+        assert result.total_amount == expected.total_amount
+        with pytest.raises(CatalogueError):
+            pricer.calculate(CompactBasket([99], [1]))
+
+    def test_context_pickles_to_an_equivalent_pricer(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """A pickled context prices baskets exactly like the original pricer"""
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        context = pickle.loads(pickle.dumps(pricer.context))
+        worker_pricer = BasketPricer.from_context(context)
+        expected = pricer.calculate(basket_with_mixed_items)
+        result = worker_pricer.calculate(basket_with_mixed_items)
+        assert result.total_amount == expected.total_amount
+        assert result.discount == expected.discount
+
+    def test_dominated_offers_dropped_from_context(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        """A 10% offer next to 20% off the same sku is reported and not evaluated"""
+        sardines_10 = OffersFactory.create_percentage_offer(
+            id="sardines_10", name="10% off sardines", sku=3, percentage=10
+        )
+        pricer = BasketPricer(basic_catalogue, basic_offers + [sardines_10])
+        expected = BasketPricer(basic_catalogue, basic_offers).calculate(
+            basket_with_mixed_items
+        )
+        assert [dropped.offer for dropped in pricer.dropped_offers] == [sardines_10]
+        assert sardines_10 not in pricer.context.offers
+        assert pricer.calculate(basket_with_mixed_items) == expected
+
+    def test_offers_reloaded_from_file(
+        self,
+        tmp_path,
+        basket_with_mixed_items: Basket,
+        basic_catalogue: Catalogue,
+        basic_offers,
+    ):
+        """A reloaded offer file prices like the same offers given in code"""
+        beans = {"type": "buy_x_get_y_free", "id": "101", "name": "B2G1", "sku": 1}
+        sardines = {"type": "percentage", "id": "102", "name": "25%", "sku": 3}
+        records = [{**beans, "buy": 2, "free": 1}, {**sardines, "percentage": 25}]
+        path = tmp_path / "offers.json"
+        path.write_text(json.dumps(records[:1]))
+        watcher = OfferFileWatcher(str(path))
+        pricer = BasketPricer(basic_catalogue, watcher.offer_set)
+        watcher.on_reload = pricer.set_offers
+        before = pricer.context.offers_version
+
+        (tmp_path / "offers.new").write_text(json.dumps({"offers": records}))
+        (tmp_path / "offers.new").replace(path)
+        assert watcher.reload_if_changed()
+        expected = BasketPricer(basic_catalogue, basic_offers).calculate(
+            basket_with_mixed_items
+        )
+        assert pricer.context.offers_version == watcher.offer_set.version > before
+        result = pricer.calculate(basket_with_mixed_items)
+        assert result.total_amount == expected.total_amount
+        assert result.discount == expected.discount
+
+    def test_context_precomputes_offer_constants(
+        self, beans_buy_2_get_1_free, sardines_25_percent_off
+    ):
+        """Per-offer constants are derived once at construction"""
+        assert beans_buy_2_get_1_free._group_size == 3
+        assert sardines_25_percent_off._rate == Decimal("0.25")
+
+
+class TestCalculateMany:
+    """Tests for pricing batches of baskets"""
+
+    @pytest.fixture
+    def baskets(
+        self, basket_with_mixed_items: Basket, basic_products: list[Product]
+    ) -> list[Basket]:
+        beans, biscuits, sardines = basic_products
+        return [
+            basket_with_mixed_items,
+            Basket([BasketItem(product=biscuits, qty=2)]),
+            Basket([BasketItem(product=sardines, qty=4)]),
+        ] * 5
+
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_results_in_input_order(
+        self, baskets: list[Basket], basic_catalogue: Catalogue, basic_offers, workers
+    ):
+        """Batch results match pricing every basket on its own, in order"""
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        results = list(pricer.calculate_many(baskets, workers=workers, chunksize=2))
+
+        assert [result.basket_id for result in results] == list(range(len(baskets)))
+        for result, basket in zip(results, baskets):
+            assert result.ok
+            assert result.summary.total_amount == pricer.calculate(basket).total_amount
+
+    def test_unordered_results_carry_ids(
+        self, baskets: list[Basket], basic_catalogue: Catalogue, basic_offers
+    ):
+        """Unordered results can be matched back with the supplied ids"""
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        items = [(f"till-{i}", basket) for i, basket in enumerate(baskets)]
+        results = pricer.calculate_many(items, workers=2, chunksize=4, ordered=False)
+
+        by_id = {result.basket_id: result for result in results}
+        assert set(by_id) == {basket_id for basket_id, _ in items}
+        for basket_id, basket in items:
+            expected = pricer.calculate(basket).total_amount
+            assert by_id[basket_id].summary.total_amount == expected
+
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_failing_basket_does_not_abort_batch(
+        self,
+        baskets: list[Basket],
+        basic_catalogue: Catalogue,
+        shampoo_small: Product,
+        workers,
+    ):
+        """A basket with an unknown product reports an error, the rest are priced"""
+        pricer = BasketPricer(basic_catalogue, [])
+        unknown = Basket([BasketItem(product=shampoo_small, qty=1)])
+        results = list(pricer.calculate_many([unknown] + baskets, workers=workers))
+
+        assert not results[0].ok
+        assert isinstance(results[0].error, CatalogueError)
+        assert all(result.ok for result in results[1:])
+
+
+class TestIncrementalPricer:
+    """Tests for repricing a basket as it is scanned"""
+
+    def test_matches_full_pricing_while_scanning(
+        self,
+        basic_products: list[Product],
+        shampoo_products: list[Product],
+        full_catalogue: Catalogue,
+        basic_offers,
+        shampoo_buy_3_cheapest_free,
+        shampoo_large_25_percent_off,
+    ):
+        """After every change the incremental price equals a full calculation"""
+        offers = basic_offers + [
+            shampoo_buy_3_cheapest_free,
+            shampoo_large_25_percent_off,
+        ]
+        pricer = BasketPricer(full_catalogue, offers)
+        basket = Basket()
+        incremental = IncrementalPricer(pricer, basket)
+        products = basic_products + shampoo_products
+        rng = random.Random(11)
+
+        for _ in range(200):
+            product = rng.choice(products)
+            sku = product.sku
+            action = rng.random()
+            if action < 0.6 or not basket.has_product(sku):
+                basket.add_item(BasketItem(product=product, qty=rng.randint(1, 3)))
+            elif action < 0.8:
+                basket.set_quantity(sku, rng.randint(0, 6))
+            else:
+                basket.remove_item(sku)
+
+            result = incremental.price()
+            expected = pricer.calculate(basket)
+            assert result.sub_total == expected.sub_total
+            assert result.discount == expected.discount
+            assert result.total_amount == expected.total_amount
+            assert [str(offer) for offer in result.applied_offers] == [
+                str(offer) for offer in expected.applied_offers
+            ]
+
+    def test_only_changed_skus_are_evaluated(
+        self,
+        basket_with_mixed_items: Basket,
+        basic_catalogue: Catalogue,
+        basic_offers,
+        biscuits_product: Product,
+    ):
+        """Scanning an item without offers evaluates no offers at all"""
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        incremental = IncrementalPricer(pricer, basket_with_mixed_items)
+        incremental.price()
+
+        calls = []
+        for offer in basic_offers:
+            original = offer.discount_for_units
+            object.__setattr__(
+                offer,
+                "discount_for_units",
+                lambda units, original=original: calls.append(1) or original(units),
+            )
+        basket_with_mixed_items.add_item(BasketItem(product=biscuits_product, qty=1))
+        summary = incremental.price()
+
+        assert calls == []
+        assert summary.sub_total == Money("6.06")
+        assert incremental.price() is summary  # nothing changed since
+
+
+@pytest.mark.integration
+class TestPipeline:
+    """Tests for pricing till logs end to end."""
+
+    LOG = (
+        "basket_id,sku,qty\n"
+        "a,1,3\n"
+        "a,3,1\n"
+        "b,2,1\n"
+        "b,x,1\n"
+        "c,99,1\n"
+        "d,1,1\n"
+        "d,1,2\n"
+    )
+
+    def test_log_priced_into_jsonl(self, basic_catalogue: Catalogue, basic_offers):
+        """Each basket gives one record, bad lines and baskets are counted"""
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        output = io.StringIO()
+        with open_summary_sink(output, format="jsonl") as sink:
+            stats = run_pipeline(pricer, io.StringIO(self.LOG), sink, chunksize=2)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [record["basket_id"] for record in records] == ["a", "b", "c", "d"]
+        assert records[0]["total"] == "3.40"
+        assert records[0]["offers"][0]["products"] == ["Baked Beans"]
+        assert records[3]["total"] == "1.98"
+        assert "error" in records[2]
+        assert (stats.lines, stats.bad_lines) == (7, 1)
+        assert (stats.baskets, stats.errors) == (4, 1)
+
+    def test_jsonl_log_into_csv_with_progress(
+        self, basic_catalogue: Catalogue, basic_offers
+    ):
+        """JSONL logs read lazily, CSV rows written, progress reported"""
+        lines = "".join(
+            json.dumps({"basket_id": basket, "sku": 1, "qty": 3}) + "\n"
+            for basket in range(5)
+        )
+        baskets = read_till_log(io.StringIO(lines), format="jsonl")
+        assert next(baskets)[1].fingerprint() == frozenset({(1, 3)})
+
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        output, reports = io.StringIO(), []
+        with open_summary_sink(output, format="csv") as sink:
+            run_pipeline(
+                pricer,
+                io.StringIO(lines),
+                sink,
+                format="jsonl",
+                progress_every=2,
+                on_progress=lambda stats: reports.append(stats.baskets),
+            )
+        rows = output.getvalue().splitlines()
+        assert rows[0].startswith("basket_id,sub_total,discount,total")
+        assert rows[1].startswith("0,2.97,0.99,1.98,")
+        assert len(rows) == 6 and reports == [2, 4]
+
+    def test_basket_over_max_quantity_skipped(
+        self, basic_catalogue: Catalogue, basic_offers
+    ):
+        """Lines of one sku merged past what a basket holds are counted bad,
+        the run goes on"""
+        log = "basket_id,sku,qty\nb1,1,2\nb1,1,4294967295\nb2,1,3\n"
+        pricer = BasketPricer(basic_catalogue, basic_offers)
+        output = io.StringIO()
+        with open_summary_sink(output, format="jsonl") as sink:
+            stats = run_pipeline(pricer, io.StringIO(log), sink)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [record["basket_id"] for record in records] == ["b2"]
+        assert (stats.lines, stats.bad_lines, stats.baskets) == (3, 2, 1)
+
+    def test_bad_header_and_split_baskets(self, caplog):
+        """A log without its columns has its own error, a basket whose lines
+        are not together is priced in parts and reported"""
+        with pytest.raises(TillLogError, match="missing columns"):
+            next(read_till_log(io.StringIO("basket,sku,qty\na,1,1\n")))
+        assert list(read_till_log(io.StringIO(""))) == []
+        stats = PipelineStats()
+        log = "Basket_ID,SKU,qty\na,1,1\nb,2,1\na,3,1\nc,4\n"
+        baskets = list(read_till_log(io.StringIO(log), stats=stats))
+        assert [basket_id for basket_id, _ in baskets] == ["a", "b", "a"]
+        assert stats.split_baskets == 1 and stats.bad_lines == 1
+        assert "basket a continues after other baskets" in caplog.text
+        assert "expected 3 fields" in caplog.text
@@ -1,7 +1,28 @@
+import io
+import pickle
+import random
+import time
+from datetime import datetime
+
 import pytest
 
-from src.basket_pricer.models import Catalogue, Product
-from src.basket_pricer.utils.exceptions import CatalogueError
+import src.basket_pricer.models.catalogue as catalogue_module
+from src.basket_pricer.models import (
+    Catalogue,
+    ColumnarCatalogue,
+    LayeredCatalogue,
+    Money,
+    PriceHistory,
+    Product,
+    StoreCatalogues,
+    load_snapshot_offers,
+    open_catalogue_snapshot,
+    write_catalogue_snapshot,
+)
+from src.basket_pricer.models.columnar_catalogue import HAVE_NUMPY
+from src.basket_pricer.models.price_history import to_timestamp
+from src.basket_pricer.pricer import BasketPricer
+from src.basket_pricer.utils.exceptions import CatalogueError, CatalogueLoadError
 
 
 class TestCatalogueCreation:
@@ -43,3 +64,479 @@ class TestCatalogueOperations:
     def test_has_product(self, basic_catalogue: Catalogue):
         """Test checking product existence."""
         assert basic_catalogue.has_product(1)
+
+
+class TestColumnarCatalogue:
+    """Tests for the array backed catalogue."""
+
+    def test_same_lookups_as_catalogue(self, basic_products: list[Product]):
+        """has_product and fetch_price behave like the dict catalogue"""
+        catalogue = ColumnarCatalogue(basic_products)
+        reference = Catalogue(basic_products)
+        assert len(catalogue) == 3
+        for product in basic_products:
+            assert catalogue.has_product(product.sku)
+            assert catalogue.fetch_price(product.sku) == reference.fetch_price(
+                product.sku
+            )
+            assert catalogue.fetch_product(product.sku) == product
+        assert not catalogue.has_product(99)
+        with pytest.raises(ValueError):
+            catalogue.fetch_price(99)
+
+    def test_from_columns_and_fetch_prices(self):
+        """Columns need not be sorted, fetch_prices keeps the order asked for"""
+        catalogue = ColumnarCatalogue.from_columns(
+            skus=[30, 10, 20],
+            prices=[250, 99, 189],
+            names=["Shampoo", "Beans", "Fish"],
+        )
+        assert catalogue.fetch_prices([20, 30, 10]) == [
+            Money("1.89"),
+            Money("2.50"),
+            Money("0.99"),
+        ]
+        assert catalogue.fetch_product(30).name == "Shampoo"
+        with pytest.raises(ValueError):
+            catalogue.fetch_prices([10, 11])
+
+    @pytest.mark.skipif(not HAVE_NUMPY, reason="NumPy is not installed")
+    def test_numpy_lookup_matches_bisect(self):
+        """The searchsorted lookup gives the prices and errors of the bisect"""
+        rng = random.Random(11)
+        skus = rng.sample(range(1, 10_000), 500)
+        catalogue = ColumnarCatalogue.from_columns(
+            skus=skus,
+            prices=[rng.randint(1, 10_000) for _ in skus],
+            names=[f"P{sku}" for sku in skus],
+        )
+        wanted = rng.choices(skus, k=200)
+        assert catalogue.fetch_prices(wanted, use_numpy=True) == (
+            catalogue.fetch_prices(wanted, use_numpy=False)
+        )
+        for use_numpy in (True, False):
+            with pytest.raises(ValueError, match=r"\[0, 10000\]"):
+                catalogue.fetch_prices(wanted + [0, 10_000], use_numpy=use_numpy)
+            with pytest.raises(ValueError):
+                ColumnarCatalogue().fetch_prices([1], use_numpy=use_numpy)
+
+    def test_invalid_columns_rejected(self):
+        """Duplicate skus, bad prices and empty names are rejected"""
+        with pytest.raises(CatalogueError):
+            ColumnarCatalogue.from_columns([1, 1], [10, 20], ["A", "B"])
+        with pytest.raises(ValueError):
+            ColumnarCatalogue.from_columns([1, 2], [10, 0], ["A", "B"])
+        with pytest.raises(CatalogueError):
+            ColumnarCatalogue.from_columns([1, 2], [10, 20], ["A", " "])
+
+    def test_add_product_keeps_earlier_price_tables(
+        self, basic_products: list[Product], shampoo_small: Product
+    ):
+        """Adding copies the columns, price tables handed out are unchanged"""
+        catalogue = ColumnarCatalogue(basic_products)
+        version = catalogue.version
+        prices = catalogue.price_table()
+        catalogue.add_product(shampoo_small)
+        assert catalogue.version != version
+        assert shampoo_small.sku not in prices
+        assert catalogue.price_table()[shampoo_small.sku] == shampoo_small.price
+        with pytest.raises(CatalogueError):
+            catalogue.add_product(shampoo_small)
+
+    def test_prices_baskets_like_catalogue(
+        self, basic_products: list[Product], basic_offers, basket_with_mixed_items
+    ):
+        """Pricing against either catalogue gives the same summary"""
+        columnar = BasketPricer(ColumnarCatalogue(basic_products), basic_offers)
+        reference = BasketPricer(Catalogue(basic_products), basic_offers)
+        result = columnar.calculate(basket_with_mixed_items)
+        assert (
+            result.total_amount
+            == reference.calculate(basket_with_mixed_items).total_amount
+        )
+        context = pickle.loads(pickle.dumps(columnar.context))
+        worker_pricer = BasketPricer.from_context(context)
+        assert worker_pricer.calculate(basket_with_mixed_items) == result
+
+
+class TestCatalogueVersions:
+    """Tests for copy-on-write catalogue versions."""
+
+    @pytest.mark.parametrize("catalogue_class", [Catalogue, ColumnarCatalogue])
+    def test_with_changes_leaves_original(
+        self, catalogue_class, basic_products: list[Product], shampoo_small: Product
+    ):
+        """A batch makes a new version, the old one keeps every price"""
+        catalogue = catalogue_class(basic_products)
+        changed = catalogue.with_changes(
+            prices={1: "0.50"}, added=[shampoo_small], removed=[2]
+        )
+        assert changed.version > catalogue.version
+        assert changed.fetch_price(1) == Money("0.50")
+        assert changed.fetch_price(3) == Money("1.89")
+        assert changed.has_product(shampoo_small.sku)
+        assert not changed.has_product(2)
+        assert catalogue.fetch_price(1) == Money("0.99")
+        assert catalogue.has_product(2)
+        assert not catalogue.has_product(shampoo_small.sku)
+
+    def test_unchanged_data_is_shared(self, basic_products: list[Product]):
+        """Only what changed is copied"""
+        catalogue = Catalogue(basic_products)
+        changed = catalogue.with_changes(prices={1: Money("0.50")})
+        assert changed.fetch_product(3) is catalogue.fetch_product(3)
+
+        columnar = ColumnarCatalogue(basic_products)
+        changed = columnar.with_changes(prices={1: Money("0.50")})
+        assert changed._columns.skus is columnar._columns.skus
+        assert changed._columns.names is columnar._columns.names
+        assert columnar.price_table()[1] == Money("0.99")
+
+    def test_versions_share_products(self, basic_products: list[Product]):
+        """A batch copies nothing but its changes, even across many versions"""
+        catalogue = Catalogue(basic_products)
+        first = catalogue.with_changes(prices={1: "0.50"})
+        second = first.with_changes(prices={2: "1.00"}, removed=[3])
+        assert second._products._shared is catalogue._products._shared
+        assert dict(second.price_table()) == {1: Money("0.50"), 2: Money("1.00")}
+        assert len(second) == 2 and list(second._products) == [1, 2]
+        # the original keeps its own additions to itself
+        catalogue.add_product(Product(sku=9, name="Tea", price=Money("2.00")))
+        assert catalogue.has_product(9)
+        assert not first.has_product(9) and not second.has_product(9)
+
+    @pytest.mark.parametrize("fold_after", [8, 1024])
+    def test_chained_versions_match_a_dict(self, monkeypatch, fold_after):
+        """Random batches agree with a plain dict, before and after folding"""
+        monkeypatch.setattr(catalogue_module, "MIN_FOLD_CHANGES", fold_after)
+        rng = random.Random(14)
+        folded = 0
+        catalogue = Catalogue(
+            [Product(sku=sku, name=f"P{sku}", price=Money("1.00")) for sku in range(50)]
+        )
+        expected = {sku: Money("1.00") for sku in range(50)}
+        for batch in range(400):
+            prices = {
+                sku: Money.from_minor_units(rng.randint(1, 999))
+                for sku in rng.sample(sorted(expected), 3)
+            }
+            removed = [
+                sku for sku in rng.sample(sorted(expected), 1) if sku not in prices
+            ]
+            added = [Product(sku=100 + batch, name="New", price=Money("2.00"))]
+            catalogue = catalogue.with_changes(prices, added, removed)
+            expected.update(prices)
+            for sku in removed:
+                del expected[sku]
+            expected[100 + batch] = Money("2.00")
+            assert dict(catalogue.price_table()) == expected
+            folded += isinstance(catalogue._products, dict)
+        assert (folded > 0) == (fold_after == 8)
+        assert len(catalogue) == len(expected)
+        assert {sku: catalogue.fetch_price(sku) for sku in expected} == expected
+
+    def test_single_changes_stay_shallow(self):
+        """Many one-sku batches keep few layers and copy little of them"""
+        catalogue = Catalogue(
+            [Product(sku=sku, name=f"P{sku}", price=Money("1.00")) for sku in range(50)]
+        )
+        for batch in range(1000):
+            catalogue = catalogue.with_changes(
+                prices={batch % 50: Money.from_minor_units(batch + 1)}
+            )
+            assert len(catalogue._products._layers) <= 6
+        assert catalogue.fetch_price(49) == Money.from_minor_units(1000)
+        assert dict(catalogue.price_table())[0] == Money.from_minor_units(951)
+
+    def test_price_table_kept_from_later_additions(self, basic_products: list[Product]):
+        """A price table taken before an addition does not see it"""
+        catalogue = Catalogue(basic_products)
+        catalogue.with_changes(prices={1: "0.50"})
+        catalogue.add_product(Product(sku=9, name="Tea", price=Money("2.00")))
+        prices = catalogue.price_table()
+        catalogue.add_product(Product(sku=10, name="Jam", price=Money("1.50")))
+        assert 9 in prices and 10 not in prices
+        assert len(prices) == len(basic_products) + 1
+        assert catalogue.fetch_price(10) == Money("1.50")
+
+    def test_invalid_batch_rejected_whole(
+        self, basic_products: list[Product], beans_product: Product
+    ):
+        """A bad change fails the batch before any of it is applied"""
+        catalogue = Catalogue(basic_products)
+        with pytest.raises(CatalogueError):
+            catalogue.with_changes(prices={1: "0.50", 99: "1.00"})
+        with pytest.raises(CatalogueError):
+            catalogue.with_changes(removed=[99])
+        with pytest.raises(CatalogueError):
+            catalogue.with_changes(added=[beans_product])
+        with pytest.raises(ValueError):
+            catalogue.with_changes(prices={1: "0"})
+        assert catalogue.fetch_price(1) == Money("0.99")
+        replaced = catalogue.with_changes(added=[beans_product], removed=[1])
+        assert replaced.fetch_product(1) is beans_product
+
+
+class TestStoreCatalogues:
+    """Tests for per-store price overrides over a shared base catalogue."""
+
+    def test_overrides_checked_first(self, basic_products: list[Product]):
+        """A store sees its own prices, everything else comes from the base"""
+        stores = StoreCatalogues(
+            Catalogue(basic_products), {"leeds": {1: "0.50"}, "york": {}}
+        )
+        leeds, york = stores.catalogue("leeds"), stores.catalogue("york")
+        assert leeds.fetch_price(1) == Money("0.50")
+        assert leeds.fetch_product(1).name == "Baked Beans"
+        assert leeds.fetch_price(2) == york.fetch_price(2) == Money("1.20")
+        assert york.fetch_price(1) == Money("0.99")
+        assert leeds.has_product(3) and not leeds.has_product(99)
+        assert leeds.price_table()[1] == Money("0.50")
+        assert leeds.price_table()._base is york.price_table()._base
+        assert len(leeds) == len(basic_products)
+
+    def test_swap_store_overrides(
+        self, basic_products: list[Product], basic_offers, basket_with_mixed_items
+    ):
+        """Swapping a store's overlay gives a new layer for its pricer"""
+        stores = StoreCatalogues(Catalogue(basic_products), {"leeds": {}})
+        layer = stores.catalogue("leeds")
+        pricer = BasketPricer(layer, basic_offers)
+        before = pricer.calculate(basket_with_mixed_items)
+
+        swapped = stores.set_overrides("leeds", {1: "0.49", 3: "1.00"})
+        pricer.set_catalogue(swapped)
+        after = pricer.calculate(basket_with_mixed_items)
+        assert swapped.version != layer.version
+        assert layer.fetch_price(1) == Money("0.99")
+        assert stores.catalogue("leeds") is swapped
+        assert after.total_amount == Money("1.73")
+        assert before.total_amount == Money("3.40")
+
+    def test_invalid_overrides_and_stores(self, basic_products: list[Product]):
+        """Overrides must be for base skus, products belong to the base"""
+        stores = StoreCatalogues(Catalogue(basic_products))
+        with pytest.raises(CatalogueError):
+            stores.set_overrides("leeds", {99: "1.00"})
+        with pytest.raises(CatalogueError):
+            stores.catalogue("leeds")
+        layer = stores.set_overrides("leeds", {1: "0.50"})
+        with pytest.raises(CatalogueError):
+            layer.add_product(Product(sku=9, name="Soap", price="1.00"))
+        assert layer.with_changes(prices={2: "1.00"}).overrides == {
+            1: Money("0.50"),
+            2: Money("1.00"),
+        }
+
+    def test_new_base_keeps_overrides(self, basic_products: list[Product]):
+        """Stores move to a new base, overrides of removed skus are dropped"""
+        base = Catalogue(basic_products)
+        stores = StoreCatalogues(base, {"leeds": {1: "0.50", 2: "1.00"}})
+        stores.set_base(base.with_changes(prices={3: "2.00"}, removed=[2]))
+        leeds = stores.catalogue("leeds")
+        assert leeds.overrides == {1: Money("0.50")}
+        assert leeds.fetch_price(3) == Money("2.00")
+        assert isinstance(leeds, LayeredCatalogue)
+
+
+class TestCatalogueLoad:
+    """Tests for bulk loading catalogues from files."""
+
+    def test_load_csv(self, tmp_path):
+        """Rows load from a CSV path, columns found by header name"""
+        path = tmp_path / "catalogue.csv"
+        path.write_text("name,sku,price\nBaked Beans,1,0.99\nBiscuits,2,1.20\n")
+        catalogue = Catalogue.load(path)
+        assert len(catalogue) == 2
+        assert catalogue.fetch_price(1) == Money("0.99")
+        assert catalogue.fetch_product(2).name == "Biscuits"
+
+    def test_load_jsonl_columnar(self):
+        """JSONL streams load into either catalogue class"""
+        stream = io.StringIO(
+            '{"sku": 1, "name": "Baked Beans", "price": "0.99"}\n'
+            "\n"
+            '{"sku": 2, "name": "Biscuits", "price": 1.2}\n'
+        )
+        catalogue = ColumnarCatalogue.load(stream, format="jsonl")
+        assert isinstance(catalogue, ColumnarCatalogue)
+        assert catalogue.fetch_prices([2, 1]) == [Money("1.20"), Money("0.99")]
+
+    def test_every_bad_row_reported(self):
+        """All bad rows come back in one error, not just the first"""
+        stream = io.StringIO(
+            "sku,name,price\n"
+            "1,Beans,0.99\n"
+            "1,Beans again,0.99\n"
+            "x,Biscuits,1.20\n"
+            "3,,1.20\n"
+            "4,Sardines,free\n"
+            "5,Shampoo\n"
+            "6,Soap,0\n"
+        )
+        with pytest.raises(CatalogueLoadError) as error:
+            Catalogue.load(stream, chunk_size=2)
+        assert [line for line, _ in error.value.errors] == [3, 4, 5, 6, 7, 8]
+
+    def test_header_matched_loosely_and_empty_file(self):
+        """Header names are matched stripped and in any case, and a file
+        without even a header has no rows"""
+        catalogue = Catalogue.load(io.StringIO(" SKU ,Name,PRICE\n1,Beans,0.99\n"))
+        assert catalogue.fetch_price(1) == Money("0.99")
+        assert len(Catalogue.load(io.StringIO(""))) == 0
+
+    def test_bad_header_and_format(self):
+        """A header without the needed columns or an unknown format fails early"""
+        with pytest.raises(CatalogueLoadError):
+            Catalogue.load(io.StringIO("sku,title,price\n1,Beans,0.99\n"))
+        with pytest.raises(ValueError):
+            Catalogue.load(io.StringIO(""), format="xml")
+
+
+class TestCatalogueSnapshot:
+    """Tests for memory mapped catalogue snapshots."""
+
+    def test_round_trip(self, tmp_path, basic_products: list[Product]):
+        """Either catalogue class saves, lookups read from the mapped file"""
+        path = tmp_path / "catalogue.snap"
+        for source in (Catalogue(basic_products), ColumnarCatalogue(basic_products)):
+            write_catalogue_snapshot(source, path)
+            catalogue = open_catalogue_snapshot(path)
+            assert len(catalogue) == len(basic_products)
+            for product in basic_products:
+                assert catalogue.fetch_product(product.sku) == product
+            assert not catalogue.has_product(999)
+            assert load_snapshot_offers(catalogue) is None
+
+    def test_prices_and_pickles_like_catalogue(
+        self,
+        tmp_path,
+        basic_products: list[Product],
+        basic_offers,
+        basket_with_mixed_items,
+    ):
+        """Offers saved alongside, pricing matches, workers reopen the file"""
+        path = tmp_path / "catalogue.snap"
+        write_catalogue_snapshot(Catalogue(basic_products), path, basic_offers)
+        catalogue = open_catalogue_snapshot(path)
+        offers = load_snapshot_offers(catalogue)
+        assert len(offers) == len(basic_offers)
+        result = BasketPricer(catalogue, offers).calculate(basket_with_mixed_items)
+        reference = BasketPricer(Catalogue(basic_products), basic_offers)
+        assert (
+            result.total_amount
+            == reference.calculate(basket_with_mixed_items).total_amount
+        )
+        worker_catalogue = pickle.loads(pickle.dumps(catalogue))
+        assert worker_catalogue.fetch_prices(
+            [product.sku for product in basic_products]
+        ) == [product.price for product in basic_products]
+
+    def test_add_product_copies_out_of_the_mapping(
+        self, tmp_path, basic_products: list[Product], shampoo_small: Product
+    ):
+        """The mapping is read only, adding a product copies the columns"""
+        path = tmp_path / "catalogue.snap"
+        write_catalogue_snapshot(Catalogue(basic_products), path)
+        catalogue = open_catalogue_snapshot(path)
+        catalogue.add_product(shampoo_small)
+        assert catalogue.fetch_product(shampoo_small.sku) == shampoo_small
+        assert len(open_catalogue_snapshot(path)) == len(basic_products)
+
+    def test_bad_files_rejected(self, tmp_path, basic_products: list[Product]):
+        """Foreign, newer format and truncated files are refused"""
+        path = tmp_path / "catalogue.snap"
+        path.write_bytes(b"sku,name,price\n")
+        with pytest.raises(CatalogueError):
+            open_catalogue_snapshot(path)
+        write_catalogue_snapshot(Catalogue(basic_products), path)
+        data = path.read_bytes()
+        path.write_bytes(data[:8] + b"\x63" + data[9:])
+        with pytest.raises(CatalogueError):
+            open_catalogue_snapshot(path)
+        path.write_bytes(data[:-8])
+        with pytest.raises(CatalogueError):
+            open_catalogue_snapshot(path)
+        with pytest.raises(CatalogueError):
+            load_snapshot_offers(Catalogue(basic_products))
+
+
+class TestPriceHistory:
+    """Tests for prices at an earlier time."""
+
+    CHANGES = (
+        "sku,effective_from,price\n"
+        "1,2024-03-01T00:00:00,0.89\n"
+        "1,2024-01-01T00:00:00,0.79\n"
+        "9,2024-01-01T00:00:00,2.50\n"
+    )
+
+    def test_fetch_price_at(self, basic_products: list[Product]):
+        """The change in force at the moment is found, others keep today's price"""
+        catalogue = Catalogue(basic_products)
+        version = catalogue.version
+        catalogue.set_price_history(PriceHistory.load(io.StringIO(self.CHANGES)))
+        assert catalogue.version != version
+        assert catalogue.fetch_price(1, at="2024-02-10T12:00:00") == Money("0.79")
+        assert catalogue.fetch_price(1, at="2024-03-01T00:00:00") == Money("0.89")
+        assert catalogue.fetch_price(1) == Money("0.99")
+        assert catalogue.fetch_price(2, at="2024-02-10T12:00:00") == Money("1.20")
+        # no longer sold, still priced from its history
+        assert catalogue.fetch_price(9, at="2024-02-10T12:00:00") == Money("2.50")
+        with pytest.raises(CatalogueError):
+            catalogue.fetch_price(1, at="2023-12-31T23:59:59")
+        changed = catalogue.with_changes(prices={1: "1.09"})
+        assert changed.fetch_price(1, at="2024-02-10T12:00:00") == Money("0.79")
+
+    def test_load_and_add_changes(self):
+        """Bad rows are reported together, changes can arrive out of order"""
+        with pytest.raises(CatalogueLoadError) as error:
+            PriceHistory.load(
+                io.StringIO(
+                    '{"sku": 1, "effective_from": 0, "price": "0.99"}\n'
+                    "[1]\n"
+                    '{"sku": 1, "effective_from": "yesterday", "price": "0.99"}\n'
+                    '{"sku": 1, "price": "0.99"}\n'
+                    '{"sku": 1,\n'
+                ),
+                format="jsonl",
+            )
+        assert [line for line, _ in error.value.errors] == [2, 3, 4, 5]
+        assert "expected a JSON object" in error.value.errors[0][1]
+        assert "invalid JSON" in error.value.errors[3][1]
+
+        history = PriceHistory()
+        history.add_change(1, 200, "0.50")
+        history.add_change(1, 100, "0.40")
+        history.add_change(1, 200, "0.60")
+        assert history.price_at(1, 150) == Money("0.40")
+        assert history.price_at(1, 250) == Money("0.60")
+        assert history.price_at(1, 50) is None
+
+    @pytest.mark.skipif(not hasattr(time, "tzset"), reason="needs time.tzset")
+    @pytest.mark.parametrize("zone", ["UTC", "America/New_York", "Asia/Kolkata"])
+    def test_times_without_offset_are_utc(self, monkeypatch, zone):
+        """The same receipt time means the same moment on every machine"""
+        monkeypatch.setenv("TZ", zone)
+        time.tzset()
+        try:
+            assert to_timestamp("2024-01-01T00:00:00") == 1_704_067_200
+            assert to_timestamp(datetime(2024, 1, 1)) == 1_704_067_200
+            assert to_timestamp("2024-01-01T05:30:00+05:30") == 1_704_067_200
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+
+    def test_prices_at_is_a_mapping(self):
+        """A sku with no price yet is missing from the view, not an error
+        from get or in"""
+        history = PriceHistory()
+        history.add_change(1, 100, "0.40")
+        prices = history.prices_at(50, {1: Money("0.99"), 2: Money("1.20")})
+        assert prices.get(1) is None and prices.get(1, Money("0.10")) == Money("0.10")
+        assert 1 not in prices and 2 in prices
+        assert dict(prices) == {2: Money("1.20")}
+        with pytest.raises(CatalogueError, match="1970-01-01T00:00:50"):
+            prices[1]
+        with pytest.raises(KeyError):
+            prices[3]
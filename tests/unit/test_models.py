@@ -1,7 +1,14 @@
 import pytest
 
-from src.basket_pricer.models import Basket, BasketItem, Money, Product
-from src.basket_pricer.utils.exceptions import PricerException
+from src.basket_pricer.models import (
+    Basket,
+    BasketItem,
+    Catalogue,
+    CompactBasket,
+    Money,
+    Product,
+)
+from src.basket_pricer.utils.exceptions import InvalidBasketError, PricerException
 
 
 class TestProduct:
@@ -186,3 +193,70 @@ class TestBasket:
         """Test has_item returns False for items not in basket."""
         basket = Basket()
         assert not basket.has_product(sku=0)
+
+    def test_set_quantity_updates_line(self, basket_item1) -> None:
+        """set_quantity replaces the quantity and 0 removes the line"""
+        basket = Basket([basket_item1])
+        basket.set_quantity(sku=1, qty=5)
+        assert basket.fetch_quantity(sku=1) == 5
+        basket.set_quantity(sku=1, qty=0)
+        assert not basket.has_product(sku=1)
+
+    def test_remove_item(self, basket_item1, basket_item3) -> None:
+        """remove_item takes away some units or the whole line"""
+        basket = Basket([basket_item1, basket_item3])
+        basket.remove_item(sku=3, qty=2)
+        assert basket.fetch_quantity(sku=3) == 1
+        basket.remove_item(sku=1)
+        assert not basket.has_product(sku=1)
+        with pytest.raises(ValueError):
+            basket.remove_item(sku=3, qty=2)
+
+    def test_missing_sku_raises_error(self) -> None:
+        """Changing a sku that is not in the basket is rejected"""
+        basket = Basket()
+        with pytest.raises(InvalidBasketError):
+            basket.set_quantity(sku=1, qty=1)
+        with pytest.raises(InvalidBasketError):
+            basket.remove_item(sku=1)
+
+    def test_changed_skus_are_tracked(self, basket_item1, basket_item2) -> None:
+        """Every mutation records its sku until the changes are popped"""
+        basket = Basket([basket_item1])
+        assert basket.pop_changed_skus() == {1}
+        basket.add_item(basket_item2)
+        basket.set_quantity(sku=1, qty=4)
+        basket.set_quantity(sku=1, qty=4)  # no change, still tracked once
+        assert basket.changed_skus() == {1, 2}
+        assert basket.pop_changed_skus() == {1, 2}
+        assert basket.changed_skus() == frozenset()
+
+
+class TestCompactBasket:
+    """Tests for the array-backed basket."""
+
+    def test_round_trip_with_basket(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue
+    ):
+        """Converts to and from Basket with the same contents"""
+        compact = CompactBasket.from_basket(basket_with_mixed_items)
+        assert len(compact) == 2
+        assert compact.fingerprint() == basket_with_mixed_items.fingerprint()
+        basket = compact.to_basket(basic_catalogue)
+        assert basket.fingerprint() == basket_with_mixed_items.fingerprint()
+        assert basket.fetch_product(1).name == "Baked Beans"
+
+    def test_lines_merged_and_validated(self):
+        """Repeated skus are merged, bad quantities rejected"""
+        compact = CompactBasket.from_lines([(1, 2), (3, 1), (1, 1)])
+        assert list(compact.items()) == [(1, 3), (3, 1)]
+        assert compact.fetch_quantity(1) == 3 and compact.has_product(3)
+        assert CompactBasket().is_empty()
+        with pytest.raises(ValueError):
+            CompactBasket([1], [0])
+        with pytest.raises(ValueError):
+            CompactBasket([1], [-2])
+        with pytest.raises(ValueError, match="at most"):
+            CompactBasket.from_lines([(1, 2), (1, 2**32 - 1)])
+        with pytest.raises(InvalidBasketError):
+            CompactBasket([1, 2], [1])
@@ -1,8 +1,10 @@
-from decimal import Decimal
+import pickle
+import random
+from decimal import ROUND_HALF_UP, Decimal
 
 import pytest
 
-from src.basket_pricer.models.money import Money
+from src.basket_pricer.models.money import Money, MoneyAccumulator
 
 
 @pytest.mark.parametrize(
@@ -46,3 +48,128 @@ def test_none_raises_error() -> None:
     """Validate if None is rejected."""
     with pytest.raises(ValueError):
         Money(None)
+
+
+def _decimal_reference(amount: Decimal) -> Decimal:
+    """Rounding used by the original Decimal backed Money"""
+    return amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_minor_unit_arithmetic_matches_decimal(seed):
+    """Integer minor-unit arithmetic gives the same results as Decimal arithmetic"""
+    rng = random.Random(seed)
+    for _ in range(200):
+        a = Decimal(rng.randint(0, 100_000)) / 100
+        b = Decimal(rng.randint(0, 100_000)) / 100
+        qty = rng.randint(0, 50)
+        rate = Decimal(str(rng.choice([0.1, 0.2, 0.25, 0.333, 12.5, 0.07])))
+        assert (Money(a) + Money(b)).amount == _decimal_reference(a + b)
+        assert (Money(a) * qty).amount == _decimal_reference(a * qty)
+        assert (Money(a) * rate).amount == _decimal_reference(a * rate)
+        assert (Money(a) * float(rate)).amount == _decimal_reference(a * rate)
+        if a >= b:
+            assert (Money(a) - Money(b)).amount == _decimal_reference(a - b)
+
+
+def test_minor_units_round_trip():
+    """Money can be built from, and exposes, integer pence"""
+    money = Money("12.34")
+    assert money.minor_units == 1234
+    assert Money.from_minor_units(1234) == money
+    assert Money.from_minor_units(0).is_zero()
+
+
+def test_from_minor_units_rejects_invalid_values():
+    """Negative or non integer minor units are rejected"""
+    with pytest.raises(ValueError, match="cannot be negative"):
+        Money.from_minor_units(-1)
+    with pytest.raises(TypeError):
+        Money.from_minor_units(1.5)
+
+
+def test_negative_subtraction_raises_error():
+    """Subtracting a bigger amount raises the same error as before"""
+    with pytest.raises(ValueError, match="Money -1.00 cannot be negative."):
+        Money("1.00") - Money("2.00")
+
+
+def test_money_is_immutable():
+    """Money cannot be changed after creation"""
+    money = Money("1.00")
+    with pytest.raises(AttributeError):
+        money._minor = 5
+    with pytest.raises(AttributeError):
+        money.extra = 1
+
+
+def test_money_is_hashable():
+    """Equal amounts hash equally and can be used as dict keys"""
+    prices = {Money("0.99"): "beans", Money("1.20"): "biscuits"}
+    assert prices[Money(Decimal("0.990"))] == "beans"
+    assert len({Money("1"), Money("1.00"), Money(1)}) == 1
+
+
+def test_money_ordering():
+    """Money supports the full set of ordering operators"""
+    low, high = Money("1.00"), Money("2.00")
+    assert low < high and low <= high and high > low and high >= low
+    assert low <= Money("1.00") and low >= Money("1.00")
+    assert sorted([high, low]) == [low, high]
+    assert Money("1.00") != "1.00"
+    with pytest.raises(TypeError):
+        low < 1
+
+
+def test_money_repr():
+    """repr shows the exact amount"""
+    assert repr(Money("2.5")) == "Money('2.50')"
+
+
+def test_zero_and_small_amounts_are_interned():
+    """Common amounts are shared instead of reallocated"""
+    assert Money.zero() is Money.zero()
+    assert Money("0") is Money.zero()
+    assert Money("0.99") is Money("0.99")
+    assert Money("0.50") + Money("0.49") is Money("0.99")
+
+
+def test_intern_large_amount():
+    """Catalogue prices outside the automatic range can be interned explicitly"""
+    price = Money.intern(Money("1234.56"))
+    assert Money.intern(Money("1234.56")) is price
+
+
+def test_money_pickle_round_trip():
+    """Money survives pickling, e.g. for shipping to worker processes"""
+    money = Money("12345.67")
+    assert pickle.loads(pickle.dumps(money)) == money
+
+
+class TestMoneyAccumulator:
+    """Tests for summing Money without intermediate objects"""
+
+    def test_accumulates_amounts_and_quantities(self):
+        """add and add_times produce the same total as Money arithmetic"""
+        accumulator = MoneyAccumulator()
+        accumulator.add(Money("0.99")).add_times(Money("1.20"), 3)
+        accumulator += Money("0.01")
+        assert accumulator.total() == Money("0.99") + Money("1.20") * 3 + Money("0.01")
+        assert accumulator.minor_units == 460
+
+    def test_empty_accumulator_is_zero(self):
+        """No additions gives zero"""
+        assert MoneyAccumulator().total() is Money.zero()
+
+    def test_rejects_non_money(self):
+        """Only Money can be accumulated"""
+        with pytest.raises(TypeError):
+            MoneyAccumulator().add(Decimal("1.00"))
+        with pytest.raises(ValueError):
+            MoneyAccumulator().add_times(Money("1.00"), -1)
+
+    def test_money_sum(self):
+        """Money.sum adds an iterable of amounts"""
+        amounts = [Money("0.10")] * 1000
+        assert Money.sum(amounts) == Money("100.00")
+        assert Money.sum([]) == Money.zero()
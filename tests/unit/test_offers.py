@@ -1,4 +1,52 @@
-from src.basket_pricer.models import Basket, Money
+import itertools
+import json
+import os
+import pickle
+import random
+import threading
+from decimal import Decimal
+
+import pytest
+
+import src.basket_pricer.offers.offer_loader as offer_loader_module
+from src.basket_pricer.models import (
+    Basket,
+    BasketItem,
+    CompactBasket,
+    Money,
+    Product,
+)
+from src.basket_pricer.offers import (
+    AbstractBaseOffer,
+    BundleOffer,
+    BuyXGetCheapestFreeOffer,
+    BuyXgetYfree,
+    PercentageOffer,
+    SpendThresholdOffer,
+    TieredQuantityOffer,
+)
+from src.basket_pricer.offers.base_offer import PricedLine
+from src.basket_pricer.offers.offer_allocator import OfferAllocator
+from src.basket_pricer.offers.offer_compiler import (
+    MAX_DOMINANCE_CHECKS,
+    compile_offers,
+)
+from src.basket_pricer.offers.offer_index import OfferIndex
+from src.basket_pricer.offers.offer_kernels import HAVE_NUMPY, BasketColumns
+from src.basket_pricer.offers.offer_loader import OfferFileWatcher, load_offers
+from src.basket_pricer.offers.offer_registry import (
+    OFFER_TYPES,
+    offer_from_record,
+    register_offer_type,
+)
+from src.basket_pricer.offers.offer_schedule import OfferSchedule, SegmentMemo
+from src.basket_pricer.offers.offer_set import OfferSet
+from src.basket_pricer.offers.offers_factory import OffersFactory
+from src.basket_pricer.utils.exceptions import (
+    InvalidBasketError,
+    InvalidOfferConfigError,
+    OfferLoadError,
+)
 
 
 class TestBuyXGetYFreeOffer:
@@ -76,3 +124,1126 @@ class TestBuyXGetCheapestFreeOffer:
         assert not shampoo_buy_3_cheapest_free.is_applicable(
             basket_with_shampoo_small_qty2
         )
+
+    def test_matches_unit_by_unit_grouping(self):
+        """Closed form discount matches expanding and grouping every unit"""
+        rng = random.Random(7)
+        for _ in range(200):
+            quantity = rng.randint(2, 5)
+            products = [
+                Product(sku=sku, name=f"P{sku}", price=rng.randint(1, 500) / 100)
+                for sku in range(1, rng.randint(4, 8))
+            ]
+            offer = BuyXGetCheapestFreeOffer(
+                id="cheapest",
+                name="Cheapest free",
+                product_skus=[p.sku for p in products[:-1]],
+                quantity=quantity,
+            )
+            basket = Basket(
+                [BasketItem(product=p, qty=rng.randint(1, 9)) for p in products]
+            )
+
+            units = sorted(
+                (
+                    item.product.price
+                    for sku, item in basket.get_items_list().items()
+                    if sku in offer.product_skus
+                    for _ in range(item.qty)
+                ),
+                reverse=True,
+            )
+            expected = Money.sum(units[quantity - 1 :: quantity])
+            assert offer.calculate_discount(basket) == expected
+
+    def test_large_quantities(self, shampoo_buy_3_cheapest_free, shampoo_products):
+        """Quantities do not change the cost, 50,000 units are priced directly"""
+        small, medium, large = shampoo_products
+        basket = Basket(
+            [
+                BasketItem(product=small, qty=20_000),
+                BasketItem(product=medium, qty=15_000),
+                BasketItem(product=large, qty=15_000),
+            ]
+        )
+        # 16,666 groups: large free in 5,000, medium in 5,000, small in 6,666
+        expected = Money.sum(
+            [Money("3.50") * 5_000, Money("2.50") * 5_000, Money("2.00") * 6_666]
+        )
+        assert shampoo_buy_3_cheapest_free.calculate_discount(basket) == expected
+
+
+class TestSpendThresholdOffer:
+    """Tests for spend X save Y offers over a group of skus"""
+
+    def test_highest_threshold_reached(
+        self, shampoo_spend_save, basket_with_shampoo_scenario: Basket
+    ):
+        """£17.00 of shampoo reaches the £15 tier"""
+        evaluation = shampoo_spend_save.evaluate(basket_with_shampoo_scenario)
+        assert evaluation.applicable
+        assert evaluation.discount == Money("3.00")
+        assert sorted(evaluation.affected_items) == [
+            "Shampoo (Large)",
+            "Shampoo (Medium)",
+            "Shampoo (Small)",
+        ]
+
+    @pytest.mark.parametrize(
+        "spend, saving", [("9.99", 0), ("10.00", 100), ("14.99", 100), ("15", 300)]
+    )
+    def test_threshold_edges(self, shampoo_spend_save, spend, saving):
+        assert shampoo_spend_save.saving_for(Money(spend).minor_units) == saving
+
+    def test_not_applicable_below_threshold(
+        self, shampoo_spend_save, basket_with_shampoo_small_qty2: Basket
+    ):
+        assert not shampoo_spend_save.is_applicable(basket_with_shampoo_small_qty2)
+
+    def test_units_priced_like_basket(
+        self, shampoo_spend_save, basket_with_shampoo_scenario: Basket
+    ):
+        units = priced_lines(
+            (4, 2, "2.00"), (5, 1, "2.50"), (6, 3, "3.50"), (1, 4, "9")
+        )
+        discount, used = shampoo_spend_save.discount_for_units(units)
+        assert discount == shampoo_spend_save.calculate_discount(
+            basket_with_shampoo_scenario
+        )
+        assert used == {4: 2, 5: 1, 6: 3}
+
+    @pytest.mark.parametrize(
+        "thresholds, savings",
+        [([], []), (["10"], []), (["10", "5"], ["1", "2"]), (["5"], ["6"])]
+        + [(["5", "10"], ["2", "1"]), (["ten"], ["1"])],
+    )
+    def test_bad_tiers_rejected(self, thresholds, savings):
+        with pytest.raises(InvalidOfferConfigError):
+            SpendThresholdOffer(
+                id="s",
+                name="S",
+                product_skus=[1],
+                thresholds=thresholds,
+                savings=savings,
+            )
+
+    def test_never_dominates(self, shampoo_spend_save):
+        """A weaker offer can still save on units split off from the stronger"""
+        weaker = SpendThresholdOffer(
+            id="w", name="W", product_skus=[4, 5], thresholds=["12"], savings=["1"]
+        )
+        assert not shampoo_spend_save.dominates(weaker)
+        assert compile_offers([shampoo_spend_save, weaker]).offers == (
+            shampoo_spend_save,
+            weaker,
+        )
+
+    def test_split_between_threshold_offers(self):
+        """Each offer reaches its threshold on units of its own"""
+        offers = [
+            SpendThresholdOffer(
+                id="a", name="A", product_skus=[1, 2], thresholds=["20"], savings=["3"]
+            ),
+            SpendThresholdOffer(
+                id="b", name="B", product_skus=[1, 2], thresholds=["20"], savings=["2"]
+            ),
+        ]
+        lines = priced_lines((1, 1, "20.00"), (2, 1, "20.00"))
+        best = OfferAllocator(time_budget=None).allocate(list(enumerate(offers)), lines)
+        assert Money.sum(a.discount for a in best) == Money("5.00")
+
+    def test_part_of_a_sku_reaches_threshold(self):
+        """Only the units the threshold needs are taken, the rest go elsewhere"""
+        offers = [
+            SpendThresholdOffer(
+                id="s", name="S", product_skus=[1, 2], thresholds=["4"], savings=["1"]
+            ),
+            PercentageOffer(id="p", name="P", sku=1, percentage=50),
+        ]
+        lines = priced_lines((1, 3, "2.00"), (2, 1, "2.00"))
+        best = OfferAllocator(time_budget=None).allocate(list(enumerate(offers)), lines)
+        # one sku 1 unit and sku 2 reach £4, 50% off the other two sku 1 units
+        assert Money.sum(a.discount for a in best) == Money("3.00")
+
+
+class TestTieredQuantityOffer:
+    """Tests for buy more save more offers over a group of skus"""
+
+    def test_rate_of_units_bought(
+        self, shampoo_tiered, basket_with_shampoo_scenario: Basket
+    ):
+        """Six shampoos reach the 20% tier, taken off all £17.00"""
+        assert shampoo_tiered.calculate_discount(basket_with_shampoo_scenario) == (
+            Money("3.40")
+        )
+
+    def test_lower_tier(self, shampoo_tiered, basket_with_shampoo_small_qty2: Basket):
+        assert shampoo_tiered.calculate_discount(
+            basket_with_shampoo_small_qty2
+        ) == Money("0.40")
+
+    def test_not_applicable_below_first_tier(self, shampoo_tiered, shampoo_large):
+        basket = Basket([BasketItem(product=shampoo_large, qty=1)])
+        assert not shampoo_tiered.is_applicable(basket)
+        assert shampoo_tiered.discount_for_units(priced_lines((6, 1, "3.50"))) == (
+            Money.zero(),
+            {},
+        )
+
+    @pytest.mark.parametrize(
+        "quantities, percentages",
+        [([2], []), ([0], [10]), ([3, 2], [10, 20]), ([2, 3], [20, 10]), ([2], [120])],
+    )
+    def test_bad_tiers_rejected(self, quantities, percentages):
+        with pytest.raises(InvalidOfferConfigError):
+            TieredQuantityOffer(
+                id="t",
+                name="T",
+                product_skus=[1],
+                quantities=quantities,
+                percentages=percentages,
+            )
+
+    def test_weaker_tiers_dropped(self, shampoo_tiered):
+        weaker = TieredQuantityOffer(
+            id="w", name="W", product_skus=[4], quantities=[3], percentages=[15]
+        )
+        stronger_later = TieredQuantityOffer(
+            id="s", name="S", product_skus=[4], quantities=[4], percentages=[50]
+        )
+        compiled = compile_offers([shampoo_tiered, weaker, stronger_later])
+        assert compiled.offers == (shampoo_tiered, stronger_later)
+
+
+def best_bundles_by_search(slots, price, lines):
+    """Best saving in minor units by trying every way to form the bundles"""
+    skus = sorted(lines)
+    prices = [lines[sku].unit_price.minor_units for sku in skus]
+    memo = {}
+
+    def bundles(left):
+        if left not in memo:
+            memo[left] = max(0, fill(left, 0, 0))  # stop, or form one more
+        return memo[left]
+
+    def fill(left, slot, value):
+        if slot == len(slots):
+            return value - price + bundles(left)
+        best = -(10**9)
+        for position, sku in enumerate(skus):
+            if left[position] and sku in slots[slot]:
+                remaining = (
+                    left[:position] + (left[position] - 1,) + left[position + 1 :]
+                )
+                best = max(best, fill(remaining, slot + 1, value + prices[position]))
+        return best
+
+    return bundles(tuple(lines[sku].qty for sku in skus))
+
+
+class TestBundleOffer:
+    """Tests for fixed price bundles of one sku from each slot"""
+
+    def test_one_bundle(
+        self, meal_deal, basket_with_mixed_items: Basket, basket_item2: BasketItem
+    ):
+        """Sardines, biscuits and beans for £3.00 instead of £4.08"""
+        basket_with_mixed_items.add_item(basket_item2)
+        evaluation = meal_deal.evaluate(basket_with_mixed_items)
+        assert evaluation.applicable
+        assert evaluation.discount == Money("1.08")
+
+    def test_dearest_units_go_into_bundles(self, meal_deal):
+        lines = priced_lines(
+            (1, 3, "0.99"), (2, 2, "1.20"), (3, 1, "1.89"), (6, 2, "3.50")
+        )
+        discount, used = meal_deal.discount_for_units(lines)
+        # two bundles with both large shampoos, the sardines stay out
+        assert discount == Money("5.38")
+        assert used == {6: 2, 2: 2, 1: 2}
+
+    def test_no_saving_when_items_are_cheap(self):
+        offer = BundleOffer(id="b", name="B", slots=[[1], [2]], price="2.50")
+        lines = priced_lines((1, 4, "0.99"), (2, 4, "1.20"))
+        assert offer.discount_for_units(lines) == (Money.zero(), {})
+        assert offer.allocation_options(lines) == []
+
+    def test_incomplete_bundle_not_applicable(self, meal_deal, shampoo_large):
+        basket = Basket([BasketItem(product=shampoo_large, qty=3)])
+        assert not meal_deal.is_applicable(basket)
+
+    def test_sku_in_several_slots(self):
+        """A unit fills whichever slot leaves the others fillable"""
+        offer = BundleOffer(id="b", name="B", slots=[[1, 2], [2]], price="1.00")
+        lines = priced_lines((1, 1, "0.50"), (2, 2, "2.00"))
+        # both sku 2 units form one bundle, sku 1 cannot fill the second slot
+        assert offer.discount_for_units(lines) == (Money("3.00"), {2: 2})
+
+    def test_matches_search_over_every_bundle(self):
+        rng = random.Random(25)
+        for _ in range(150):
+            slot_count = rng.randint(1, 3)
+            skus = list(range(1, rng.randint(2, 5) + 1))
+            slots = [
+                rng.sample(skus, rng.randint(1, len(skus))) for _ in range(slot_count)
+            ]
+            price = rng.randint(50, 400)
+            lines = {
+                sku: PricedLine(
+                    sku,
+                    rng.randint(1, 3),
+                    Money.from_minor_units(rng.randint(10, 250)),
+                    "",
+                )
+                for sku in skus
+            }
+            offer = BundleOffer(
+                id="b", name="B", slots=slots, price=Money.from_minor_units(price)
+            )
+            discount, used = offer.discount_for_units(lines)
+            assert discount.minor_units == best_bundles_by_search(slots, price, lines)
+            assert all(used[sku] <= lines[sku].qty for sku in used)
+
+    def test_options_give_up_whole_bundles(self, meal_deal):
+        """The dearest fill of every bundle count comes first, then other
+        units, none of them seen twice"""
+        lines = priced_lines((1, 2, "0.99"), (2, 2, "1.20"), (6, 2, "3.50"))
+        options = meal_deal.allocation_options(lines)
+        assert options[:2] == [{6: 2, 2: 2, 1: 2}, {6: 1, 2: 1, 1: 1}]
+        assert len({tuple(sorted(option.items())) for option in options}) == len(
+            options
+        )
+        assert all(qty <= lines[sku].qty for o in options for sku, qty in o.items())
+
+    def test_options_hold_back_units_of_a_sku(self):
+        """A main kept back from two bundles is replaced by the snack"""
+        offer = BundleOffer(id="m", name="Meal", slots=[[2], [1, 3]], price="2.00")
+        lines = priced_lines((1, 3, "3.70"), (2, 2, "0.68"), (3, 1, "2.42"))
+        options = offer.allocation_options(lines)
+        assert options[0] == {1: 2, 2: 2}
+        assert {1: 1, 2: 2, 3: 1} in options
+
+    @pytest.mark.parametrize(
+        "slots, price",
+        [
+            ([], "3.00"),
+            ([[1], []], "3.00"),
+            ([[1, 1]], "3.00"),
+            ([[1]], "0"),
+            ([[1]], "abc"),
+            ([[sku] for sku in range(9)], "3.00"),
+        ],
+    )
+    def test_bad_config_rejected(self, slots, price):
+        with pytest.raises(InvalidOfferConfigError):
+            BundleOffer(id="b", name="B", slots=slots, price=price)
+
+    def test_dearer_bundle_dropped(self, meal_deal):
+        dearer = BundleOffer(id="d", name="D", slots=[[1], [6, 3], [2]], price="3.50")
+        compiled = compile_offers([dearer, meal_deal])
+        assert compiled.offers == (meal_deal,)
+
+
+class SkuDiscountOffer(AbstractBaseOffer):
+    """Offer written against the three-call interface only"""
+
+    def __init__(self, sku: int, amount: str):
+        super().__init__(id=f"fixed-{sku}", name=f"Fixed off {sku}")
+        self.sku = sku
+        self.amount = Money(amount)
+
+    def is_applicable(self, basket: Basket):
+        return basket.has_product(self.sku)
+
+    def calculate_discount(self, basket: Basket) -> Money:
+        return self.amount
+
+
+class TestOfferEvaluation:
+    """Tests for the single pass evaluation of offers."""
+
+    def test_matches_separate_calls(
+        self,
+        beans_buy_2_get_1_free,
+        sardines_25_percent_off,
+        shampoo_buy_3_cheapest_free,
+        basket_with_beans,
+        basket_with_sardiness_qty3,
+        basket_with_shampoo_scenario,
+        basket_with_shampoo_small_qty2,
+    ):
+        offers = [
+            beans_buy_2_get_1_free,
+            sardines_25_percent_off,
+            shampoo_buy_3_cheapest_free,
+        ]
+        baskets = [
+            basket_with_beans,
+            basket_with_sardiness_qty3,
+            basket_with_shampoo_scenario,
+            basket_with_shampoo_small_qty2,
+        ]
+        for offer in offers:
+            for basket in baskets:
+                evaluation = offer.evaluate(basket)
+                assert evaluation.applicable == offer.is_applicable(basket)
+                assert evaluation.discount == offer.calculate_discount(basket)
+                if evaluation.applicable:
+                    assert evaluation.affected_items == offer._get_affected_items(
+                        basket
+                    )
+
+    def test_three_call_offers_still_work(self, basket_with_beans):
+        offer = SkuDiscountOffer(sku=1, amount="0.10")
+        assert offer.apply_to_basket(basket_with_beans) == (
+            Money("0.10"),
+            ["Baked Beans"],
+        )
+        assert offer.apply_to_basket(Basket()) is None
+        assert offer.scope_skus() == frozenset([1])
+
+
+class TestOfferCompiler:
+    """Tests for dropping dominated offers."""
+
+    def test_smaller_percentage_dropped(self):
+        ten = PercentageOffer(id="p10", name="10% Off", sku=5, percentage=10)
+        twenty = PercentageOffer(id="p20", name="20% Off", sku=5, percentage=20)
+        twenty_again = PercentageOffer(id="p20b", name="20% Off", sku=5, percentage=20)
+        other_sku = PercentageOffer(id="p5", name="5% Off", sku=6, percentage=5)
+        compiled = compile_offers([ten, twenty, twenty_again, other_sku])
+        assert compiled.offers == (twenty, other_sku)
+        assert [(d.offer, d.dominated_by) for d in compiled.dropped] == [
+            (ten, twenty),
+            (twenty_again, twenty),
+        ]
+
+    def test_only_offers_that_never_win_are_dropped(self):
+        b2g1 = BuyXgetYfree(id="b2g1", name="Buy 2 get 1", sku=1, buy=2, free=1)
+        b2g2 = BuyXgetYfree(id="b2g2", name="Buy 2 get 2", sku=1, buy=2, free=2)
+        b3g1 = BuyXgetYfree(id="b3g1", name="Buy 3 get 1", sku=1, buy=3, free=1)
+        third_off = PercentageOffer(id="p34", name="34% Off", sku=1, percentage=34)
+        # 3 units: buy 2 get 1 frees one, buy 2 get 2 none, so both are kept
+        assert compile_offers([b2g1, b2g2]).offers == (b2g1, b2g2)
+        # buy 3 get 1 frees one in four, buy 2 get 2 two in four
+        assert compile_offers([b3g1, b2g2]).offers == (b2g2,)
+        # a third of every unit off beats one free in three
+        assert compile_offers([b2g1, third_off]).offers == (third_off,)
+
+    def test_dominating_offer_never_gives_less(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            sku_offers = [
+                BuyXgetYfree(
+                    id="a",
+                    name="a",
+                    sku=1,
+                    buy=rng.randint(1, 4),
+                    free=rng.randint(1, 3),
+                ),
+                PercentageOffer(id="b", name="b", sku=1, percentage=rng.randint(1, 60)),
+            ]
+            cheapest_offers = [
+                BuyXGetCheapestFreeOffer(
+                    id="c",
+                    name="c",
+                    product_skus=rng.sample(range(1, 6), rng.randint(2, 5)),
+                    quantity=rng.randint(1, 4),
+                )
+                for _ in range(2)
+            ]
+            prices = {sku: Money(rng.randint(1, 500) / 100) for sku in range(1, 6)}
+            units = {
+                sku: PricedLine(sku, rng.randint(1, 12), prices[sku], f"P{sku}")
+                for sku in range(1, 6)
+            }
+            for offers in (sku_offers + [sku_offers[0]], cheapest_offers):
+                first, second = rng.sample(offers, 2)
+                if first.dominates(second):
+                    assert (
+                        first.discount_for_units(units)[0]
+                        >= second.discount_for_units(units)[0]
+                    )
+
+    def test_matches_comparing_every_pair(self):
+        """With few offers per sku the pruning drops exactly the offers some
+        other offer beats, the first of two equal offers kept"""
+        rng = random.Random(7)
+        for _ in range(200):
+            offers = []
+            for number in range(rng.randint(2, 10)):
+                window = rng.choice(
+                    [{}, {"starts_at": 0, "ends_at": rng.randint(1, 3)}]
+                )
+                if rng.random() < 0.5:
+                    offer = PercentageOffer(
+                        id=f"p{number}",
+                        name="P",
+                        sku=rng.randint(1, 2),
+                        percentage=rng.choice([10, 20, 34, 50]),
+                        **window,
+                    )
+                else:
+                    offer = BuyXgetYfree(
+                        id=f"b{number}",
+                        name="B",
+                        sku=rng.randint(1, 2),
+                        buy=rng.randint(1, 3),
+                        free=rng.randint(1, 2),
+                        **window,
+                    )
+                offers.append(offer)
+
+            def beats(rival, offer):
+                return rival.dominates(offer) and rival.live_throughout(offer)
+
+            expected = tuple(
+                offer
+                for position, offer in enumerate(offers)
+                if not any(
+                    beats(rival, offer)
+                    and not (rival_position > position and beats(offer, rival))
+                    for rival_position, rival in enumerate(offers)
+                    if rival_position != position
+                )
+            )
+            assert compile_offers(offers).offers == expected
+
+    def test_many_offers_on_one_sku_compare_few(self, monkeypatch):
+        """Offers that never replace each other, here each live for a week of
+        its own, are compared with a bounded number of the others"""
+        calls = []
+        dominates = PercentageOffer.dominates
+
+        def counted(self, other):
+            calls.append(other)
+            return dominates(self, other)
+
+        monkeypatch.setattr(PercentageOffer, "dominates", counted)
+        offers = [
+            PercentageOffer(
+                id=f"w{week}",
+                name="W",
+                sku=1,
+                percentage=10 + week % 50,
+                starts_at=week * 7,
+                ends_at=week * 7 + 7,
+            )
+            for week in range(2_000)
+        ]
+        assert len(compile_offers(offers).offers) == 2_000
+        assert len(calls) <= 2 * len(offers) * MAX_DOMINANCE_CHECKS
+
+
+class TestBatchKernels:
+    """Tests for pricing many baskets at once from columns."""
+
+    @pytest.mark.parametrize(
+        "use_numpy",
+        [
+            False,
+            pytest.param(
+                True,
+                marks=pytest.mark.skipif(not HAVE_NUMPY, reason="NumPy not installed"),
+            ),
+        ],
+    )
+    def test_kernels_match_scalar_path(self, use_numpy):
+        rng = random.Random(11)
+        products = [
+            Product(sku=sku, name=f"P{sku}", price=rng.randint(1, 5_000) / 100)
+            for sku in range(1, 9)
+        ]
+        baskets = [
+            Basket(
+                [
+                    BasketItem(product=product, qty=rng.randint(1, 12))
+                    for product in rng.sample(products, rng.randint(1, 6))
+                ]
+            )
+            for _ in range(300)
+        ]
+        offers = [
+            PercentageOffer(id="p", name="12.5% off", sku=2, percentage=12.5),
+            PercentageOffer(id="q", name="A third off", sku=3, percentage=33.333),
+            BuyXgetYfree(id="b", name="Buy 2 get 1", sku=2, buy=2, free=1),
+            BuyXGetCheapestFreeOffer(
+                id="c", name="Cheapest free", product_skus=[1, 2, 4, 6], quantity=3
+            ),
+            SkuDiscountOffer(sku=5, amount="0.30"),  # no kernel of its own
+        ]
+        columns = BasketColumns.from_baskets(baskets, use_numpy=use_numpy)
+        assert columns.uses_numpy == use_numpy
+        for offer in offers:
+            expected = [
+                (
+                    offer.calculate_discount(basket).minor_units
+                    if offer.is_applicable(basket)
+                    else 0
+                )
+                for basket in baskets
+            ]
+            assert [int(d) for d in offer.batch_discounts(columns)] == expected
+
+    def test_columns_merge_repeated_skus(self):
+        columns = BasketColumns(
+            ["a", "a", "a", "b"], [1, 2, 1, 1], [1, 1, 2, 3], [100, 250, 100, 100]
+        )
+        assert columns.basket_ids == ["a", "b"]
+        offer = BuyXgetYfree(id="b", name="Buy 2 get 1", sku=1, buy=2, free=1)
+        assert [int(d) for d in offer.batch_discounts(columns)] == [100, 100]
+        compact = BasketColumns.from_baskets(
+            [("x", CompactBasket([1, 2], [3, 1]))],
+            prices={1: Money("1.00"), 2: Money("2.50")},
+        )
+        assert [int(d) for d in offer.batch_discounts(compact)] == [100]
+
+    def test_baskets_must_be_contiguous(self):
+        with pytest.raises(InvalidBasketError):
+            BasketColumns(["a", "b", "a"], [1, 1, 2], [1, 1, 1], [100, 100, 100])
+        with pytest.raises(InvalidBasketError):
+            BasketColumns(["a"], [1, 2], [1, 1], [100, 100])
+
+
+class TestOfferIndex:
+    """Tests for the sku to offer index"""
+
+    def test_single_sku_lookup(self, beans_buy_2_get_1_free, beans_20_percent_off):
+        """Single-sku offers are found by their sku only"""
+        index = OfferIndex([beans_buy_2_get_1_free, beans_20_percent_off])
+        assert index.single_sku_offers(1) == [
+            beans_buy_2_get_1_free,
+            beans_20_percent_off,
+        ]
+        assert index.single_sku_offers(2) == []
+
+    def test_multi_sku_lookup_in_offer_order(
+        self, shampoo_buy_3_cheapest_free, sardines_25_percent_off
+    ):
+        """Multi-sku offers are returned once, in offer order"""
+        other = BuyXGetCheapestFreeOffer(
+            id="other", name="Other", product_skus=[5, 7], quantity=2
+        )
+        cheapest_free = shampoo_buy_3_cheapest_free
+        index = OfferIndex([other, sardines_25_percent_off, cheapest_free])
+        assert index.multi_sku_offers([6, 5, 4]) == [other, cheapest_free]
+        assert index.multi_sku_offers([3]) == []
+
+    def test_classified_by_declared_scope(self, beans_20_percent_off):
+        """Any offer is indexed by the skus it declares, whatever its class"""
+        third_party = SkuDiscountOffer(sku=3, amount="0.10")
+        index = OfferIndex([beans_20_percent_off, third_party])
+        assert index.single_sku_offers(3) == [third_party]
+        assert index.basket_level_offers() == []
+
+
+class TestOfferSchedule:
+    """Tests for offers live during a validity window"""
+
+    def test_window_converted_and_checked(self):
+        offer = PercentageOffer(
+            id="p",
+            name="P",
+            sku=1,
+            percentage=10,
+            starts_at="2024-01-01T00:00:00+00:00",
+            ends_at=1_704_153_600,
+        )
+        assert offer.starts_at == 1_704_067_200.0
+        assert offer.is_live(1_704_067_200) and not offer.is_live(1_704_153_600)
+        with pytest.raises(InvalidOfferConfigError, match="must start before"):
+            PercentageOffer(
+                id="p", name="P", sku=1, percentage=10, starts_at=5, ends_at=5
+            )
+        with pytest.raises(InvalidOfferConfigError, match="invalid validity window"):
+            PercentageOffer(id="p", name="P", sku=1, percentage=10, ends_at="soon")
+
+    def test_live_offers_match_a_scan(self):
+        rng = random.Random(3)
+        offers = []
+        for number in range(300):
+            starts_at = rng.choice([None, rng.randint(0, 100)])
+            ends_at = rng.choice([None, rng.randint(101, 200), rng.randint(0, 200)])
+            if starts_at is not None and ends_at is not None and ends_at <= starts_at:
+                ends_at = None
+            offers.append(
+                BuyXgetYfree(
+                    id=f"b{number}",
+                    name="B",
+                    sku=number + 1,
+                    buy=1,
+                    free=1,
+                    starts_at=starts_at,
+                    ends_at=ends_at,
+                )
+            )
+        schedule = OfferSchedule(offers)
+        for at in [-1, 0, 50, 100, 100.5, 150, 200, 250] + list(range(0, 200, 7)):
+            expected = [offer for offer in offers if offer.is_live(at)]
+            assert schedule.live_offers(at) == expected
+
+    def test_segments_change_when_offers_start_or_end(self):
+        offers = [
+            PercentageOffer(id="a", name="A", sku=1, percentage=10, starts_at=10),
+            PercentageOffer(id="b", name="B", sku=2, percentage=10, ends_at=20),
+        ]
+        schedule = OfferSchedule(offers)
+        assert schedule.segment(10) == schedule.segment(19.5) != schedule.segment(9)
+        assert schedule.segment(20) != schedule.segment(19.5)
+
+    def test_dropped_only_for_an_offer_live_throughout(self):
+        """20% off for a week does not replace 10% off all year"""
+        always = PercentageOffer(id="ten", name="10%", sku=1, percentage=10)
+        week = PercentageOffer(
+            id="twenty", name="20%", sku=1, percentage=20, starts_at=0, ends_at=7
+        )
+        assert compile_offers([always, week]).offers == (always, week)
+
+        offer_set = OfferSet.build([always, week])
+        assert offer_set.at(3).active == (week,)
+        assert offer_set.at(10).active == (always,)
+
+    def test_segment_keeps_its_version(self):
+        """Compiling the offers of a moment again does not give a new version"""
+        week = PercentageOffer(
+            id="week", name="W", sku=1, percentage=20, starts_at=0, ends_at=7
+        )
+        offer_set = OfferSet.build([week])
+        assert offer_set.at(3).version == offer_set.at(5).version
+        assert offer_set.at(3).version != offer_set.at(10).version
+
+    def test_segment_memo(self):
+        """One value per segment across threads, least recently used evicted,
+        nothing pickled"""
+        memo = SegmentMemo(maxsize=2)
+        values = []
+        threads = [
+            threading.Thread(target=lambda: values.append(memo.get(1, object)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({id(value) for value in values}) == 1
+        memo.get(2, object)
+        memo.get(1, object)
+        memo.get(3, object)
+        assert memo.get(1, object) is values[0]
+        assert len(memo) == 2
+        copy = pickle.loads(pickle.dumps(memo))
+        assert len(copy) == 0 and copy.maxsize == 2
+
+
+RECORDS = [
+    {"type": "percentage", "id": "p", "name": "20% off", "sku": 1, "percentage": 20},
+    {
+        "type": "buy_x_get_y_free",
+        "id": "b",
+        "name": "B2G1",
+        "sku": 2,
+        "buy": 2,
+        "free": 1,
+    },
+    {
+        "type": "buy_x_get_cheapest_free",
+        "id": "c",
+        "name": "3 for 2",
+        "product_skus": [4, 5, 6],
+        "quantity": 3,
+    },
+]
+
+TIERED = {
+    "type": "tiered_quantity",
+    "id": "t",
+    "name": "Buy more save more",
+    "product_skus": [4, 5],
+    "quantities": [2, 3],
+    "percentages": [10, 20],
+}
+
+BUNDLE = {
+    "type": "bundle",
+    "id": "m",
+    "name": "Meal deal",
+    "slots": [[3, 6], [2], [1]],
+    "price": "3.00",
+}
+
+
+def write_offers(path, records):
+    with open(path, "w") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+
+class TestOfferLoader:
+    """Tests for offers loaded from JSON and JSONL files"""
+
+    def test_records_build_offers(self):
+        offers = [offer_from_record(record) for record in RECORDS]
+        assert offers == [
+            PercentageOffer(id="p", name="20% off", sku=1, percentage=20),
+            BuyXgetYfree(id="b", name="B2G1", sku=2, buy=2, free=1),
+            BuyXGetCheapestFreeOffer(
+                id="c", name="3 for 2", product_skus=[4, 5, 6], quantity=3
+            ),
+        ]
+        assert OffersFactory.create(RECORDS[0]) == offers[0]
+        assert offer_from_record(TIERED).rate_for(3) == Decimal("0.2")
+        assert offer_from_record(BUNDLE).price == Money("3.00")
+
+    @pytest.mark.parametrize(
+        "record, problem",
+        [
+            ({"id": "x", "name": "X", "sku": 1}, "unknown offer type"),
+            ({**RECORDS[0], "sku": "1"}, "sku must be a whole number"),
+            ({**RECORDS[0], "percentage": True}, "percentage must be a number"),
+            ({**RECORDS[0], "colour": "red"}, "unknown field 'colour'"),
+            ({**RECORDS[0], "percentage": -5}, "Percentage must be positive"),
+            ({**RECORDS[2], "product_skus": [4, "5"]}, "list of whole numbers"),
+            (
+                {**TIERED, "percentages": [10, "20"]},
+                "percentages must be a list of numbers",
+            ),
+            ({**BUNDLE, "slots": [[3], ["2"]]}, "list of lists of whole numbers"),
+            ({"type": "percentage", "id": "p", "name": "P"}, "sku"),
+        ],
+    )
+    def test_bad_records_rejected(self, record, problem):
+        with pytest.raises(InvalidOfferConfigError, match=problem):
+            offer_from_record(record)
+
+    def test_registered_types_load(self):
+        class SkuOffer(PercentageOffer):
+            pass
+
+        register_offer_type("sku_offer", SkuOffer)
+        try:
+            offer = offer_from_record({**RECORDS[0], "type": "sku_offer"})
+            assert isinstance(offer, SkuOffer)
+            with pytest.raises(InvalidOfferConfigError):
+                register_offer_type("sku_offer", PercentageOffer)
+        finally:
+            del OFFER_TYPES["sku_offer"]
+
+    def test_json_and_jsonl_load_the_same(self, tmp_path):
+        jsonl = tmp_path / "offers.jsonl"
+        write_offers(jsonl, RECORDS)
+        document = tmp_path / "offers.json"
+        document.write_text(json.dumps({"offers": RECORDS}))
+
+        from_lines, from_document = load_offers(str(jsonl)), load_offers(document)
+        assert from_lines.offers == from_document.offers
+        assert len(from_lines) == 3
+        assert from_document.version > from_lines.version
+        assert from_lines.source == str(jsonl)
+        assert from_lines.index.single_sku_offers(1) == [from_lines.offers[0]]
+
+    def test_every_bad_offer_reported(self, tmp_path):
+        path = tmp_path / "offers.jsonl"
+        write_offers(path, [RECORDS[0], {**RECORDS[1], "buy": -1}, RECORDS[0]])
+        with open(path, "a") as file:
+            file.write("{not json\n")
+        with pytest.raises(OfferLoadError) as error:
+            load_offers(str(path))
+        assert [position for position, _ in error.value.errors] == [2, 3, 4]
+        assert "duplicate offer id 'p'" in str(error.value)
+        assert "invalid JSON" in str(error.value)
+
+    def test_jsonl_read_in_chunks(self, tmp_path, monkeypatch):
+        """Line numbers carry across chunks, and a bad line only sends its
+        own chunk to the line by line parse"""
+        monkeypatch.setattr(offer_loader_module, "JSONL_CHUNK_LINES", 2)
+        path = tmp_path / "offers.jsonl"
+        records = [{**RECORDS[0], "id": f"p{number}"} for number in range(5)]
+        write_offers(path, records)
+        assert [offer.id for offer in load_offers(str(path)).offers] == [
+            "p0",
+            "p1",
+            "p2",
+            "p3",
+            "p4",
+        ]
+        with open(path, "a") as file:
+            file.write("\n{not json\n")
+        with pytest.raises(OfferLoadError) as error:
+            load_offers(str(path))
+        assert [position for position, _ in error.value.errors] == [7]
+
+
+class TestOfferFileWatcher:
+    """Tests for offer files reloaded while pricing"""
+
+    def replace_offers(self, path, records):
+        # written aside and renamed over the watched file, as a deploy would
+        write_offers(f"{path}.new", records)
+        os.replace(f"{path}.new", path)
+
+    def test_changed_file_reloaded(self, tmp_path):
+        path = str(tmp_path / "offers.jsonl")
+        write_offers(path, RECORDS[:1])
+        reloaded = []
+        watcher = OfferFileWatcher(path, on_reload=reloaded.append)
+        first = watcher.offer_set
+        assert not watcher.reload_if_changed()
+
+        self.replace_offers(path, RECORDS)
+        assert watcher.reload_if_changed()
+        assert reloaded == [watcher.offer_set]
+        assert len(watcher.offer_set) == 3
+        assert watcher.offer_set.version > first.version
+        assert len(first) == 1
+
+    def test_bad_file_keeps_current_offers(self, tmp_path):
+        path = str(tmp_path / "offers.jsonl")
+        write_offers(path, RECORDS)
+        reloaded = []
+        watcher = OfferFileWatcher(path, on_reload=reloaded.append)
+        current = watcher.offer_set
+
+        self.replace_offers(path, [{**RECORDS[0], "percentage": -5}])
+        assert not watcher.reload_if_changed()
+        assert watcher.offer_set is current
+        assert reloaded == []
+
+    def test_bad_first_load_raises(self, tmp_path):
+        path = str(tmp_path / "offers.jsonl")
+        write_offers(path, [{"type": "percentage"}])
+        with pytest.raises(OfferLoadError):
+            OfferFileWatcher(path)
+
+
+def priced_lines(*lines):
+    return {
+        sku: PricedLine(sku, qty, Money(price), f"P{sku}") for sku, qty, price in lines
+    }
+
+
+def best_allocation_by_search(offers, lines):
+    """Best total discount in minor units over every split of the units"""
+    skus = sorted(lines)
+
+    def best(level, remaining):
+        if level == len(offers):
+            return 0
+        scope = offers[level].scope_skus()
+        value = 0
+        for taken in itertools.product(
+            *(range(qty + 1 if sku in scope else 1) for sku, qty in remaining)
+        ):
+            given = {
+                sku: lines[sku]._replace(qty=qty)
+                for (sku, _), qty in zip(remaining, taken)
+                if qty
+            }
+            discount, _ = (
+                offers[level].discount_for_units(given)
+                if given
+                else (
+                    Money.zero(),
+                    {},
+                )
+            )
+            left = tuple(
+                (sku, qty - used) for (sku, qty), used in zip(remaining, taken)
+            )
+            value = max(value, discount.minor_units + best(level + 1, left))
+        return value
+
+    return best(0, tuple((sku, lines[sku].qty) for sku in skus))
+
+
+class TestOfferAllocator:
+    """Tests for the allocation of basket units to offers"""
+
+    def test_units_split_between_offers(self):
+        """Whole groups take buy 2 get 1, the units left over take 20% off"""
+        offers = [
+            (0, BuyXgetYfree(id="b2g1", name="B2G1", sku=1, buy=2, free=1)),
+            (1, PercentageOffer(id="20", name="20% off", sku=1, percentage=20)),
+        ]
+        lines = priced_lines((1, 5, "0.99"))
+        allocations = OfferAllocator().allocate(offers, lines)
+        assert [(a.position, a.discount, a.units) for a in allocations] == [
+            (0, Money("0.99"), {1: 3}),
+            (1, Money("0.40"), {1: 2}),
+        ]
+
+    def test_beats_greedy_and_falls_back_to_it(self):
+        """The search finds the best split, an exhausted budget gives greedy's"""
+        offers = [
+            (
+                0,
+                BuyXGetCheapestFreeOffer(
+                    id="cheapest", name="Cheapest", product_skus=[1, 2], quantity=2
+                ),
+            ),
+            (1, PercentageOffer(id="p1", name="60% off 1", sku=1, percentage=60)),
+            (2, PercentageOffer(id="p2", name="60% off 2", sku=2, percentage=60)),
+        ]
+        lines = priced_lines((1, 2, "1.00"), (2, 2, "1.00"))
+
+        best = OfferAllocator(time_budget=None).allocate(offers, lines)
+        assert [a.position for a in best] == [1, 2]
+        assert Money.sum(a.discount for a in best) == Money("2.40")
+
+        greedy = OfferAllocator(time_budget=0).allocate(offers, lines)
+        assert [a.position for a in greedy] == [0]
+        assert Money.sum(a.discount for a in greedy) == Money("2.00")
+
+    def test_units_are_never_shared(self):
+        """Random offers never use more units than the basket holds"""
+        rng = random.Random(3)
+        for _ in range(100):
+            lines = priced_lines(
+                *(
+                    (sku, rng.randint(1, 7), rng.randint(50, 400) / 100)
+                    for sku in range(1, 5)
+                )
+            )
+            offers = []
+            for position in range(rng.randint(2, 5)):
+                sku = rng.randint(1, 4)
+                kind = rng.random()
+                if kind < 0.4:
+                    offer = BuyXgetYfree(
+                        id="b", name="B", sku=sku, buy=rng.randint(1, 3), free=1
+                    )
+                elif kind < 0.7:
+                    offer = PercentageOffer(
+                        id="p", name="P", sku=sku, percentage=rng.randint(5, 50)
+                    )
+                else:
+                    offer = BuyXGetCheapestFreeOffer(
+                        id="c",
+                        name="C",
+                        product_skus=rng.sample(range(1, 5), 2),
+                        quantity=rng.randint(2, 4),
+                    )
+                offers.append((position, offer))
+
+            best = OfferAllocator(time_budget=None).allocate(offers, lines)
+            greedy = OfferAllocator(time_budget=0).allocate(offers, lines)
+            for sku, line in lines.items():
+                assert sum(a.units.get(sku, 0) for a in best) <= line.qty
+            assert Money.sum(a.discount for a in best) >= Money.sum(
+                a.discount for a in greedy
+            )
+
+    def test_part_of_a_sku_left_to_another_offer(self):
+        """Cheapest free pays with one sku 2 unit, 25% off takes the other"""
+        offers = [
+            (0, PercentageOffer(id="p1", name="50% off 1", sku=1, percentage=50)),
+            (1, PercentageOffer(id="p2", name="25% off 2", sku=2, percentage=25)),
+            (
+                2,
+                BuyXGetCheapestFreeOffer(
+                    id="c", name="3 for 2", product_skus=[2, 3], quantity=3
+                ),
+            ),
+        ]
+        lines = priced_lines((1, 2, "1.20"), (2, 2, "2.00"), (3, 2, "0.99"))
+        best = OfferAllocator(time_budget=None).allocate(offers, lines)
+        assert Money.sum(a.discount for a in best) == Money("2.69")
+        assert [a.units for a in best] == [{1: 2}, {2: 1}, {2: 1, 3: 2}]
+
+    def test_matches_search_over_every_split(self):
+        """Small baskets get the best split there is"""
+        rng = random.Random(10)
+        for _ in range(300):
+            # prices in 4p steps keep 25% and 50% off exact
+            lines = priced_lines(
+                *(
+                    (sku, rng.randint(1, 3), rng.randint(10, 100) * 4 / 100)
+                    for sku in range(1, 4)
+                )
+            )
+            offers = [
+                BuyXGetCheapestFreeOffer(
+                    id="c",
+                    name="C",
+                    product_skus=rng.sample(range(1, 4), rng.randint(2, 3)),
+                    quantity=rng.randint(2, 3),
+                )
+            ]
+            for _ in range(2):
+                sku = rng.randint(1, 3)
+                if rng.random() < 0.5:
+                    offers.append(
+                        BuyXgetYfree(
+                            id="b", name="B", sku=sku, buy=rng.randint(1, 2), free=1
+                        )
+                    )
+                else:
+                    offers.append(
+                        PercentageOffer(
+                            id="p", name="P", sku=sku, percentage=rng.choice([25, 50])
+                        )
+                    )
+            best = OfferAllocator(time_budget=None).allocate(
+                list(enumerate(offers)), lines
+            )
+            assert Money.sum(
+                a.discount for a in best
+            ).minor_units == best_allocation_by_search(offers, lines)
+
+    def test_bundle_leaves_units_to_another_offer(self):
+        """Two mains go to buy one get one free, the bundles take a main and
+        the snack"""
+        offers = [
+            (0, BuyXgetYfree(id="b", name="BOGOF", sku=1, buy=1, free=1)),
+            (1, BundleOffer(id="m", name="Meal", slots=[[2], [1, 3]], price="2.00")),
+        ]
+        lines = priced_lines((1, 3, "3.70"), (2, 2, "0.68"), (3, 1, "2.42"))
+        best = OfferAllocator(time_budget=None).allocate(offers, lines)
+        assert Money.sum(a.discount for a in best) == Money("7.18")
+        assert sorted(a.units.items() for a in best) == sorted(
+            [{1: 2}.items(), {1: 1, 2: 2, 3: 1}.items()]
+        )
+
+    def test_matches_search_over_every_split_with_bundles(self):
+        """Small baskets with a bundle get the best split there is"""
+        rng = random.Random(11)
+        for _ in range(200):
+            lines = priced_lines(
+                *(
+                    (sku, rng.randint(1, 3), rng.randint(10, 100) * 4 / 100)
+                    for sku in range(1, 4)
+                )
+            )
+            skus = rng.sample(range(1, 4), 3)
+            slots = [skus[:1], skus[1 : rng.randint(2, 3)]]
+            offers = [
+                BundleOffer(
+                    id="m",
+                    name="M",
+                    slots=slots,
+                    price=Money(rng.randint(10, 150) * 4 / 100),
+                )
+            ]
+            for _ in range(2):
+                sku = rng.randint(1, 3)
+                if rng.random() < 0.5:
+                    offers.append(
+                        BuyXgetYfree(
+                            id="b", name="B", sku=sku, buy=rng.randint(1, 2), free=1
+                        )
+                    )
+                else:
+                    offers.append(
+                        PercentageOffer(
+                            id="p", name="P", sku=sku, percentage=rng.choice([25, 50])
+                        )
+                    )
+            best = OfferAllocator(time_budget=None).allocate(
+                list(enumerate(offers)), lines
+            )
+            assert Money.sum(
+                a.discount for a in best
+            ).minor_units == best_allocation_by_search(offers, lines)
+
+    def test_negative_budget_rejected(self):
+        with pytest.raises(ValueError):
+            OfferAllocator(time_budget=-1)
@@ -0,0 +1,111 @@
+import pytest
+
+from src.basket_pricer.models import Basket, BasketItem, Catalogue, Money, Product
+from src.basket_pricer.pricer import BasketPricer, PriceCache
+from src.basket_pricer.pricer.price_summary import no_discount_summary
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestBasketFingerprint:
+    """Tests for the basket fingerprint used as cache key"""
+
+    def test_fingerprint_ignores_item_order(
+        self, basket_item_beans_qty3: BasketItem, basket_item2: BasketItem
+    ):
+        """Same contents in a different order give the same fingerprint"""
+        first = Basket([basket_item_beans_qty3, basket_item2])
+        second = Basket([basket_item2, basket_item_beans_qty3])
+        assert first.fingerprint() == second.fingerprint()
+
+    def test_fingerprint_depends_on_quantities(self, beans_product: Product):
+        """Different quantities give different fingerprints"""
+        three = Basket([BasketItem(product=beans_product, qty=3)])
+        six = Basket([BasketItem(product=beans_product, qty=6)])
+        assert three.fingerprint() != six.fingerprint()
+
+
+class TestPriceCache:
+    """Tests for the LRU / TTL cache itself"""
+
+    def test_hit_and_miss_counters(self):
+        cache = PriceCache(maxsize=2)
+        summary = no_discount_summary(Money("1.00"))
+        assert cache.get("a") is None
+        cache.put("a", summary)
+        assert cache.get("a") is summary
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+        assert stats.hit_rate == 0.5
+
+    def test_least_recently_used_is_evicted(self):
+        cache = PriceCache(maxsize=2)
+        for key in ["a", "b"]:
+            cache.put(key, no_discount_summary(Money("1.00")))
+        cache.get("a")
+        cache.put("c", no_discount_summary(Money("1.00")))
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = PriceCache(maxsize=4, ttl=10, clock=clock)
+        cache.put("a", no_discount_summary(Money("1.00")))
+        clock.now = 10
+        assert cache.get("a") is not None
+        clock.now = 10.5
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_invalid_configuration(self):
+        with pytest.raises(ValueError):
+            PriceCache(maxsize=0)
+        with pytest.raises(ValueError):
+            PriceCache(ttl=0)
+
+
+class TestPricerWithCache:
+    """Tests for BasketPricer using a PriceCache"""
+
+    def test_repeated_basket_is_served_from_cache(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        cache = PriceCache()
+        pricer = BasketPricer(basic_catalogue, basic_offers, cache=cache)
+        first = pricer.calculate(basket_with_mixed_items)
+        second = pricer.calculate(basket_with_mixed_items)
+        assert second is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_catalogue_change_invalidates(
+        self,
+        basket_with_mixed_items: Basket,
+        basic_catalogue: Catalogue,
+        shampoo_small: Product,
+    ):
+        cache = PriceCache()
+        pricer = BasketPricer(basic_catalogue, [], cache=cache)
+        first = pricer.calculate(basket_with_mixed_items)
+        basic_catalogue.add_product(shampoo_small)
+        second = pricer.calculate(basket_with_mixed_items)
+        assert second is not first
+        assert cache.misses == 2
+
+    def test_offer_change_invalidates(
+        self, basket_with_mixed_items: Basket, basic_catalogue: Catalogue, basic_offers
+    ):
+        cache = PriceCache()
+        pricer = BasketPricer(basic_catalogue, [], cache=cache)
+        assert pricer.calculate(basket_with_mixed_items).discount == Money.zero()
+        pricer.set_offers(basic_offers)
+        assert pricer.calculate(basket_with_mixed_items).discount == Money("1.46")
+        assert cache.hits == 0